@@ -0,0 +1,100 @@
+"""
+Compares fetching a large ``list_events`` response with and without
+compression from a local stub server sending at a limited rate, and prints
+the wire and decoded sizes recorded in ``Client.transfer_stats``.
+
+Usage:
+    python benchmarks/compression.py [events] [rate in MiB/s]
+"""
+
+import gzip
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from exoscale.api.session import HTTP2Session
+from exoscale.api.v2 import Client
+
+CHUNK = 64 * 1024
+
+
+def make_handler(body, rate):
+    compressed = gzip.compress(body, compresslevel=6)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            accepted = self.headers.get("Accept-Encoding", "")
+            data = compressed if "gzip" in accepted else body
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            if data is compressed:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            # Simulated link bandwidth.
+            for i in range(0, len(data), CHUNK):
+                self.wfile.write(data[i : i + CHUNK])
+                time.sleep(CHUNK / rate)
+
+    return Handler
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    body = json.dumps(
+        {
+            "events": [
+                {
+                    "timestamp": f"2026-10-19T{i // 3600 % 24:02}:"
+                    f"{i // 60 % 60:02}:{i % 60:02}Z",
+                    "handler": "create-instance",
+                    "request-id": f"{i:08x}-4f1e-4c8a-9d7b-3e2a1c0b9f8e",
+                    "iam-user": {"email": "ops@example.net"},
+                    "zone": "ch-gva-2",
+                    "status": 200,
+                }
+                for i in range(count)
+            ]
+        }
+    ).encode()
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), make_handler(body, rate * 2**20)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v2"
+
+    print(f"{count} events at {rate:g} MiB/s")
+    print(f"{'':>18} {'wire MiB':>9} {'decoded MiB':>12} {'time ms':>8}")
+    for name, encoding, http2 in [
+        ("requests identity", "identity", False),
+        ("requests gzip", None, False),
+        ("httpx gzip", None, True),
+    ]:
+        client = Client("key", "secret", url=url, http2=http2)
+        if http2:
+            # Cleartext endpoint: HTTP/1.1 with httpx.
+            client.http_client = HTTP2Session(client.http_client.auth)
+        headers = {} if encoding is None else {"Accept-Encoding": encoding}
+        start = time.perf_counter()
+        client._call_operation("list-events", headers=headers)
+        elapsed = time.perf_counter() - start
+        stats = client.transfer_stats["list-events"]
+        print(
+            f"{name:>18} {stats['wire_bytes'] / 2**20:>9.1f}"
+            f" {stats['decoded_bytes'] / 2**20:>12.1f}"
+            f" {elapsed * 1000:>8.0f}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
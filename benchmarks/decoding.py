@@ -0,0 +1,89 @@
+"""
+Measures the memory retained by a decoded synthetic ``list_instances``
+response, and its decoding time, in each decoding mode.
+
+Usage:
+    python benchmarks/decoding.py [instances]
+"""
+
+import json
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+from exoscale.api.decoding import decode
+
+ZONES = ["ch-gva-2", "ch-dk-2", "de-fra-1", "de-muc-1", "at-vie-1"]
+STATES = ["running", "stopped", "starting"]
+
+
+def listing(count):
+    rng = random.Random(0)
+    instance_types = [
+        str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(20)
+    ]
+    templates = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(50)]
+    security_groups = [
+        str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(10)
+    ]
+    instances = []
+    for i in range(count):
+        id = str(uuid.UUID(int=rng.getrandbits(128)))
+        instances.append(
+            {
+                "id": id,
+                "name": f"node-{i}",
+                "state": rng.choice(STATES),
+                "zone": rng.choice(ZONES),
+                "created-at": "2025-03-10T14:52:34Z",
+                "instance-type": {"id": rng.choice(instance_types)},
+                "template": {"id": rng.choice(templates)},
+                "security-groups": [{"id": rng.choice(security_groups)}],
+                "public-ip-assignment": "inet4",
+                "public-ip": f"194.182.{i // 256 % 256}.{i % 256}",
+                "labels": {"role": "worker", "env": "production"},
+                "disk-size": 50,
+                "ssh-keys": [{"name": "deploy"}],
+            }
+        )
+    return json.dumps({"instances": instances}).encode()
+
+
+def measure(content, **kwargs):
+    # Timed without tracing, which slows allocations down.
+    start = time.perf_counter()
+    decode(content, **kwargs)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = decode(content, **kwargs)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained, seconds
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    content = listing(count)
+    print(f"{count} instances, {len(content) / 2**20:.1f} MiB of JSON")
+    modes = {
+        "default": {},
+        "intern_strings": {"intern_strings": True},
+        "intern + snake_case": {
+            "intern_strings": True,
+            "snake_case_keys": True,
+        },
+    }
+    for name, kwargs in modes.items():
+        retained, seconds = measure(content, **kwargs)
+        print(
+            f"{name:>20}: {retained / 2**20:7.1f} MiB retained,"
+            f" decoded in {seconds * 1000:6.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Compares the throughput of the default HTTP/1.1 transport (one connection
+per thread) and of the HTTP/2 transport (one multiplexed connection) against
+local stub servers, at several concurrency levels.
+
+The HTTP/2 server speaks cleartext HTTP/2 (prior knowledge), which requires
+the ``h2`` package.
+
+Usage:
+    python benchmarks/http2.py [requests] [concurrency...]
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+
+from exoscale.api.session import HTTP2Session
+from exoscale.api.v2 import Client
+
+ID = "00000000-0000-0000-0000-000000000000"
+BODY = json.dumps({"id": ID}).encode()
+# Simulated API latency.
+LATENCY = 0.005
+
+
+class HTTP1Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+class HTTP2Protocol(asyncio.Protocol):
+    def connection_made(self, transport):
+        self.transport = transport
+        self.conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False)
+        )
+        self.conn.initiate_connection()
+        self.transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.ensure_future(self.respond(event.stream_id))
+        self.transport.write(self.conn.data_to_send())
+
+    async def respond(self, stream_id):
+        await asyncio.sleep(LATENCY)
+        self.conn.send_headers(
+            stream_id,
+            [
+                (":status", "200"),
+                ("content-type", "application/json"),
+                ("content-length", str(len(BODY))),
+            ],
+        )
+        self.conn.send_data(stream_id, BODY, end_stream=True)
+        self.transport.write(self.conn.data_to_send())
+
+
+def start_http2_server():
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(
+        loop.create_server(HTTP2Protocol, "127.0.0.1", 0)
+    )
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return server.sockets[0].getsockname()[1]
+
+
+def measure(client, concurrency, count):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: client.get_instance(id=ID), range(count)))
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    levels = [int(n) for n in sys.argv[2:]] or [1, 16, 128]
+
+    http1 = ThreadingHTTPServer(("127.0.0.1", 0), HTTP1Handler)
+    http1.request_queue_size = 256
+    threading.Thread(target=http1.serve_forever, daemon=True).start()
+    http2_port = start_http2_server()
+
+    client1 = Client(
+        "key",
+        "secret",
+        url=f"http://127.0.0.1:{http1.server_port}/v2",
+        thread_safe=True,
+    )
+    client2 = Client(
+        "key", "secret", url=f"http://127.0.0.1:{http2_port}/v2", http2=True
+    )
+    # Cleartext HTTP/2 needs prior knowledge: TLS endpoints negotiate it.
+    client2.http_client = HTTP2Session(
+        client2.http_client.auth,
+        http1=False,
+        limits=httpx.Limits(max_connections=1),
+    )
+
+    print(f"{'concurrency':>11} {'HTTP/1.1 req/s':>15} {'HTTP/2 req/s':>13}")
+    for concurrency in levels:
+        rate1 = measure(client1, concurrency, count)
+        rate2 = measure(client2, concurrency, count)
+        print(f"{concurrency:>11} {rate1:>15.0f} {rate2:>13.0f}")
+    http1.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares encrypting small payloads with one ``encrypt`` API call each and
+with an :class:`~exoscale.api.kms.EnvelopeCipher`, and measures the
+streaming throughput of envelopes, against a stub KMS answering after a
+simulated API latency.
+
+Usage:
+    python benchmarks/kms.py [payloads] [payload size]
+"""
+
+import base64
+import io
+import os
+import sys
+import time
+
+from exoscale.api.kms import EnvelopeCipher
+
+KEY = "5ba2d1e6-3c8a-4d1b-9a0e-04d5e1b6b7a3"
+# Simulated API latency.
+LATENCY = 0.02
+
+
+class StubKMS:
+    def __init__(self):
+        self.keys = {}
+
+    def encrypt(self, id, plaintext):
+        time.sleep(LATENCY)
+        return {"ciphertext": plaintext}
+
+    def generate_data_key(self, id, key_spec):
+        time.sleep(LATENCY)
+        plaintext = base64.b64encode(os.urandom(32)).decode()
+        wrapped = base64.b64encode(os.urandom(40)).decode()
+        self.keys[wrapped] = plaintext
+        return {"plaintext": plaintext, "ciphertext": wrapped}
+
+    def decrypt(self, id, ciphertext):
+        time.sleep(LATENCY)
+        return {"plaintext": self.keys[ciphertext]}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    kms = StubKMS()
+    payloads = [os.urandom(size) for _ in range(count)]
+
+    # One-shot calls are too slow to run in full: measure a sample.
+    sample = payloads[:50]
+    start = time.perf_counter()
+    for payload in sample:
+        kms.encrypt(id=KEY, plaintext=base64.b64encode(payload).decode())
+    one_shot = len(sample) / (time.perf_counter() - start)
+
+    cipher = EnvelopeCipher(kms, KEY)
+    start = time.perf_counter()
+    envelopes = [cipher.encrypt(payload) for payload in payloads]
+    encrypt = count / (time.perf_counter() - start)
+    reader = EnvelopeCipher(kms, KEY)
+    start = time.perf_counter()
+    for envelope in envelopes:
+        reader.decrypt(envelope)
+    decrypt = count / (time.perf_counter() - start)
+
+    print(f"{count} payloads of {size} bytes")
+    print(f"{'one-shot encrypt calls':>24}: {one_shot:>9.0f} payloads/s")
+    print(f"{'envelope encrypt':>24}: {encrypt:>9.0f} payloads/s")
+    print(f"{'envelope decrypt':>24}: {decrypt:>9.0f} payloads/s")
+    print(f"{'KMS calls':>24}: {dict(cipher.stats + reader.stats)}")
+
+    data = os.urandom(256 * 1024 * 1024)
+    envelope = io.BytesIO()
+    start = time.perf_counter()
+    cipher.encrypt_stream(io.BytesIO(data), envelope)
+    elapsed = time.perf_counter() - start
+    print(f"{'stream encrypt':>24}: {len(data) / elapsed / 2**20:>9.0f} MiB/s")
+    envelope.seek(0)
+    start = time.perf_counter()
+    reader.decrypt_stream(envelope, io.BytesIO())
+    elapsed = time.perf_counter() - start
+    print(f"{'stream decrypt':>24}: {len(data) / elapsed / 2**20:>9.0f} MiB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures the time needed to import a client module and construct a client,
+each sample running in a fresh interpreter.
+
+Usage:
+    python benchmarks/startup.py [samples]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+V2 = (
+    "from exoscale.api.v2 import Client;"
+    " Client('key', 'secret', zone='ch-gva-2').list_zones"
+)
+
+# name: (code, environment variables)
+CASES = {
+    "partner": (
+        "from exoscale.api.partner import Client; Client('key', 'secret')",
+        {},
+    ),
+    "v2": (V2, {"EXOSCALE_API_CODEGEN": "0"}),
+    "v2-lazy": (V2, {"EXOSCALE_API_LAZY": "1", "EXOSCALE_API_CODEGEN": "0"}),
+    # Requires the modules written by ``python -m exoscale.api.codegen``.
+    "v2-codegen": (V2, {}),
+}
+
+TIMER = """
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(code, env, samples):
+    durations = []
+    for _ in range(samples):
+        output = subprocess.run(
+            [sys.executable, "-c", TIMER.format(code=code)],
+            check=True,
+            env={**os.environ, **env},
+            capture_output=True,
+            text=True,
+        ).stdout
+        durations.append(float(output))
+    return durations
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for name, (code, env) in CASES.items():
+        durations = measure(code, env, samples)
+        print(
+            f"{name:>10}: median {statistics.median(durations) * 1000:7.1f} ms"
+            f"  min {min(durations) * 1000:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Measures the throughput of a client shared between threads against a local
+stub server, with a single shared session and with per-thread sessions.
+
+Usage:
+    python benchmarks/threads.py [requests] [threads...]
+"""
+
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from exoscale.api.v2 import Client
+
+BODY = json.dumps({"id": "00000000-0000-0000-0000-000000000000"}).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Avoid Nagle/delayed ACK stalls between the headers and the body.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        # Simulate API latency.
+        time.sleep(0.005)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+def measure(url, thread_safe, threads, count):
+    client = Client("key", "secret", url=url, thread_safe=thread_safe)
+    id = "00000000-0000-0000-0000-000000000000"
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: client.get_instance(id=id), range(count)))
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    thread_counts = [int(n) for n in sys.argv[2:]] or [1, 4, 16, 32]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v2"
+    print(f"{'threads':>8} {'shared req/s':>14} {'per-thread req/s':>18}")
+    for threads in thread_counts:
+        shared = measure(url, False, threads, count)
+        per_thread = measure(url, True, threads, count)
+        print(f"{threads:>8} {shared:>14.0f} {per_thread:>18.0f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+
+``exoscale.api.circuit`` tracks the health of API endpoints and stops sending
+requests to failing ones.
+
+A :class:`CircuitBreaker` keeps rolling error and latency statistics of the
+requests sent to an endpoint. When too many of them fail, the circuit opens
+and calls fail immediately with
+:class:`~exoscale.api.exceptions.ExoscaleAPICircuitOpenException` instead of
+waiting for the endpoint. After a cool-down, a few probe requests are let
+through: the circuit closes again if they succeed.
+
+Clients created with ``circuit_breaker=True`` share one breaker per endpoint
+across the process, so that all the clients of a zone see its health.
+
+Examples:
+    Skipping degraded zones in a multi-zone fan-out:
+
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.circuit import circuit_breakers
+    >>> from exoscale.api.exceptions import ExoscaleAPICircuitOpenException
+    >>> clients = [
+    ...     Client("api-key", "api-secret", zone=zone, circuit_breaker=True)
+    ...     for zone in ("ch-gva-2", "de-fra-1", "at-vie-1")
+    ... ]
+    >>> for c in clients:
+    ...     try:
+    ...         c.list_instances()
+    ...     except ExoscaleAPICircuitOpenException:
+    ...         continue
+    >>> {e: s["state"] for e, s in circuit_breakers().items()}
+    {'https://api-ch-gva-2.exoscale.com/v2': 'closed', ...}
+"""
+
+import threading
+import time
+from collections import deque
+from functools import partial
+
+from .exceptions import (
+    ExoscaleAPICircuitOpenException,
+    ExoscaleAPIException,
+    ExoscaleAPIServerException,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+def _time():
+    return time.monotonic()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of an endpoint. Safe to share between threads.
+
+    Args:
+        endpoint (str): endpoint URL, used in error messages.
+
+        failure_rate (float): fraction of failed calls over the window
+          opening the circuit. Defaults to ``0.5``.
+
+        min_calls (int): minimum number of calls over the window before the
+          circuit can open. Defaults to ``10``.
+
+        window (float): duration in seconds of the rolling statistics.
+          Defaults to ``60``.
+
+        open_timeout (float): time in seconds before an open circuit lets
+          probe calls through. Defaults to ``30``.
+
+        probes (int): number of concurrent probe calls in the half-open
+          state. Defaults to ``1``.
+
+        slow_call (float): calls taking longer than this many seconds count
+          as failures. Defaults to ``None`` (latency is only reported).
+    """
+
+    def __init__(
+        self,
+        endpoint,
+        failure_rate=0.5,
+        min_calls=10,
+        window=60,
+        open_timeout=30,
+        probes=1,
+        slow_call=None,
+    ):
+        self.endpoint = endpoint
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_timeout = open_timeout
+        self.probes = probes
+        self.slow_call = slow_call
+        self.state = CLOSED
+        # (timestamp, failed, latency) of the calls over the window.
+        self._calls = deque()
+        # Number of failed calls in _calls.
+        self._failures = 0
+        self._opened_at = None
+        # Tokens of the probe calls in flight.
+        self._probes = set()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<CircuitBreaker endpoint={self.endpoint} state={self.state}>"
+
+    def __reduce__(self):
+        # Pickle the configuration only, statistics starting afresh. Shared
+        # breakers are looked up again in the unpickling process.
+        config = {
+            "failure_rate": self.failure_rate,
+            "min_calls": self.min_calls,
+            "window": self.window,
+            "open_timeout": self.open_timeout,
+            "probes": self.probes,
+            "slow_call": self.slow_call,
+        }
+        with _breakers_lock:
+            shared = _breakers.get(self.endpoint) is self
+        factory = get_circuit_breaker if shared else CircuitBreaker
+        return partial(factory, **config), (self.endpoint,)
+
+    def _prune(self, now):
+        while self._calls and self._calls[0][0] < now - self.window:
+            _, failed, _ = self._calls.popleft()
+            self._failures -= failed
+
+    def before_call(self):
+        """
+        Raises :class:`ExoscaleAPICircuitOpenException` if a call may not be
+        sent now.
+
+        Returns:
+            A probe token to pass to :meth:`after_call` if the call is a
+            probe of a half-open circuit, ``None`` otherwise.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if _time() - self._opened_at < self.open_timeout:
+                    raise ExoscaleAPICircuitOpenException(
+                        f"Circuit open for {self.endpoint}"
+                    )
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if len(self._probes) >= self.probes:
+                    raise ExoscaleAPICircuitOpenException(
+                        f"Circuit half-open for {self.endpoint}"
+                    )
+                probe = object()
+                self._probes.add(probe)
+                return probe
+            return None
+
+    def after_call(self, latency, error=None, probe=None):
+        """
+        Records the outcome of a call let through by :meth:`before_call`,
+        given the probe token it returned. Only server errors (5xx) and
+        transport errors are failures of the endpoint: client and
+        authentication errors are not, and interrupted calls (e.g. by
+        ``KeyboardInterrupt``) are neither successes nor failures.
+        """
+        failed = (
+            isinstance(error, ExoscaleAPIServerException)
+            or (
+                isinstance(error, Exception)
+                and not isinstance(error, ExoscaleAPIException)
+            )
+            or (self.slow_call is not None and latency > self.slow_call)
+        )
+        now = _time()
+        with self._lock:
+            if error is not None and not isinstance(error, Exception):
+                # Interrupted call: a probe slot is released for another.
+                self._probes.discard(probe)
+                return
+            if probe is not None:
+                if probe not in self._probes:
+                    # Probe of an earlier half-open period.
+                    return
+                self._probes.discard(probe)
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = CLOSED
+                    self._probes.clear()
+                    self._calls.clear()
+                    self._failures = 0
+                return
+            if self.state != CLOSED:
+                # Calls sent before the circuit opened do not tell whether
+                # the endpoint recovered.
+                return
+            self._calls.append((now, failed, latency))
+            self._failures += failed
+            self._prune(now)
+            calls = len(self._calls)
+            if (
+                calls >= self.min_calls
+                and self._failures >= self.failure_rate * calls
+            ):
+                self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        self._probes.clear()
+        self._calls.clear()
+        self._failures = 0
+
+    def snapshot(self):
+        """
+        Returns the state and rolling statistics of the endpoint.
+
+        Returns:
+            dict: ``state``, ``calls``, ``failures``, ``failure_rate`` and
+            ``latency_p50``/``latency_p95`` in seconds (``None`` without
+            calls).
+        """
+        with self._lock:
+            self._prune(_time())
+            calls = list(self._calls)
+            failures = self._failures
+            state = self.state
+        latencies = [latency for _, _, latency in calls]
+        return {
+            "state": state,
+            "calls": len(calls),
+            "failures": failures,
+            "failure_rate": failures / len(calls) if calls else 0.0,
+            "latency_p50": _percentile(latencies, 0.5),
+            "latency_p95": _percentile(latencies, 0.95),
+        }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(endpoint, **kwargs):
+    """
+    Returns the circuit breaker shared by the clients of ``endpoint``,
+    creating it with ``kwargs`` (see :class:`CircuitBreaker`) on first use.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint, **kwargs)
+        return breaker
+
+
+def circuit_breakers():
+    """
+    Returns the :meth:`CircuitBreaker.snapshot` of every shared circuit
+    breaker, by endpoint.
+    """
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {endpoint: b.snapshot() for endpoint, b in breakers.items()}
@@ -0,0 +1,313 @@
+"""
+
+``exoscale.api.codegen`` writes the client classes otherwise generated at
+import time by :func:`exoscale.api.generator.create_client_class` as Python
+modules, with one plain method per operation.
+
+Generated modules are byte-compiled and cached like any other module, can be
+inspected by type checkers and IDEs, and are imported without parsing the API
+definition, which is only loaded if a helper needs the full schema. They
+record the size and digest of the definition they were generated from:
+``exoscale.api.v2`` and ``exoscale.api.partner`` only use them when the size
+matches the bundled definition, and fall back to runtime generation
+otherwise, or when ``EXOSCALE_API_CODEGEN=0`` is set. Comparing the digest
+means reading the whole definition on every import, so it is only done when
+``EXOSCALE_API_CODEGEN=check`` is set.
+
+Examples:
+    Regenerating the modules after updating an API definition:
+
+    $ python -m exoscale.api.codegen
+    exoscale/api/_v2_generated.py
+    exoscale/api/_partner_generated.py
+"""
+
+import importlib
+import json
+import keyword
+import os
+import py_compile
+from hashlib import sha256
+from pathlib import Path
+from pprint import pformat
+
+from .generator import (
+    _client_docstring,
+    _create_operation_call,
+    _get_ref,
+    _resolve_type,
+    _type_translations,
+    create_client_class,
+)
+
+_PACKAGE_DIR = Path(__file__).parent.parent
+
+# Definition files bundled with the package, relative to the package
+# directory, and the generated modules of the API clients.
+MODULES = {
+    "openapi.json": "_v2_generated",
+    "partner-api.json": "_partner_generated",
+}
+
+
+class _Unset:
+    def __repr__(self):
+        return "_UNSET"
+
+
+# Default value of the arguments of generated methods, telling arguments left
+# out apart from arguments explicitly set to ``None``.
+_UNSET = _Unset()
+
+
+def _params(values):
+    return {k: v for k, v in values.items() if v is not _UNSET}
+
+
+def _body(values):
+    return _params(values) or None
+
+
+def _check_kwargs(kwargs):
+    for k in kwargs:
+        raise TypeError(f"Unhandled keyword argument {k!r}.")
+
+
+class _SpecLoader:
+    """
+    Class attribute standing for the API definition of a generated client,
+    which is only loaded on first access and then replaces the descriptor on
+    the class.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def __set_name__(self, owner, name):
+        self.owner = owner
+
+    def __get__(self, instance, owner=None):
+        with open(_PACKAGE_DIR / self.filename) as f:
+            api_spec = json.load(f)
+        self.owner._api_spec = api_spec
+        return api_spec
+
+
+def spec_digest(path):
+    """
+    Returns the SHA-256 digest of an API definition file.
+    """
+    with open(path, "rb") as f:
+        return sha256(f.read()).hexdigest()
+
+
+def load_generated_client(filename):
+    """
+    Returns the generated client class of a bundled API definition, or
+    ``None`` when its module is missing, stale, or disabled with
+    ``EXOSCALE_API_CODEGEN=0``.
+
+    Args:
+        filename (str): API definition file, e.g. ``'openapi.json'``.
+    """
+    mode = os.environ.get("EXOSCALE_API_CODEGEN", "")
+    if mode == "0":
+        return None
+    name = f"{__package__}.{MODULES[filename]}"
+    try:
+        module = importlib.import_module(name)
+    except ModuleNotFoundError as e:
+        if e.name != name:
+            raise
+        return None
+    spec_path = _PACKAGE_DIR / filename
+    # Modules generated before SPEC_SIZE was recorded are stale too.
+    if getattr(module, "SPEC_SIZE", None) != spec_path.stat().st_size:
+        return None
+    if mode == "check" and module.SPEC_DIGEST != spec_digest(spec_path):
+        return None
+    return module.Client
+
+
+def _literal(value):
+    return pformat(value, width=79, sort_dicts=False)
+
+
+def _docstring(doc, indent):
+    if '"""' in doc or "\\" in doc:
+        return f"{indent}{doc!r}\n"
+    return f'{indent}"""{doc}"""\n'
+
+
+def _arguments(api_spec, operation):
+    """
+    Returns the query/path parameters and the body properties of an
+    operation as ``{python_name: (api_name, type)}`` dicts, parameters taking
+    precedence over body properties like in runtime generated methods.
+    """
+    parameters = {}
+    for param in operation.get("parameters", []):
+        schema = param["schema"]
+        if "$ref" in schema:
+            schema = _get_ref(api_spec, schema["$ref"])
+        typ = _type_translations[_resolve_type(schema["type"])]
+        parameters[param["name"].replace("-", "_")] = (param["name"], typ)
+
+    body = {}
+    if "requestBody" in operation:
+        schema = operation["requestBody"]["content"]["application/json"][
+            "schema"
+        ]
+        if "$ref" in schema:
+            schema = _get_ref(api_spec, schema["$ref"])
+        for name, prop in schema["properties"].items():
+            item = _get_ref(api_spec, prop["$ref"]) if "$ref" in prop else prop
+            typ = _type_translations[_resolve_type(item["type"])]
+            normalized_name = name.replace("-", "_")
+            if normalized_name not in parameters:
+                body[normalized_name] = (name, typ)
+    return parameters, body
+
+
+def _method_source(api_spec, operation_name, entry):
+    py_operation_name = operation_name.replace("-", "_")
+    operation = entry["operation"]
+    parameters, body = _arguments(api_spec, operation)
+    doc = _create_operation_call(
+        py_operation_name, operation_name, operation, api_spec
+    ).__doc__
+
+    signature = ["self", "*"]
+    pops = []
+    for name, (_, typ) in {**parameters, **body}.items():
+        if keyword.iskeyword(name):
+            pops.append(name)
+        else:
+            signature.append(f"{name}: {typ} = _UNSET")
+    if pops:
+        signature.append("**kwargs")
+    if signature[-1] == "*":
+        signature.pop()
+
+    def values(arguments):
+        if not arguments:
+            return "{}"
+        items = []
+        for name, (api_name, _) in arguments.items():
+            if name in pops:
+                value = f"kwargs.pop({name!r}, _UNSET)"
+            else:
+                value = name
+            items.append(f"            {api_name!r}: {value},\n")
+        return "{\n" + "".join(items) + "        }"
+
+    lines = [
+        f"    def {py_operation_name}({', '.join(signature)}):\n",
+        _docstring(doc, "        "),
+        f"        _params = _params_of({values(parameters)})\n",
+        f"        _request_body = _body_of({values(body)})\n",
+    ]
+    if pops:
+        lines.append("        _check_kwargs(kwargs)\n")
+    lines.append(
+        "        return self._call_operation(\n"
+        f"            {operation_name!r}, parameters=_params,"
+        " body=_request_body\n"
+        "        )\n"
+    )
+    return "".join(lines)
+
+
+def generate_client_module(api_spec, filename, digest, size):
+    """
+    Returns the source code of a module defining the client class of an API
+    definition.
+
+    Args:
+        api_spec (dict): API definition.
+
+        filename (str): name of the API definition file, relative to the
+          ``exoscale`` package directory, loaded when the full definition is
+          needed.
+
+        digest (str): digest of the API definition file, see
+          :func:`spec_digest`.
+
+        size (int): size of the API definition file, in bytes.
+    """
+    base = create_client_class(api_spec, lazy=True)
+    by_operation = {
+        operation_name: {
+            "verb": entry["verb"],
+            "path": entry["path"],
+            # _call_operation() only needs the name, location and
+            # requirement of the parameters.
+            "operation": {
+                "operationId": operation_name,
+                "parameters": [
+                    {k: param[k] for k in ("name", "in", "required")}
+                    for param in entry["operation"].get("parameters", [])
+                ],
+            },
+        }
+        for operation_name, entry in base._by_operation.items()
+    }
+    methods = "\n".join(
+        _method_source(api_spec, operation_name, entry)
+        for operation_name, entry in base._by_operation.items()
+    )
+    return (
+        f'"""\n'
+        f"Client generated from ``{filename}`` by ``exoscale.api.codegen``.\n"
+        f"Do not edit: run ``python -m exoscale.api.codegen`` instead.\n"
+        f'"""\n\n'
+        f"from exoscale.api.codegen import _UNSET, _SpecLoader\n"
+        f"from exoscale.api.codegen import _check_kwargs\n"
+        f"from exoscale.api.codegen import _body as _body_of\n"
+        f"from exoscale.api.codegen import _params as _params_of\n"
+        f"from exoscale.api.generator import BaseClient\n\n"
+        f"SPEC_DIGEST = {digest!r}\n"
+        f"SPEC_SIZE = {size!r}\n\n"
+        f"_SERVER = {_literal(base._server)}\n\n"
+        f"_BY_OPERATION = {_literal(by_operation)}\n\n\n"
+        f"class Client(BaseClient):\n"
+        f"{_docstring(_client_docstring(api_spec), '    ')}\n"
+        f"    _api_spec = _SpecLoader({filename!r})\n"
+        f"    _by_operation = _BY_OPERATION\n"
+        f"    _server = _SERVER\n\n"
+        f"{methods}"
+    )
+
+
+def write_client_module(filename):
+    """
+    Generates and byte-compiles the client module of a bundled API
+    definition.
+
+    Returns:
+        Path: the generated module.
+    """
+    spec_path = _PACKAGE_DIR / filename
+    with open(spec_path) as f:
+        api_spec = json.load(f)
+    source = generate_client_module(
+        api_spec, filename, spec_digest(spec_path), spec_path.stat().st_size
+    )
+    path = Path(__file__).parent / f"{MODULES[filename]}.py"
+    # Write then rename, so that a concurrent import never sees a partial
+    # module.
+    tmp = path.with_suffix(".py.tmp")
+    tmp.write_text(source)
+    os.replace(tmp, path)
+    py_compile.compile(str(path), doraise=True)
+    return path
+
+
+def main():
+    for filename in MODULES:
+        path = write_client_module(filename)
+        print(path.relative_to(_PACKAGE_DIR.parent))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+
+``exoscale.api.columnar`` converts ``list_*`` results into column-oriented
+tables for analytics.
+
+Nested objects are flattened into dotted column names (``instance-type.id``)
+and columns are typed after the response schema of the operation: integer,
+number and boolean properties are stored in compact :class:`array.array`
+buffers, with a validity mask for missing values; other properties are kept
+as Python lists.
+
+Tables can be handed to NumPy or Arrow without copying numeric buffers, or
+written out as CSV or Parquet. Parquet output is written one row group per
+table, so large exports can be streamed page by page.
+
+Examples:
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.columnar import Table
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> table = Table.for_operation(c, "list_instances")
+    >>> table.extend(c.list_instances())
+    >>> table.columns["instance-type.cpus"]
+    array('q', [2, 8])
+    >>> table.to_arrow().to_pandas()
+"""
+
+import csv
+import json
+from array import array
+
+from .generator import _resolve_type
+from .watch import _list_items
+
+# array.array typecodes of the typed columns. Other columns are lists.
+_TYPECODES = {"integer": "q", "number": "d", "boolean": "b"}
+_NUMPY_DTYPES = {"q": "int64", "d": "float64", "b": "bool"}
+_CONVERTERS = {"q": int, "d": float, "b": bool}
+
+# Nested objects deeper than this are kept whole in a single column.
+_MAX_DEPTH = 3
+
+
+def _deref(api_spec, schema, seen):
+    while "$ref" in schema:
+        ref = schema["$ref"]
+        if ref in seen:
+            # Recursive schema: stop flattening here.
+            return {"type": "object"}
+        seen = seen | {ref}
+        resolved = api_spec
+        for part in ref.split("/")[1:]:
+            resolved = resolved[part]
+        schema = resolved
+    return schema
+
+
+def _fields(api_spec, schema, path=(), seen=frozenset()):
+    """
+    Yields ``(path, typecode)`` for every leaf column of an object schema;
+    ``typecode`` is ``None`` for list-based columns.
+    """
+    schema = _deref(api_spec, schema, seen)
+    properties = schema.get("properties")
+    if properties and len(path) < _MAX_DEPTH:
+        for name, prop in properties.items():
+            yield from _fields(api_spec, prop, path + (name,), seen)
+    else:
+        typ = _resolve_type(schema.get("type"))
+        yield path, _TYPECODES.get(typ)
+
+
+def _items_schema(api_spec, operation):
+    for status_code, response in operation["responses"].items():
+        if not status_code.startswith("2"):
+            continue
+        schema = _deref(
+            api_spec,
+            response["content"]["application/json"]["schema"],
+            frozenset(),
+        )
+        if schema.get("type") != "array":
+            arrays = [
+                prop
+                for prop in schema.get("properties", {}).values()
+                if _deref(api_spec, prop, frozenset()).get("type") == "array"
+            ]
+            if len(arrays) != 1:
+                continue
+            schema = _deref(api_spec, arrays[0], frozenset())
+        return schema["items"]
+    raise ValueError(
+        f"Operation {operation['operationId']!r} does not return a list."
+    )
+
+
+def _get_path(item, path):
+    for key in path:
+        if not isinstance(item, dict):
+            return None
+        item = item.get(key)
+        if item is None:
+            return None
+    return item
+
+
+class Table:
+    """
+    Column-oriented table.
+
+    Args:
+        fields (list): ``(path, typecode)`` tuples, where ``path`` is the
+          tuple of keys leading to the value in an item and ``typecode`` an
+          :mod:`array` typecode (``'q'``, ``'d'`` or ``'b'``) or ``None`` for
+          a list column.
+
+    Attributes:
+        columns (dict): column values by name.
+        validity (dict): for typed columns, an ``array('b')`` holding ``0``
+          where the value is missing.
+    """
+
+    def __init__(self, fields):
+        self.fields = [(tuple(path), typecode) for path, typecode in fields]
+        self.columns = {}
+        self.validity = {}
+        for path, typecode in self.fields:
+            name = ".".join(path)
+            if typecode is None:
+                self.columns[name] = []
+            else:
+                self.columns[name] = array(typecode)
+                self.validity[name] = array("b")
+        self._length = 0
+
+    @classmethod
+    def for_operation(cls, client, operation):
+        """
+        Creates an empty table with the columns of the items returned by an
+        operation of ``client``.
+
+        Args:
+            client: API client, V2 or Partner.
+
+            operation (str): operation name, e.g. ``'list_instances'``.
+        """
+        entry = client._by_operation[operation.replace("_", "-")]
+        op = client._api_spec["paths"][entry["path"]][entry["verb"]]
+        schema = _items_schema(client._api_spec, op)
+        return cls(_fields(client._api_spec, schema))
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return f"<Table columns={len(self.columns)} rows={self._length}>"
+
+    def extend(self, items):
+        """
+        Appends items, given either as a list or as a ``list_*`` result.
+        """
+        if isinstance(items, dict):
+            items = _list_items(items)
+        for path, typecode in self.fields:
+            name = ".".join(path)
+            column = self.columns[name]
+            if typecode is None:
+                column.extend(_get_path(item, path) for item in items)
+                continue
+            convert = _CONVERTERS[typecode]
+            validity = self.validity[name]
+            for item in items:
+                value = _get_path(item, path)
+                if value is None:
+                    column.append(0)
+                    validity.append(0)
+                else:
+                    column.append(convert(value))
+                    validity.append(1)
+        self._length += len(items)
+
+    def rows(self):
+        """
+        Yields rows as tuples, in column order, with ``None`` for missing
+        values.
+        """
+        columns = []
+        for name, column in self.columns.items():
+            if name in self.validity:
+                column = (
+                    v if ok else None
+                    for v, ok in zip(column, self.validity[name], strict=True)
+                )
+            columns.append(column)
+        return zip(*columns, strict=True)
+
+    def to_numpy(self):
+        """
+        Returns the columns as NumPy arrays. Typed columns share the memory
+        of the table and are masked arrays when values are missing. Requires
+        ``numpy``.
+        """
+        import numpy as np
+
+        result = {}
+        for name, column in self.columns.items():
+            if name not in self.validity:
+                values = np.empty(len(column), dtype=object)
+                values[:] = column
+                result[name] = values
+                continue
+            values = np.frombuffer(
+                column, dtype=_NUMPY_DTYPES[column.typecode]
+            )
+            if not all(self.validity[name]):
+                mask = np.frombuffer(self.validity[name], dtype=bool) == 0
+                values = np.ma.MaskedArray(values, mask=mask)
+            result[name] = values
+        return result
+
+    def to_arrow(self):
+        """
+        Returns the table as a ``pyarrow.Table``. Requires ``pyarrow`` and
+        ``numpy``.
+        """
+        import numpy as np
+        import pyarrow as pa
+
+        arrays = {}
+        for name, values in self.to_numpy().items():
+            if isinstance(values, np.ma.MaskedArray):
+                arrays[name] = pa.array(values.data, mask=values.mask)
+            elif values.dtype == object:
+                # Untyped columns are exported as strings, nested values
+                # JSON-encoded, so that every batch shares the same schema.
+                arrays[name] = pa.array(
+                    [
+                        v if v is None or isinstance(v, str) else json.dumps(v)
+                        for v in values
+                    ],
+                    type=pa.string(),
+                )
+            else:
+                arrays[name] = pa.array(values)
+        return pa.table(arrays)
+
+    def write_csv(self, fp, header=True):
+        """
+        Writes the table as CSV to the text file object ``fp``. Missing
+        values are left empty and nested values are JSON-encoded.
+        """
+        writer = csv.writer(fp)
+        if header:
+            writer.writerow(self.columns)
+        for row in self.rows():
+            writer.writerow(
+                json.dumps(v) if isinstance(v, (dict, list)) else v
+                for v in row
+            )
+
+
+def write_parquet(tables, path):
+    """
+    Writes tables sharing the same columns to a Parquet file, one row group
+    per table, so that only one table needs to be in memory at a time.
+    Requires ``pyarrow``.
+
+    Args:
+        tables (iterable): :class:`Table` instances, e.g. built page by page.
+
+        path (str): destination file.
+    """
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for table in tables:
+            arrow_table = table.to_arrow()
+            if writer is None:
+                writer = pq.ParquetWriter(path, arrow_table.schema)
+            writer.write_table(arrow_table)
+    finally:
+        if writer is not None:
+            writer.close()
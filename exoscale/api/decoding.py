@@ -0,0 +1,89 @@
+"""
+
+``exoscale.api.decoding`` decodes API responses into compact Python objects.
+
+Large ``list_*`` responses repeat the same low-cardinality strings (states,
+zone names, instance type and template IDs...) in every item. Decoding with
+``intern_strings`` makes all equal strings of a response share a single
+object. With ``snake_case_keys``, keys are returned in the ``snake_case``
+form used by the arguments of the generated methods (``instance_type``
+instead of ``instance-type``). Free-form ``labels`` keys are left as is.
+
+Both are client options:
+
+Examples:
+    >>> from exoscale.api.v2 import Client
+    >>> c = Client(
+    ...     "api-key",
+    ...     "api-secret",
+    ...     zone="ch-gva-2",
+    ...     intern_strings=True,
+    ...     snake_case_keys=True,
+    ... )
+    >>> c.list_instances()["instances"][0]["instance_type"]
+    {'id': 'b6cd1ff5-3a2f-4e9d-a4d1-8988c1191fe8'}
+"""
+
+import json
+
+# Keys whose value is a free-form mapping, which is not converted.
+_VERBATIM_KEYS = frozenset({"labels"})
+
+
+def _string_hook():
+    strings = {}
+    intern = strings.setdefault
+
+    def hook(pairs):
+        # Keys are already shared by the JSON decoder within a document.
+        return {
+            key: intern(value, value)
+            if type(value) is str
+            else [intern(v, v) if type(v) is str else v for v in value]
+            if type(value) is list
+            else value
+            for key, value in pairs
+        }
+
+    return intern, hook
+
+
+def _snake_case(value, keys):
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if key not in keys:
+                keys[key] = key.replace("-", "_")
+            if key in _VERBATIM_KEYS:
+                result[keys[key]] = item
+            else:
+                result[keys[key]] = _snake_case(item, keys)
+        return result
+    if isinstance(value, list):
+        return [_snake_case(item, keys) for item in value]
+    return value
+
+
+def decode(content, intern_strings=False, snake_case_keys=False):
+    """
+    Decodes a JSON response body.
+
+    Args:
+        content (bytes or str): JSON document.
+
+        intern_strings (bool): make equal keys and string values share a
+          single object.
+
+        snake_case_keys (bool): replace hyphens with underscores in keys,
+          except in ``labels`` mappings.
+    """
+    if intern_strings:
+        intern, hook = _string_hook()
+        result = json.loads(content, object_pairs_hook=hook)
+        if isinstance(result, list):
+            result = [intern(v, v) if type(v) is str else v for v in result]
+    else:
+        result = json.loads(content)
+    if snake_case_keys:
+        result = _snake_case(result, {})
+    return result
@@ -0,0 +1,240 @@
+"""
+
+``exoscale.api.dns`` synchronizes the records of a DNS domain with a desired
+record set, applying the minimal set of changes concurrently.
+
+Examples:
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.dns import sync_dns_domain_records
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> outcomes = sync_dns_domain_records(
+    ...     c,
+    ...     "3a2c1f0e-6b1e-4b1f-9e4e-2b3b6f1c8d9a",
+    ...     [
+    ...         {"name": "www", "type": "A", "content": "194.182.0.1"},
+    ...         {"name": "", "type": "MX", "content": "mx", "priority": 10},
+    ...     ],
+    ...     max_workers=16,
+    ...     rate_limit=20,
+    ... )
+    >>> [(o.action, o.error) for o in outcomes if o.action != "unchanged"]
+    [('create', None), ('delete', None)]
+"""
+
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+UNCHANGED = "unchanged"
+
+# Attributes compared when a desired record matches a current one on name,
+# type and content. They are only compared when set in the desired record.
+_UPDATABLE = ("ttl", "priority")
+
+RecordChange = namedtuple("RecordChange", ["action", "record", "current"])
+RecordChange.__doc__ = """
+A change planned by :func:`plan_dns_domain_records`.
+
+Attributes:
+    action (str): one of ``'create'``, ``'update'``, ``'delete'`` or
+      ``'unchanged'``.
+    record (dict): the desired record, ``None`` for deletions.
+    current (dict): the existing record, ``None`` for creations.
+"""
+
+RecordOutcome = namedtuple(
+    "RecordOutcome", ["action", "record", "current", "result", "error"]
+)
+RecordOutcome.__doc__ = """
+Outcome of a change applied by :func:`sync_dns_domain_records`.
+
+Attributes:
+    action (str): one of ``'create'``, ``'update'``, ``'delete'`` or
+      ``'unchanged'``.
+    record (dict): the desired record, ``None`` for deletions.
+    current (dict): the existing record, ``None`` for creations.
+    result (dict): the operation returned by the API call.
+    error (Exception): the exception raised by the API call, if any.
+"""
+
+
+def _is_system_record(record):
+    # The SOA and apex NS records are managed by the DNS service.
+    return record["type"] == "SOA" or (
+        record["type"] == "NS" and record["name"] == ""
+    )
+
+
+def _needs_update(record, current):
+    return any(k in record and record[k] != current.get(k) for k in _UPDATABLE)
+
+
+def plan_dns_domain_records(current, desired, delete=True):
+    """
+    Computes the minimal list of changes turning the ``current`` records into
+    the ``desired`` ones.
+
+    Records are matched on ``(name, type, content)``; matching records only
+    need an update when their ``ttl`` or ``priority`` differ. The remaining
+    records sharing a name and type are paired into content updates, then
+    the rest is created or deleted.
+
+    Args:
+        current (list): records as returned by ``list_dns_domain_records``.
+
+        desired (list): records with ``name``, ``type``, ``content`` and
+          optionally ``ttl`` and ``priority`` keys.
+
+        delete (bool): whether to delete current records absent from the
+          desired ones. System records (SOA, apex NS) are never deleted.
+
+    Returns:
+        list: :class:`RecordChange` instances.
+    """
+    by_content = defaultdict(list)
+    for record in current:
+        if not _is_system_record(record):
+            key = (record["name"], record["type"], record["content"])
+            by_content[key].append(record)
+
+    changes = []
+    unmatched = []
+    for record in desired:
+        key = (record["name"], record["type"], record["content"])
+        if by_content.get(key):
+            existing = by_content[key].pop()
+            action = UPDATE if _needs_update(record, existing) else UNCHANGED
+            changes.append(RecordChange(action, record, existing))
+        else:
+            unmatched.append(record)
+
+    by_name_type = defaultdict(list)
+    for records in by_content.values():
+        for record in records:
+            by_name_type[(record["name"], record["type"])].append(record)
+
+    for record in unmatched:
+        candidates = by_name_type.get((record["name"], record["type"]))
+        if candidates:
+            changes.append(RecordChange(UPDATE, record, candidates.pop()))
+        else:
+            changes.append(RecordChange(CREATE, record, None))
+
+    if delete:
+        for records in by_name_type.values():
+            for record in records:
+                changes.append(RecordChange(DELETE, None, record))
+    return changes
+
+
+class RateLimiter:
+    """
+    Spaces calls evenly so that at most ``rate`` calls per second are made,
+    across all threads.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _apply(client, domain_id, change, wait):
+    if change.action == CREATE:
+        result = client.create_dns_domain_record(
+            domain_id=domain_id, **_body(change.record)
+        )
+    elif change.action == UPDATE:
+        result = client.update_dns_domain_record(
+            domain_id=domain_id,
+            record_id=change.current["id"],
+            **_body(change.record, exclude=("type",)),
+        )
+    else:
+        result = client.delete_dns_domain_record(
+            domain_id=domain_id, record_id=change.current["id"]
+        )
+    if wait:
+        result = client.wait(result["id"])
+    return result
+
+
+def _body(record, exclude=()):
+    return {
+        k: v
+        for k, v in record.items()
+        if k in {"name", "type", "content", *_UPDATABLE} and k not in exclude
+    }
+
+
+def sync_dns_domain_records(
+    client,
+    domain_id,
+    records,
+    max_workers=8,
+    rate_limit=None,
+    delete=True,
+    wait=True,
+):
+    """
+    Makes the records of a DNS domain match ``records``.
+
+    Current records are fetched once, compared with the desired ones through
+    :func:`plan_dns_domain_records`, and the resulting creations, updates and
+    deletions are applied concurrently. A failing change does not prevent
+    the others from being applied.
+
+    Args:
+        client: API client.
+
+        domain_id (str): DNS domain ID.
+
+        records (list): desired records, see
+          :func:`plan_dns_domain_records`.
+
+        max_workers (int): maximum number of concurrent API calls. Defaults
+          to ``8``.
+
+        rate_limit (float): maximum number of changes started per second.
+          Defaults to ``None`` (unlimited).
+
+        delete (bool): whether to delete records absent from ``records``.
+          Defaults to ``True``.
+
+        wait (bool): whether to wait for each change operation to complete.
+          Defaults to ``True``.
+
+    Returns:
+        list: :class:`RecordOutcome` instances, one per change.
+    """
+    current = client.list_dns_domain_records(domain_id=domain_id)[
+        "dns-domain-records"
+    ]
+    changes = plan_dns_domain_records(current, records, delete=delete)
+    limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    def apply(change):
+        if change.action == UNCHANGED:
+            return RecordOutcome(*change, None, None)
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            result = _apply(client, domain_id, change, wait)
+        except Exception as e:
+            return RecordOutcome(*change, None, e)
+        return RecordOutcome(*change, result, None)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(apply, changes))
@@ -34,3 +34,21 @@ class ExoscaleAPIAuthException(ExoscaleAPIException):
     """
 
     pass
+
+
+class ExoscaleAPICircuitOpenException(ExoscaleAPIServerException):
+    """
+    For calls rejected without being sent, the circuit breaker of the
+    endpoint being open after too many server-side errors.
+    """
+
+    pass
+
+
+class ExoscaleAPIQuotaExceededException(ExoscaleAPIClientException):
+    """
+    For calls rejected without being sent, as they would exceed a quota of
+    the organization.
+    """
+
+    pass
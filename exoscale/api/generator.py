@@ -1,13 +1,23 @@
 import copy
+import json
+import os
+import pickle
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import partial
 from itertools import chain
 
 import requests
 
+from .circuit import get_circuit_breaker
+from .decoding import decode
 from .exceptions import (
     ExoscaleAPIAuthException,
     ExoscaleAPIClientException,
     ExoscaleAPIServerException,
 )
+from .session import wire_bytes
 
 
 def _get_in(payload, keys):
@@ -115,13 +125,47 @@ def _return_docstring(api_spec, operation):
     return "\n\n        ".join(status_codes_docs)
 
 
+def _copy_error(error):
+    """
+    Returns a new exception equal to ``error``, or ``error`` itself if it
+    can not be copied.
+    """
+    try:
+        return copy.copy(error)
+    except Exception:
+        return error
+
+
+class _Flight:
+    """
+    A request in flight, whose outcome is shared by identical calls.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.followers = 0
+        # False if the request was interrupted before completing.
+        self.completed = False
+        self.result = None
+        self.error = None
+
+
 class BaseClient:
     _api_spec = None
     _by_operation = None
-
-    def __init__(self, url=None, **kwargs):
+    _server = None
+
+    def __init__(
+        self,
+        url=None,
+        coalesce=False,
+        circuit_breaker=False,
+        intern_strings=False,
+        snake_case_keys=False,
+        **kwargs,
+    ):
         if url is None:
-            server = self._api_spec["servers"][0]
+            server = self._server
             variables = {
                 var_name: var["default"]
                 for var_name, var in server["variables"].items()
@@ -142,11 +186,25 @@ class BaseClient:
             self.endpoint = url
 
         self.http_client = requests.Session()
+        self.coalesce = coalesce
+        if circuit_breaker is True:
+            circuit_breaker = get_circuit_breaker(self.endpoint)
+        self.circuit_breaker = circuit_breaker or None
+        self.intern_strings = intern_strings
+        self.snake_case_keys = snake_case_keys
+        self.stats = Counter()
+        # Response counts and sizes by operation.
+        self.transfer_stats = defaultdict(Counter)
+        self._stats_lock = threading.Lock()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
 
     def __repr__(self):
         return f"<Client endpoint={self.endpoint}>"
 
-    def _call_operation(self, operation_id, parameters=None, body=None):
+    def _call_operation(
+        self, operation_id, parameters=None, body=None, headers=None
+    ):
         op = self._by_operation[operation_id]
 
         path = op["path"]
@@ -169,23 +227,105 @@ class BaseClient:
 
         url = f"{self.endpoint}{path}"
 
-        json = {}
+        kwargs = {}
         if body is not None:
             # TODO validate
-            json["json"] = body
-
+            kwargs["json"] = body
+        if headers is not None:
+            kwargs["headers"] = headers
+
+        if self.coalesce and op["verb"] == "get" and not kwargs:
+            return self._call_coalesced(operation_id, url, query_params)
+        return self._send(operation_id, url, query_params, **kwargs)
+
+    def _call_coalesced(self, operation_id, url, query_params):
+        """
+        Sends a read request, unless an identical one is already in flight,
+        in which case its outcome is shared: callers other than the one
+        which sent the request get a copy of the result, or of the error,
+        chained to the original. If the request is interrupted (e.g. by
+        ``KeyboardInterrupt``), waiting callers send it again.
+        """
+        key = (url, json.dumps(query_params, sort_keys=True, default=str))
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+                self.stats["coalesced"] += 1
+        if not leader:
+            flight.done.wait()
+            if not flight.completed:
+                return self._call_coalesced(operation_id, url, query_params)
+            if flight.error is not None:
+                # Each caller gets its own exception and traceback.
+                raise _copy_error(flight.error) from flight.error
+            return copy.deepcopy(flight.result)
+        try:
+            flight.result = self._send(operation_id, url, query_params)
+            flight.completed = True
+        except Exception as e:
+            flight.error = e
+            flight.completed = True
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+        # Followers copy the result once it is set: the original can only
+        # be handed out when nobody else is using it.
+        if flight.followers:
+            return copy.deepcopy(flight.result)
+        return flight.result
+
+    def _send(self, operation_id, url, query_params, **kwargs):
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return self._send_request(
+                operation_id, url, query_params, **kwargs
+            )
+        probe = breaker.before_call()
+        start = time.monotonic()
+        try:
+            result = self._send_request(
+                operation_id, url, query_params, **kwargs
+            )
+        except BaseException as e:
+            # Also on interruptions, to release a half-open probe slot.
+            breaker.after_call(time.monotonic() - start, e, probe)
+            raise
+        breaker.after_call(time.monotonic() - start, probe=probe)
+        return result
+
+    def _record_transfer(self, operation_id, response):
+        decoded = len(response.content)
+        wire = wire_bytes(response)
+        with self._stats_lock:
+            stats = self.transfer_stats[operation_id]
+            stats["responses"] += 1
+            stats["wire_bytes"] += wire
+            stats["decoded_bytes"] += decoded
+            self.stats["wire_bytes"] += wire
+            self.stats["decoded_bytes"] += decoded
+
+    def _send_request(self, operation_id, url, query_params, **kwargs):
+        method = self._by_operation[operation_id]["verb"].upper()
         # list-zones returns public data but the server enforces IAM role policies
         # on authenticated requests — restricted keys (e.g. DBaaS-only) get 403.
         # Send the request without credentials so it always succeeds.
         if operation_id == "list-zones":
             response = requests.request(
-                method=op["verb"].upper(), url=url, params=query_params, **json
+                method=method, url=url, params=query_params, **kwargs
             )
         else:
             response = self.http_client.request(
-                method=op["verb"].upper(), url=url, params=query_params, **json
+                method=method, url=url, params=query_params, **kwargs
             )
 
+        self._record_transfer(operation_id, response)
+
         # Error handling
         if response.status_code == 403:
             raise ExoscaleAPIAuthException(
@@ -203,9 +343,76 @@ class BaseClient:
                 response,
             )
 
+        if response.status_code == 204 or not response.content:
+            return None
+        if self.intern_strings or self.snake_case_keys:
+            return decode(
+                response.content, self.intern_strings, self.snake_case_keys
+            )
         return response.json()
 
 
+def _client_from_environment(cls, secret_env, key, **kwargs):
+    """
+    Builds an unpickled client, reading its API secret from the
+    ``secret_env`` environment variable of the unpickling process.
+    """
+    secret = os.environ.get(secret_env)
+    if secret is None:
+        raise pickle.UnpicklingError(
+            f"The {secret_env} environment variable holding the API secret"
+            " of the client is not set."
+        )
+    return cls(key, secret, pickle_secret=secret_env, **kwargs)
+
+
+def _reduce_client(client):
+    """
+    Pickles a client as the arguments needed to build an equivalent client:
+    the HTTP session and the API definition are not serialized, the class is
+    looked up by name in the unpickling process.
+
+    The API secret is only pickled with ``pickle_secret=True``, or as the
+    name of the environment variable holding it.
+    """
+    options = {
+        "url": client.endpoint,
+        "thread_safe": client.thread_safe,
+        "http2": client.http2,
+        "coalesce": client.coalesce,
+        "circuit_breaker": client.circuit_breaker or False,
+        "intern_strings": client.intern_strings,
+        "snake_case_keys": client.snake_case_keys,
+    }
+    if client.pickle_secret is True:
+        return (
+            partial(type(client), pickle_secret=True, **options),
+            (client.key, client._secret),
+        )
+    if isinstance(client.pickle_secret, str):
+        return (
+            partial(
+                _client_from_environment,
+                type(client),
+                client.pickle_secret,
+                **options,
+            ),
+            (client.key,),
+        )
+    raise pickle.PicklingError(
+        "Pickling the client would include its API secret: create it with"
+        " pickle_secret=True to allow it, or pickle_secret set to the name of"
+        " an environment variable holding the secret."
+    )
+
+
+def _returns_section(docstring):
+    """
+    Returns the "Returns:" section of a generated method docstring.
+    """
+    return docstring.split("Returns:", 1)[1].strip()
+
+
 def _args_docstring(parameters, body):
     return "\n\n        ".join(chain(parameters.values(), body.values()))
 
@@ -308,6 +515,34 @@ def _client_docstring(api_spec):
 
         url (str): Endpoint URL to use. Defaults to ``{default_server!r}``.
 
+        thread_safe (bool): Give each thread its own HTTP session, so that
+          the client can be shared between threads. Defaults to ``False``.
+
+        http2 (bool): Send requests over HTTP/2, multiplexed over a single
+          connection, with ``httpx``. Defaults to ``False``.
+
+        pickle_secret (bool or str): How the API secret is pickled with the
+          client, e.g. to be sent to a process pool: ``True`` to include it
+          in clear text, or the name of an environment variable holding it
+          in the unpickling process. Defaults to ``False``, which prevents
+          pickling the client.
+
+        coalesce (bool): Share a single request between concurrent identical
+          ``GET`` calls. Defaults to ``False``.
+
+        circuit_breaker (bool or CircuitBreaker): Fail fast while the
+          endpoint is failing, with the breaker shared by the clients of the
+          endpoint if ``True``. See :mod:`exoscale.api.circuit`. Defaults to
+          ``False``.
+
+        intern_strings (bool): Make equal strings of a response share a
+          single object. See :mod:`exoscale.api.decoding`. Defaults to
+          ``False``.
+
+        snake_case_keys (bool): Return response keys in ``snake_case``.
+          Helpers of this package expect the default keys. Defaults to
+          ``False``.
+
         {dynamic_args}
 
     Returns:
@@ -334,7 +569,42 @@ def _client_docstring(api_spec):
     )
 
 
-def create_client_class(api_spec):
+class _LazyOperation:
+    """
+    Class attribute standing for a generated operation method, which is only
+    built on first access and then replaces the descriptor on the class.
+    """
+
+    def __init__(self, py_operation_name, operation_name):
+        self.py_operation_name = py_operation_name
+        self.operation_name = operation_name
+
+    def __set_name__(self, owner, name):
+        self.owner = owner
+
+    def __get__(self, instance, owner=None):
+        op_fn = _create_operation_call(
+            self.py_operation_name,
+            self.operation_name,
+            self.owner._by_operation[self.operation_name]["operation"],
+            self.owner._api_spec,
+        )
+        setattr(self.owner, self.py_operation_name, op_fn)
+        return op_fn.__get__(instance, owner)
+
+
+def create_client_class(api_spec, lazy=None):
+    """
+    Creates a client class with one method per operation of ``api_spec``.
+
+    When ``lazy`` is set, methods (and their docstrings) are only generated
+    on first access, which makes creating the class much cheaper when only a
+    few operations end up being used. Defaults to ``True`` when the
+    ``EXOSCALE_API_LAZY`` environment variable is set to a non-empty value
+    other than ``0``, ``False`` otherwise.
+    """
+    if lazy is None:
+        lazy = os.environ.get("EXOSCALE_API_LAZY", "") not in {"", "0"}
     by_operation = {}
     for path, item in api_spec["paths"].items():
         for verb, operation in item.items():
@@ -363,11 +633,17 @@ def create_client_class(api_spec):
     class_attributes = {
         "_api_spec": api_spec,
         "_by_operation": by_operation,
+        "_server": api_spec["servers"][0],
         "__doc__": _client_docstring(api_spec),
     }
 
     for operation_name, operation in by_operation.items():
         py_operation_name = operation_name.replace("-", "_")
+        if lazy:
+            class_attributes[py_operation_name] = _LazyOperation(
+                py_operation_name, operation_name
+            )
+            continue
         op_fn = _create_operation_call(
             py_operation_name,
             operation_name,
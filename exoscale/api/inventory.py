@@ -0,0 +1,204 @@
+"""
+
+``exoscale.api.inventory`` keeps an in-memory snapshot of the resources of a
+zone, indexed for constant-time lookups by id, name, label, IP address and
+security group membership.
+
+Examples:
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.inventory import Inventory
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> inventory = Inventory(c)
+    >>> inventory.refresh()
+    >>> inventory.find_by_label("env", "prod")
+    [{'id': '8561ee34-09f0-42da-a765-abde807f944b', 'name': 'web-1', ...}]
+    >>> inventory.find_by_ip("194.182.0.1")
+    [{'id': '8561ee34-09f0-42da-a765-abde807f944b', 'name': 'web-1', ...}]
+
+    Refreshing only the instances, re-indexing only what changed:
+
+    >>> inventory.refresh("instances")
+    [WatchEvent(type='changed', operation='list_instances', ...)]
+"""
+
+from collections import defaultdict
+
+from .watch import ADDED, REMOVED, _diff, _list_items, _operation_method
+
+RESOURCES = {
+    "instances": "list_instances",
+    "security-groups": "list_security_groups",
+    "load-balancers": "list_load_balancers",
+    "private-networks": "list_private_networks",
+    "elastic-ips": "list_elastic_ips",
+    "block-storage-volumes": "list_block_storage_volumes",
+}
+
+_IP_FIELDS = ("public-ip", "ipv6-address", "ip")
+
+
+def _index_entries(item):
+    """
+    Yields ``(index, key, item_id)`` tuples for every index entry of an item.
+    """
+    item_id = item["id"]
+    if "name" in item:
+        yield "name", item["name"], item_id
+    for k, v in (item.get("labels") or {}).items():
+        yield "label", (k, v), item_id
+        yield "label", (k, None), item_id
+    for field in _IP_FIELDS:
+        if item.get(field):
+            yield "ip", item[field], item_id
+    for sg in item.get("security-groups") or []:
+        yield "security-group", sg["id"], item_id
+    # Private network leases map private addresses to instances.
+    for lease in item.get("leases") or []:
+        if lease.get("ip") and lease.get("instance-id"):
+            yield "ip", lease["ip"], lease["instance-id"]
+
+
+class Inventory:
+    """
+    Indexed snapshot of the resources returned by ``list_*`` operations.
+
+    Args:
+        client: API client used to list the resources.
+
+        resources (list): resource types to track, among the keys of
+          :data:`RESOURCES`. Defaults to all of them.
+    """
+
+    def __init__(self, client, resources=None):
+        if resources is None:
+            resources = list(RESOURCES)
+        for resource in resources:
+            if resource not in RESOURCES:
+                raise TypeError(f"Unhandled resource type {resource!r}.")
+        self.resources = list(resources)
+        self._methods = {
+            resource: _operation_method(client, RESOURCES[resource])
+            for resource in self.resources
+        }
+        self._snapshots = {resource: {} for resource in self.resources}
+        self._by_id = {}
+        self._indexes = {
+            "name": defaultdict(set),
+            "label": defaultdict(set),
+            "ip": defaultdict(set),
+            "security-group": defaultdict(set),
+        }
+
+    def __repr__(self):
+        counts = " ".join(
+            f"{resource}={len(self._snapshots[resource])}"
+            for resource in self.resources
+        )
+        return f"<Inventory {counts}>"
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, item_id):
+        return item_id in self._by_id
+
+    def _index(self, resource, item):
+        self._by_id[item["id"]] = (resource, item)
+        for index, key, item_id in _index_entries(item):
+            self._indexes[index][key].add(item_id)
+
+    def _unindex(self, item):
+        self._by_id.pop(item["id"], None)
+        for index, key, item_id in _index_entries(item):
+            ids = self._indexes[index].get(key)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self._indexes[index][key]
+
+    def refresh(self, *resources):
+        """
+        Lists the given resource types (all tracked types by default) and
+        updates the indexes. Only added, removed and changed items are
+        re-indexed.
+
+        Returns:
+            list: :class:`exoscale.api.watch.WatchEvent` instances describing
+            the changes since the previous refresh.
+        """
+        if not resources:
+            resources = self.resources
+        events = []
+        for resource in resources:
+            if resource not in self._snapshots:
+                raise TypeError(f"Untracked resource type {resource!r}.")
+            items = _list_items(self._methods[resource]())
+            self._snapshots[resource], resource_events = _diff(
+                self._snapshots[resource], items, "id", RESOURCES[resource]
+            )
+            for event in resource_events:
+                if event.type != ADDED:
+                    self._unindex(event.previous)
+                if event.type != REMOVED:
+                    self._index(resource, event.item)
+            events.extend(resource_events)
+        return events
+
+    def _lookup(self, index, key, resource=None):
+        items = []
+        for item_id in self._indexes[index].get(key, ()):
+            found = self._by_id.get(item_id)
+            if found is None:
+                continue
+            item_resource, item = found
+            if resource is None or item_resource == resource:
+                items.append(item)
+        return items
+
+    def get(self, item_id):
+        """
+        Returns the item with the given id, or ``None``.
+        """
+        found = self._by_id.get(item_id)
+        return None if found is None else found[1]
+
+    def resource_type(self, item_id):
+        """
+        Returns the resource type of the item with the given id, or ``None``.
+        """
+        found = self._by_id.get(item_id)
+        return None if found is None else found[0]
+
+    def items(self, resource):
+        """
+        Returns all the items of a resource type.
+        """
+        return list(self._snapshots[resource].values())
+
+    def find_by_name(self, name, resource=None):
+        """
+        Returns the items named ``name``, optionally restricted to a
+        resource type.
+        """
+        return self._lookup("name", name, resource)
+
+    def find_by_label(self, key, value=None, resource=None):
+        """
+        Returns the items carrying label ``key``, with the given ``value``
+        if set.
+        """
+        return self._lookup("label", (key, value), resource)
+
+    def find_by_ip(self, ip, resource=None):
+        """
+        Returns the items holding IP address ``ip``: instance public
+        addresses, Elastic IPs, load balancer addresses, and instances
+        leasing a private network address.
+        """
+        return self._lookup("ip", ip, resource)
+
+    def find_by_security_group(self, security_group_id):
+        """
+        Returns the instances member of a security group.
+        """
+        return self._lookup("security-group", security_group_id)
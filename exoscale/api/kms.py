@@ -0,0 +1,365 @@
+"""
+
+``exoscale.api.kms`` encrypts data locally with data keys protected by a KMS
+key (envelope encryption).
+
+The ``encrypt`` and ``decrypt`` operations cost one API call per payload. An
+:class:`EnvelopeCipher` instead asks KMS for a data key once, encrypts
+payloads locally with AES-GCM, and stores the data key, wrapped by the KMS
+key, in the header of each envelope. Unwrapped data keys are cached for a
+limited time and number of uses, so that encrypting or decrypting many
+payloads takes a handful of API calls.
+
+Envelopes have the following layout (integers are big-endian)::
+
+    b"EXK1"
+    key ID length (1 byte), KMS key ID
+    wrapped data key length (2 bytes), wrapped data key
+    salt (16 bytes)
+    segments: ciphertext length (4 bytes), ciphertext
+
+Each envelope is encrypted with its own key, derived from the data key and
+the random salt. Payloads are split in segments numbered in their nonce, the
+last one being flagged, so that segments can not be reordered, dropped or
+truncated. Large files are encrypted and decrypted as streams, one segment
+at a time.
+
+Requires the ``kms`` extra (``pip install exoscale[kms]``).
+
+Examples:
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.kms import EnvelopeCipher
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> cipher = EnvelopeCipher(c, "5ba2d1e6-3c8a-4d1b-9a0e-04d5e1b6b7a3")
+    >>> envelopes = [cipher.encrypt(record) for record in records]
+    >>> cipher.decrypt(envelopes[0]) == records[0]
+    True
+    >>> with open("dump.sql", "rb") as src, open("dump.enc", "wb") as dst:
+    ...     cipher.encrypt_stream(src, dst)
+    >>> cipher.stats
+    Counter({'cache_hits': 1001, 'generated': 1})
+"""
+
+import base64
+import io
+import os
+import struct
+import threading
+import time
+from collections import Counter, OrderedDict
+
+MAGIC = b"EXK1"
+_SALT_SIZE = 16
+_SEGMENT = struct.Struct(">I")
+# Flag of the last segment, in its length.
+_LAST = 1 << 31
+
+
+def _time():
+    return time.monotonic()
+
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+
+def _derive_key(data_key, salt):
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+    return AESGCM(
+        HKDF(
+            algorithm=hashes.SHA256(), length=32, salt=salt, info=MAGIC
+        ).derive(data_key)
+    )
+
+
+def _nonce(index, last):
+    return index.to_bytes(11, "big") + (b"\x01" if last else b"\x00")
+
+
+def _read_exactly(src, size):
+    data = src.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated envelope.")
+    return data
+
+
+def _read_header(src):
+    if _read_exactly(src, len(MAGIC)) != MAGIC:
+        raise ValueError("Not an envelope.")
+    key_id = _read_exactly(src, _read_exactly(src, 1)[0]).decode()
+    (size,) = struct.unpack(">H", _read_exactly(src, 2))
+    wrapped = _read_exactly(src, size)
+    salt = _read_exactly(src, _SALT_SIZE)
+    return key_id, wrapped, salt
+
+
+def _header(key_id, wrapped, salt):
+    key_id = key_id.encode()
+    return b"".join(
+        [
+            MAGIC,
+            bytes([len(key_id)]),
+            key_id,
+            struct.pack(">H", len(wrapped)),
+            wrapped,
+            salt,
+        ]
+    )
+
+
+class _DataKey:
+    def __init__(self, plaintext, wrapped):
+        self.plaintext = plaintext
+        self.wrapped = wrapped
+        self.created = _time()
+        self.uses = 0
+
+
+class EnvelopeCipher:
+    """
+    Encrypts and decrypts envelopes with data keys of a KMS key. Safe to
+    share between threads.
+
+    Args:
+        client: API client.
+
+        key_id (str): ID of the KMS key wrapping the data keys of new
+          envelopes. Envelopes wrapped by other keys can be decrypted too.
+
+        encryption_context (bytes): additional authenticated data bound to
+          the data keys by KMS. The same context must be given to decrypt.
+
+        ttl (float): time in seconds during which a data key is reused and
+          an unwrapped data key is cached. Defaults to ``300``.
+
+        max_uses (int): maximum number of envelopes encrypted or decrypted
+          with a data key before a new one is generated or it is unwrapped
+          again. Defaults to ``100000``.
+
+        cache_size (int): maximum number of unwrapped data keys cached for
+          decryption. Defaults to ``1000``.
+
+        segment_size (int): size in bytes of the plaintext segments.
+          Defaults to 64 KiB.
+    """
+
+    def __init__(
+        self,
+        client,
+        key_id,
+        encryption_context=None,
+        ttl=300,
+        max_uses=100000,
+        cache_size=1000,
+        segment_size=64 * 1024,
+    ):
+        self.client = client
+        self.key_id = key_id
+        self.encryption_context = encryption_context
+        self.ttl = ttl
+        self.max_uses = max_uses
+        self.cache_size = cache_size
+        self.segment_size = segment_size
+        self.stats = Counter()
+        self._data_key = None
+        self._generate_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<EnvelopeCipher key_id={self.key_id}>"
+
+    def _context(self):
+        if self.encryption_context is None:
+            return {}
+        return {"encryption_context": _b64(self.encryption_context)}
+
+    def _expired(self, data_key):
+        return (
+            _time() - data_key.created >= self.ttl
+            or data_key.uses >= self.max_uses
+        )
+
+    def _use(self, data_key):
+        """
+        Counts a use of ``data_key`` if it may still be used.
+        """
+        with self._lock:
+            if data_key is None or self._expired(data_key):
+                return False
+            data_key.uses += 1
+            self.stats["cache_hits"] += 1
+            return True
+
+    def _encryption_key(self):
+        data_key = self._data_key
+        if self._use(data_key):
+            return data_key
+        with self._generate_lock:
+            # Another thread may have generated a key in the meantime.
+            data_key = self._data_key
+            if self._use(data_key):
+                return data_key
+            response = self.client.generate_data_key(
+                id=self.key_id, key_spec="AES-256", **self._context()
+            )
+            data_key = _DataKey(
+                base64.b64decode(response["plaintext"]),
+                base64.b64decode(response["ciphertext"]),
+            )
+            data_key.uses = 1
+            with self._lock:
+                self.stats["generated"] += 1
+                self._data_key = data_key
+                # Envelopes encrypted with it are decrypted without KMS.
+                self._cache_put(
+                    (self.key_id, data_key.wrapped),
+                    _DataKey(data_key.plaintext, data_key.wrapped),
+                )
+            return data_key
+
+    def _cache_put(self, cache_key, data_key):
+        self._cache[cache_key] = data_key
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _decryption_key(self, key_id, wrapped):
+        cache_key = (key_id, wrapped)
+        with self._lock:
+            data_key = self._cache.get(cache_key)
+            if data_key is not None and not self._expired(data_key):
+                data_key.uses += 1
+                self._cache.move_to_end(cache_key)
+                self.stats["cache_hits"] += 1
+                return data_key.plaintext
+        response = self.client.decrypt(
+            id=key_id, ciphertext=_b64(wrapped), **self._context()
+        )
+        data_key = _DataKey(base64.b64decode(response["plaintext"]), wrapped)
+        data_key.uses = 1
+        with self._lock:
+            self.stats["unwrapped"] += 1
+            self._cache_put(cache_key, data_key)
+        return data_key.plaintext
+
+    def clear(self):
+        """
+        Forgets all the cached data keys.
+        """
+        with self._lock:
+            self._data_key = None
+            self._cache.clear()
+
+    def encrypt_stream(self, src, dst):
+        """
+        Encrypts the content of a binary file object into another one.
+
+        Args:
+            src: readable binary file object.
+
+            dst: writable binary file object.
+        """
+        data_key = self._encryption_key()
+        salt = os.urandom(_SALT_SIZE)
+        aead = _derive_key(data_key.plaintext, salt)
+        dst.write(_header(self.key_id, data_key.wrapped, salt))
+        index = 0
+        segment = src.read(self.segment_size)
+        while True:
+            # Reading one segment ahead tells which one is the last.
+            following = src.read(self.segment_size) if segment else b""
+            last = not following
+            ciphertext = aead.encrypt(_nonce(index, last), segment, MAGIC)
+            dst.write(_SEGMENT.pack(len(ciphertext) | (_LAST if last else 0)))
+            dst.write(ciphertext)
+            if last:
+                return
+            segment = following
+            index += 1
+
+    def decrypt_stream(self, src, dst):
+        """
+        Decrypts an envelope read from a binary file object into another
+        one. Segments are written as soon as they are authenticated: if
+        decryption fails, ``dst`` holds a prefix of the payload.
+
+        Args:
+            src: readable binary file object.
+
+            dst: writable binary file object.
+
+        Raises:
+            ValueError: if the envelope is malformed, truncated or was not
+              encrypted with the data key and encryption context.
+        """
+        from cryptography.exceptions import InvalidTag
+
+        key_id, wrapped, salt = _read_header(src)
+        aead = _derive_key(self._decryption_key(key_id, wrapped), salt)
+        index = 0
+        while True:
+            (size,) = _SEGMENT.unpack(_read_exactly(src, _SEGMENT.size))
+            last = bool(size & _LAST)
+            ciphertext = _read_exactly(src, size & ~_LAST)
+            try:
+                segment = aead.decrypt(_nonce(index, last), ciphertext, MAGIC)
+            except InvalidTag:
+                raise ValueError("Envelope authentication failed.") from None
+            dst.write(segment)
+            if last:
+                if src.read(1):
+                    raise ValueError("Trailing data after envelope.")
+                return
+            index += 1
+
+    def encrypt(self, data):
+        """
+        Encrypts ``data`` (bytes), returning an envelope (bytes).
+        """
+        dst = io.BytesIO()
+        self.encrypt_stream(io.BytesIO(data), dst)
+        return dst.getvalue()
+
+    def decrypt(self, envelope):
+        """
+        Decrypts an envelope (bytes), returning its payload (bytes).
+
+        Raises:
+            ValueError: if the envelope is malformed, truncated or was not
+              encrypted with the data key and encryption context.
+        """
+        dst = io.BytesIO()
+        self.decrypt_stream(io.BytesIO(envelope), dst)
+        return dst.getvalue()
+
+    def rewrap(self, envelope, key_id, encryption_context=None):
+        """
+        Returns ``envelope`` with its data key wrapped by another KMS key,
+        without decrypting the payload. Its data key is unwrapped and
+        wrapped again by KMS with the ``re-encrypt`` operation.
+
+        Args:
+            envelope (bytes): envelope to rewrap.
+
+            key_id (str): ID of the destination KMS key.
+
+            encryption_context (bytes): encryption context of the
+              destination key. Defaults to ``None``.
+        """
+        src = io.BytesIO(envelope)
+        source_key_id, wrapped, salt = _read_header(src)
+        source = {"key": source_key_id, "ciphertext": _b64(wrapped)}
+        if self.encryption_context is not None:
+            source["encryption-context"] = _b64(self.encryption_context)
+        destination = {"key": key_id}
+        if encryption_context is not None:
+            destination["encryption-context"] = _b64(encryption_context)
+        response = self.client.re_encrypt(
+            id=source_key_id, source=source, destination=destination
+        )
+        wrapped = base64.b64decode(response["ciphertext"])
+        return _header(key_id, wrapped, salt) + src.read()
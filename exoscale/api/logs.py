@@ -0,0 +1,163 @@
+"""
+
+``exoscale.api.logs`` follows the logs of AI deployments and DBaaS services,
+yielding new log entries as they appear.
+
+Each poll only returns what was not seen before: DBaaS logs are resumed from
+the opaque offset returned by the API, deployment logs from the timestamp of
+the last entry seen. The polling interval shrinks while logs are flowing and
+grows while they are idle.
+
+Examples:
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.logs import follow_deployment_logs
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> for entry in follow_deployment_logs(c, "8561ee34-..."):
+    ...     print(entry["time"], entry["message"])
+    2025-03-10T14:52:34Z Loading model weights
+"""
+
+import time
+from collections import Counter
+from datetime import datetime
+
+
+def _sleep(seconds):
+    return time.sleep(seconds)
+
+
+class _AdaptiveInterval:
+    """
+    Poll interval reset to ``minimum`` when a poll returned entries and
+    doubled, up to ``maximum``, when it did not.
+    """
+
+    def __init__(self, minimum, maximum):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.value = minimum
+
+    def update(self, got_entries):
+        if got_entries:
+            self.value = self.minimum
+        else:
+            self.value = min(self.value * 2, self.maximum)
+        return self.value
+
+
+def _parse_time(value):
+    # datetime.fromisoformat() only accepts the "Z" suffix from Python 3.11.
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+
+def _entry_key(entry):
+    return entry.get("node"), entry.get("message")
+
+
+def follow_deployment_logs(
+    client, id, since=None, tail=100, min_interval=1, max_interval=30
+):
+    """
+    Yields the log entries of an AI deployment as they appear.
+
+    Args:
+        client: API client.
+
+        id (str): deployment ID.
+
+        since (str): only yield entries logged after this ISO 8601
+          timestamp, e.g. the ``time`` of the last entry of a previous run.
+          Defaults to ``None``, which starts with the latest ``tail``
+          entries.
+
+        tail (int): number of latest entries fetched by each poll. Entries
+          beyond this count logged between two polls are missed, so it
+          should cover the log volume of ``max_interval`` seconds.
+
+        min_interval (float): shortest time in seconds between two polls.
+
+        max_interval (float): longest time in seconds between two polls.
+
+    Yields:
+        dict: log entries, with ``time``, ``node`` and ``message`` keys.
+    """
+    last_time = _parse_time(since) if since is not None else None
+    # Occurrences of the entries sharing the last timestamp seen, to tell
+    # them apart from new entries logged during the same instant, identical
+    # ones included. Only these are remembered.
+    seen_at_last_time = Counter()
+    interval = _AdaptiveInterval(min_interval, max_interval)
+    while True:
+        logs = client.get_deployment_logs(id=id, tail=tail)["logs"]
+        new = []
+        # Occurrences of the entries at the last timestamp in this poll.
+        polled_at_last_time = Counter()
+        for entry in sorted(logs, key=lambda e: _parse_time(e["time"])):
+            entry_time = _parse_time(entry["time"])
+            key = _entry_key(entry)
+            if last_time is None or entry_time > last_time:
+                last_time = entry_time
+                seen_at_last_time = Counter()
+                polled_at_last_time = Counter()
+            elif entry_time < last_time:
+                continue
+            polled_at_last_time[key] += 1
+            if polled_at_last_time[key] <= seen_at_last_time[key]:
+                continue
+            seen_at_last_time[key] += 1
+            new.append(entry)
+        yield from new
+        _sleep(interval.update(bool(new)))
+
+
+def follow_dbaas_service_logs(
+    client,
+    service_name,
+    offset=None,
+    limit=100,
+    min_interval=1,
+    max_interval=30,
+):
+    """
+    Yields the log entries of a DBaaS service as they appear.
+
+    Args:
+        client: API client.
+
+        service_name (str): DBaaS service name.
+
+        offset (str): opaque offset to resume from, as returned by a previous
+          ``get_dbaas_service_logs`` call. Defaults to ``None``, which starts
+          with the latest ``limit`` entries.
+
+        limit (int): maximum number of entries fetched per call, up to 500.
+
+        min_interval (float): shortest time in seconds between two polls.
+
+        max_interval (float): longest time in seconds between two polls.
+
+    Yields:
+        dict: log entries, with ``time``, ``unit``, ``node`` and ``message``
+        keys.
+    """
+    interval = _AdaptiveInterval(min_interval, max_interval)
+    if offset is None:
+        page = client.get_dbaas_service_logs(
+            service_name=service_name, limit=limit, sort_order="desc"
+        )
+        yield from reversed(page.get("logs", []))
+        # In descending order, the first entry is the most recent one.
+        offset = page.get("first-log-offset")
+    while True:
+        kwargs = {"offset": offset} if offset is not None else {}
+        page = client.get_dbaas_service_logs(
+            service_name=service_name, limit=limit, sort_order="asc", **kwargs
+        )
+        logs = page.get("logs", [])
+        yield from logs
+        offset = page.get("offset", offset)
+        # A full page means more entries are already waiting.
+        if len(logs) < limit:
+            _sleep(interval.update(bool(logs)))
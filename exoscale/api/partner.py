@@ -6,15 +6,368 @@ distributors to manage sub-organizations.
 """
 
 import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-from .generator import create_client_class
-from .v2 import Client as V2Client
+import requests
 
+from .exceptions import ExoscaleAPIClientException, ExoscaleAPIServerException
+from .codegen import load_generated_client
+from .generator import _reduce_client, create_client_class
+from .session import create_session
 
-with open(Path(__file__).parent.parent / "partner-api.json", "r") as f:
-    partner_api_spec = json.load(f)
-    BasePartnerClient = create_client_class(partner_api_spec)
+
+BasePartnerClient = load_generated_client("partner-api.json")
+if BasePartnerClient is None:
+    with open(Path(__file__).parent.parent / "partner-api.json", "r") as f:
+        BasePartnerClient = create_client_class(json.load(f))
+
+
+def __getattr__(name):
+    # The API definition is only loaded when needed by generated clients.
+    if name == "partner_api_spec":
+        return BasePartnerClient._api_spec
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+OrganizationUsage = namedtuple("OrganizationUsage", ["id", "usage", "error"])
+OrganizationUsage.__doc__ = """
+Usage statements of one organization.
+
+Attributes:
+    id (str): organization ID.
+    usage (list): usage statements, as returned by
+      ``list_distributor_organization_usage``. ``None`` on error.
+    error (Exception): the last exception raised while fetching the usage,
+      if any.
+"""
+
+UsageSummary = namedtuple(
+    "UsageSummary", ["totals", "organizations", "errors"]
+)
+UsageSummary.__doc__ = """
+Aggregated usage of several organizations.
+
+Attributes:
+    totals (dict): amounts by period (``YYYY-MM``) and currency, e.g.
+      ``{"2025-01": {"CHF": {"total-excl-vat": 10.0, "total-incl-vat":
+      10.81}}}``.
+    organizations (int): number of organizations aggregated.
+    errors (list): :class:`OrganizationUsage` instances of the organizations
+      whose usage could not be fetched.
+"""
+
+
+def _sleep(seconds):
+    return time.sleep(seconds)
+
+
+def _retry_delay(attempt):
+    return min(2**attempt, 30)
+
+
+def _retryable(error):
+    """
+    Tells whether a failed call can succeed if sent again: server and
+    connection errors, and rate limiting (HTTP 429).
+    """
+    if isinstance(error, ExoscaleAPIClientException):
+        return getattr(error.response, "status_code", None) == 429
+    return isinstance(
+        error,
+        (
+            ExoscaleAPIServerException,
+            requests.ConnectionError,
+            requests.Timeout,
+        ),
+    )
+
+
+def _load_checkpoint(path, period):
+    """
+    Returns the usage of the organizations recorded in a checkpoint file for
+    ``period``, skipping the records of other periods and a truncated last
+    line left by an interrupted run.
+    """
+    done = {}
+    if path is None or not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("period") == period:
+                done[record["id"]] = record["usage"]
+    return done
+
+
+def _add_totals(totals, usage, period):
+    for statement in usage:
+        statement_period = (statement.get("start-date") or period or "")[:7]
+        amounts = totals.setdefault(statement_period, {}).setdefault(
+            statement.get("currency"),
+            {"total-excl-vat": 0.0, "total-incl-vat": 0.0},
+        )
+        for k in amounts:
+            amounts[k] += statement.get(k) or 0.0
+
+
+class MeteringBuffer:
+    """
+    Accumulates metering records and submits them in batches, one
+    ``metering_transaction`` call per organization.
+
+    Buffered records are flushed when ``max_records`` are pending or
+    ``max_delay`` seconds after the first pending record, from a background
+    thread started with :meth:`start` (or by using the buffer as a context
+    manager). Batches which cannot be submitted because of server,
+    connection or rate limiting errors are retried, then appended to the
+    ``spool`` file, if set, and submitted again on the next flush.
+
+    Delivery is at least once: a batch whose request failed after reaching
+    the API (e.g. a timeout while the response was on its way) is submitted
+    again, and its records may then be metered, and billed, twice. Each
+    batch is sent with the same ``Idempotency-Key`` header across retries,
+    but the Partner API does not document deduplicating on it. Reconcile the
+    metered usage if duplicates matter, or set ``retries=0`` and no spool to
+    get at most once delivery instead.
+
+    Args:
+        client (Client): Partner API client.
+
+        max_records (int): number of pending records triggering a flush.
+
+        max_delay (float): maximum time in seconds a record stays buffered.
+
+        spool (str): path of the on-disk queue of unsent batches.
+
+        retries (int): number of retries of a batch before spooling it.
+
+    Attributes:
+        metrics (dict): ``flushes``, ``batches_sent``, ``records_sent``,
+          ``batches_rejected``, ``last_flush_latency`` and
+          ``max_flush_latency`` (in seconds) are counters and latencies,
+          ``batches_pending`` is the number of batches in the spool. See also
+          :attr:`backlog`.
+    """
+
+    def __init__(
+        self, client, max_records=500, max_delay=5.0, spool=None, retries=3
+    ):
+        self.client = client
+        self.max_records = max_records
+        self.max_delay = max_delay
+        self.spool = spool
+        self.retries = retries
+        self.metrics = {
+            "flushes": 0,
+            "batches_sent": 0,
+            "records_sent": 0,
+            "batches_pending": 0,
+            "batches_rejected": 0,
+            "last_flush_latency": 0.0,
+            "max_flush_latency": 0.0,
+        }
+        self._records = []
+        self._first_record_at = None
+        spooled = self._read_spool()
+        self.metrics["batches_pending"] = len(spooled)
+        self._spooled_records = sum(len(batch["usage"]) for batch in spooled)
+        self._lock = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closing = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def backlog(self):
+        """
+        Number of records not submitted yet, buffered or spooled.
+        """
+        return len(self._records) + self._spooled_records
+
+    def add(self, organization, product, variable, quantity):
+        """
+        Buffers a metering record.
+        """
+        with self._lock:
+            if not self._records:
+                self._first_record_at = time.monotonic()
+            self._records.append(
+                (
+                    organization,
+                    {
+                        "product": product,
+                        "variable": variable,
+                        "quantity": quantity,
+                    },
+                )
+            )
+            if len(self._records) >= self.max_records:
+                self._lock.notify()
+
+    def _read_spool(self):
+        if self.spool is None or not os.path.exists(self.spool):
+            return []
+        with open(self.spool) as f:
+            batches = []
+            for line in f:
+                try:
+                    batches.append(json.loads(line))
+                except ValueError:
+                    continue
+            return batches
+
+    def _write_spool(self, batches):
+        tmp = f"{self.spool}.tmp"
+        with open(tmp, "w") as f:
+            for batch in batches:
+                f.write(json.dumps(batch) + "\n")
+        os.replace(tmp, self.spool)
+
+    def _submit(self, batch):
+        attempt = 0
+        while True:
+            try:
+                self.client._call_operation(
+                    "metering-transaction",
+                    body={
+                        "organization": batch["organization"],
+                        "usage": batch["usage"],
+                    },
+                    headers={"Idempotency-Key": batch["key"]},
+                )
+                return
+            except Exception as e:
+                if not _retryable(e) or attempt >= self.retries:
+                    raise
+                _sleep(_retry_delay(attempt))
+                attempt += 1
+
+    def flush(self):
+        """
+        Submits the spooled batches then the buffered records.
+
+        Once a batch can not be submitted because of a server, connection or
+        rate limiting error, after its retries, the following batches are
+        not tried: they are spooled with it, as is, for the next flush.
+        Batches rejected as invalid are dropped.
+
+        Raises:
+            ExoscaleAPIServerException: a batch could not be submitted and
+              no spool is configured; it is lost, with the following ones.
+        """
+        with self._flush_lock:
+            start = time.monotonic()
+            with self._lock:
+                records, self._records = self._records, []
+                self._first_record_at = None
+            by_organization = defaultdict(list)
+            for organization, usage in records:
+                by_organization[organization].append(usage)
+            batches = self._read_spool() + [
+                {
+                    "key": str(uuid.uuid4()),
+                    "organization": organization,
+                    "usage": usage,
+                }
+                for organization, usage in by_organization.items()
+            ]
+            unsent = []
+            error = None
+            for i, batch in enumerate(batches):
+                try:
+                    self._submit(batch)
+                except ExoscaleAPIClientException as e:
+                    if _retryable(e):
+                        unsent, error = batches[i:], e
+                        break
+                    # Rejected as invalid: submitting it again won't help.
+                    self.metrics["batches_rejected"] += 1
+                except Exception as e:
+                    # The API is unavailable: don't wait for the retries of
+                    # every other batch.
+                    unsent, error = batches[i:], e
+                    break
+                else:
+                    self.metrics["batches_sent"] += 1
+                    self.metrics["records_sent"] += len(batch["usage"])
+            if self.spool is not None:
+                self._write_spool(unsent)
+                self.metrics["batches_pending"] = len(unsent)
+                self._spooled_records = sum(len(b["usage"]) for b in unsent)
+            latency = time.monotonic() - start
+            self.metrics["flushes"] += 1
+            self.metrics["last_flush_latency"] = latency
+            self.metrics["max_flush_latency"] = max(
+                self.metrics["max_flush_latency"], latency
+            )
+            if error is not None and self.spool is None:
+                raise error
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._closing and (
+                    len(self._records) < self.max_records
+                    and (
+                        self._first_record_at is None
+                        or time.monotonic() - self._first_record_at
+                        < self.max_delay
+                    )
+                ):
+                    timeout = (
+                        None
+                        if self._first_record_at is None
+                        else self._first_record_at
+                        + self.max_delay
+                        - time.monotonic()
+                    )
+                    self._lock.wait(timeout)
+                closing = self._closing
+            try:
+                self.flush()
+            except Exception:
+                # Without a spool, unsent records are lost; keep the thread
+                # alive for the next ones.
+                pass
+            if closing:
+                return
+
+    def start(self):
+        """
+        Starts the background flushing thread.
+        """
+        if self._thread is None:
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """
+        Stops the background thread after a final flush.
+        """
+        if self._thread is None:
+            self.flush()
+            return
+        with self._lock:
+            self._closing = True
+            self._lock.notify()
+        self._thread.join()
+        self._thread = None
 
 
 class Client(BasePartnerClient):
@@ -30,6 +383,15 @@ class Client(BasePartnerClient):
         secret (str): Exoscale API secret
         url (str): Override endpoint URL (optional)
         zone (str): Exoscale zone (optional)
+        thread_safe (bool): Use one HTTP session per thread (optional)
+        http2 (bool): Send requests over HTTP/2, requires ``httpx``
+            (optional)
+        coalesce (bool): Share requests between identical concurrent GET
+            calls (optional)
+        circuit_breaker (bool): Fail fast while the endpoint is failing
+            (optional)
+        intern_strings (bool): Share equal strings of responses (optional)
+        snake_case_keys (bool): Return snake_case response keys (optional)
 
     Example:
         >>> from exoscale.api.partner import Client
@@ -37,23 +399,161 @@ class Client(BasePartnerClient):
         >>> orgs = client.list_distributor_organizations()
     """
 
-    def __init__(self, key, secret, *args, url=None, **kwargs):
+    def __init__(
+        self,
+        key,
+        secret,
+        *args,
+        url=None,
+        thread_safe=False,
+        http2=False,
+        pickle_secret=False,
+        **kwargs,
+    ):
         # Initialize with Partner API endpoint
         partner_url = (
             url if url else "https://partner-api.exoscale.com/v1.alpha"
         )
         super().__init__(*args, url=partner_url, **kwargs)
 
-        # Reuse the v2 client's authentication mechanism
-        v2_client = V2Client(key, secret, *args, url=url, **kwargs)
-
-        self.http_client = v2_client.http_client
+        # Same authentication mechanism as the V2 API client, without the
+        # cost of loading the V2 API definition.
+        self.http_client = create_session(
+            key, secret, thread_safe=thread_safe, http2=http2
+        )
         self.key = key
+        self.thread_safe = thread_safe
+        self.http2 = http2
+        self.pickle_secret = pickle_secret
+        self._secret = secret
 
-        self._v2_client = v2_client
+    def __reduce__(self):
+        return _reduce_client(self)
 
     def __repr__(self):
         return (
             f"<Client endpoint={self.endpoint} "
             f"key={self.key} secret=**masked**>"
         )
+
+    def metering_buffer(self, **kwargs):
+        """
+        Create a :class:`MeteringBuffer` submitting metering records through
+        this client.
+
+        Example:
+            >>> with client.metering_buffer(spool="/var/spool/metering") as m:
+            ...     m.add(org_id, "compute", "instance-hours", 1.0)
+        """
+        return MeteringBuffer(self, **kwargs)
+
+    def _fetch_organization_usage(self, id, period, retries):
+        kwargs = {"period": period} if period is not None else {}
+        attempt = 0
+        while True:
+            try:
+                return self.list_distributor_organization_usage(
+                    id=id, **kwargs
+                )
+            except Exception as e:
+                if not _retryable(e) or attempt >= retries:
+                    raise
+                _sleep(_retry_delay(attempt))
+                attempt += 1
+
+    def iter_organizations_usage(
+        self,
+        period=None,
+        ids=None,
+        status=None,
+        max_workers=8,
+        retries=3,
+        checkpoint=None,
+    ):
+        """
+        Fetch the usage of many organizations concurrently, yielding each
+        result as soon as it is available.
+
+        Server, connection and rate limiting errors are retried with an
+        exponential backoff. When ``checkpoint`` is set, each fetched usage
+        is appended to that file along with its period, and organizations
+        already recorded there for the same period are not fetched again:
+        an interrupted run resumes where it stopped.
+
+        Args:
+            period (str): usage period, ``YYYY-MM``. Defaults to the API
+              default period.
+            ids (list): organization IDs. Defaults to all the organizations
+              returned by ``list_distributor_organizations``.
+            status (str): only consider listed organizations in this status,
+              e.g. ``"active"``. Ignored when ``ids`` is set.
+            max_workers (int): maximum number of concurrent requests.
+            retries (int): maximum number of retries per organization.
+            checkpoint (str): path of the checkpoint file. Requires an
+              explicit ``period``, so that a checkpoint is never resumed
+              for another period.
+
+        Yields:
+            OrganizationUsage
+
+        Raises:
+            ValueError: if ``checkpoint`` is set without ``period``.
+        """
+        if checkpoint is not None and period is None:
+            # The default period changes over time.
+            raise ValueError("A checkpoint requires an explicit period.")
+        if ids is None:
+            ids = [
+                org["id"]
+                for org in self.list_distributor_organizations()[
+                    "organizations"
+                ]
+                if status is None or org.get("status") == status
+            ]
+        done = _load_checkpoint(checkpoint, period)
+        for id in ids:
+            if id in done:
+                yield OrganizationUsage(id, done[id], None)
+        lock = threading.Lock()
+
+        def fetch(id):
+            usage = self._fetch_organization_usage(id, period, retries)
+            if checkpoint is not None:
+                line = json.dumps({"id": id, "period": period, "usage": usage})
+                with lock, open(checkpoint, "a") as f:
+                    f.write(line + "\n")
+            return usage
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(fetch, id): id for id in ids if id not in done
+            }
+            for future in as_completed(futures):
+                try:
+                    usage = future.result()
+                except Exception as e:
+                    yield OrganizationUsage(futures[future], None, e)
+                else:
+                    yield OrganizationUsage(futures[future], usage, None)
+
+    def aggregate_organizations_usage(self, period=None, **kwargs):
+        """
+        Sum the usage of many organizations per period and currency.
+
+        Args:
+            period (str): usage period, ``YYYY-MM``.
+            kwargs: see :meth:`iter_organizations_usage`.
+
+        Returns:
+            UsageSummary
+        """
+        totals = {}
+        organizations = 0
+        errors = []
+        for result in self.iter_organizations_usage(period, **kwargs):
+            if result.error is not None:
+                errors.append(result)
+                continue
+            organizations += 1
+            _add_totals(totals, result.usage, period)
+        return UsageSummary(totals, organizations, errors)
@@ -0,0 +1,276 @@
+"""
+
+``exoscale.api.quota`` admits resource creations against the organization
+quotas before sending them.
+
+A :class:`QuotaAdmission` loads the quotas once with ``list_quotas`` and
+keeps track of the resources reserved by the creations it lets through. A
+creation which would exceed a quota is rejected (or waits for capacity)
+without any request being sent, instead of failing halfway through a bulk
+creation. Quotas are loaded again periodically to take into account the
+resources created and deleted by others.
+
+Examples:
+    Creating instances from many threads, rejecting the ones over quota:
+
+    >>> from concurrent.futures import ThreadPoolExecutor
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.quota import QuotaAdmission
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> admission = QuotaAdmission(c)
+    >>> with ThreadPoolExecutor(max_workers=8) as executor:
+    ...     futures = [
+    ...         executor.submit(
+    ...             admission.call, "create_instance", name=f"web-{i}", ...
+    ...         )
+    ...         for i in range(50)
+    ...     ]
+    >>> admission.snapshot()["instance"]
+    {'limit': 20, 'usage': 12, 'reserved': 8}
+    >>> futures[-1].exception()
+    ExoscaleAPIQuotaExceededException('Quota of instance exceeded: ...')
+"""
+
+import itertools
+import threading
+import time
+
+from .exceptions import ExoscaleAPIQuotaExceededException
+from .watch import _operation_method
+
+# Quota resources consumed by creation operations: amounts by resource, or
+# functions of the operation arguments returning them.
+COSTS = {
+    "create_instance": {"instance": 1},
+    "create_instance_pool": lambda kwargs: {"instance": kwargs.get("size", 0)},
+    "create_sks_nodepool": lambda kwargs: {"instance": kwargs.get("size", 0)},
+    "create_elastic_ip": {"elastic-ip": 1},
+    "create_block_storage_volume": {"block-storage-volume": 1},
+    "create_block_storage_snapshot": {"block-storage-snapshot": 1},
+    "create_snapshot": {"snapshot": 1},
+    "register_template": {"template": 1},
+    "create_private_network": {"private-network": 1},
+    "create_security_group": {"security-group": 1},
+    "create_anti_affinity_group": {"anti-affinity-group": 1},
+    "create_load_balancer": {"nlb": 1},
+    "create_sks_cluster": {"sks-cluster": 1},
+}
+
+
+def _time():
+    return time.monotonic()
+
+
+class Reservation:
+    """
+    Quota resources held by a creation, from its admission until quotas are
+    loaded again after it completed. Returned by
+    :meth:`QuotaAdmission.reserve`.
+
+    Attributes:
+        operation (str): operation name.
+
+        cost (dict): amounts reserved, by resource.
+    """
+
+    def __init__(self, admission, operation, cost):
+        self.admission = admission
+        self.operation = operation
+        self.cost = cost
+        # Event sequence number of the completion, None while in progress.
+        self.completed = None
+
+    def __repr__(self):
+        return f"<Reservation operation={self.operation} cost={self.cost}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.admission._complete(self)
+        else:
+            self.admission._release(self)
+
+
+class QuotaAdmission:
+    """
+    Admission control of resource creations. Safe to share between threads.
+
+    Args:
+        client: API client.
+
+        wait (bool): wait for quota to be available instead of raising
+          :class:`~exoscale.api.exceptions.ExoscaleAPIQuotaExceededException`.
+          Defaults to ``False``.
+
+        timeout (float): maximum time in seconds to wait for quota, after
+          which the exception is raised. Defaults to ``None`` (no limit).
+
+        resync_interval (float): time in seconds after which quotas are
+          loaded again. Defaults to ``60``.
+
+        costs (dict): quota resources consumed by operations, updating
+          :data:`COSTS`: amounts by resource, or functions of the operation
+          arguments returning them. Resources without a quota are not
+          limited.
+    """
+
+    def __init__(
+        self, client, wait=False, timeout=None, resync_interval=60, costs=None
+    ):
+        self.client = client
+        self.wait = wait
+        self.timeout = timeout
+        self.resync_interval = resync_interval
+        self.costs = dict(COSTS)
+        if costs is not None:
+            self.costs.update(costs)
+        self._quotas = None
+        self._synced_at = None
+        self._reservations = []
+        self._events = itertools.count()
+        self._condition = threading.Condition()
+        self._sync_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<QuotaAdmission reservations={len(self._reservations)}>"
+
+    def sync(self):
+        """
+        Loads the quotas, forgetting the reservations of the creations
+        completed before, which are now part of the usage.
+        """
+        with self._condition:
+            started = next(self._events)
+        quotas = self.client.list_quotas()["quotas"]
+        with self._condition:
+            self._quotas = {
+                q["resource"]: (q.get("limit", -1), q.get("usage", 0))
+                for q in quotas
+            }
+            self._synced_at = _time()
+            self._reservations = [
+                r
+                for r in self._reservations
+                if r.completed is None or r.completed > started
+            ]
+            self._condition.notify_all()
+
+    def _stale(self):
+        return (
+            self._synced_at is None
+            or _time() - self._synced_at >= self.resync_interval
+        )
+
+    def _reserved(self, resource):
+        return sum(r.cost.get(resource, 0) for r in self._reservations)
+
+    def _exceeded(self, cost):
+        """
+        Returns the first resource of ``cost`` over quota, or ``None``.
+        """
+        for resource, amount in cost.items():
+            limit, usage = self._quotas.get(resource, (-1, 0))
+            if limit < 0:
+                continue
+            if usage + self._reserved(resource) + amount > limit:
+                return resource
+        return None
+
+    def cost(self, operation, **kwargs):
+        """
+        Returns the quota resources consumed by an operation, by resource.
+        """
+        cost = self.costs.get(operation.replace("-", "_"), {})
+        if callable(cost):
+            cost = cost(kwargs)
+        return {resource: n for resource, n in cost.items() if n}
+
+    def reserve(self, operation, **kwargs):
+        """
+        Reserves the quota resources of an operation, to be used as a
+        context manager around the creation call. Reservations are released
+        if the block raises an exception.
+
+        Args:
+            operation (str): operation name, e.g. ``"create_instance"``.
+
+            kwargs: operation arguments.
+
+        Returns:
+            Reservation: the reservation.
+
+        Raises:
+            ExoscaleAPIQuotaExceededException: if the operation would exceed
+              a quota (after ``timeout`` when waiting).
+        """
+        cost = self.cost(operation, **kwargs)
+        deadline = None if self.timeout is None else _time() + self.timeout
+        while True:
+            if self._stale():
+                with self._sync_lock:
+                    # Another thread may have loaded them in the meantime.
+                    if self._stale():
+                        self.sync()
+            with self._condition:
+                resource = self._exceeded(cost)
+                if resource is None:
+                    reservation = Reservation(self, operation, cost)
+                    self._reservations.append(reservation)
+                    return reservation
+                limit, usage = self._quotas[resource]
+                remaining = None if deadline is None else deadline - _time()
+                if (
+                    not self.wait
+                    # Waiting is pointless if it can never fit.
+                    or cost[resource] > limit
+                    or (remaining is not None and remaining <= 0)
+                ):
+                    raise ExoscaleAPIQuotaExceededException(
+                        f"Quota of {resource} exceeded: {operation} needs "
+                        f"{cost[resource]}, {usage} used and "
+                        f"{self._reserved(resource)} reserved out of {limit}"
+                    )
+                # Wake up on releases, or to load the quotas again.
+                wait = self.resync_interval - (_time() - self._synced_at)
+                if remaining is not None:
+                    wait = min(wait, remaining)
+                self._condition.wait(max(wait, 0))
+
+    def call(self, operation, **kwargs):
+        """
+        Calls a client operation once its quota resources are reserved.
+
+        Returns:
+            The operation result.
+        """
+        method = _operation_method(self.client, operation)
+        with self.reserve(operation, **kwargs):
+            return method(**kwargs)
+
+    def _complete(self, reservation):
+        with self._condition:
+            reservation.completed = next(self._events)
+
+    def _release(self, reservation):
+        with self._condition:
+            self._reservations.remove(reservation)
+            self._condition.notify_all()
+
+    def snapshot(self):
+        """
+        Returns the ``limit`` (``-1`` when unlimited), ``usage`` and
+        ``reserved`` amount of each resource with a quota.
+        """
+        if self._quotas is None:
+            self.sync()
+        with self._condition:
+            return {
+                resource: {
+                    "limit": limit,
+                    "usage": usage,
+                    "reserved": self._reserved(resource),
+                }
+                for resource, (limit, usage) in self._quotas.items()
+            }
@@ -0,0 +1,330 @@
+"""
+
+``exoscale.api.rolling`` applies an asynchronous operation to a fleet of
+resources, a bounded number at a time.
+
+A new action starts as soon as an earlier one completes, rather than when a
+whole batch is over. The operations in flight are tracked by a single
+poller, an error budget stops the rollout when too many actions fail, and
+progress can be recorded in a checkpoint file to resume an interrupted
+rollout.
+
+Examples:
+    Rebooting instances two at a time, waiting for each to run again before
+    rebooting more, and stopping after the second failure:
+
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.rolling import RollingExecutor
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> rollout = RollingExecutor(
+    ...     c,
+    ...     "reboot_instance",
+    ...     max_in_flight=2,
+    ...     error_budget=1,
+    ...     ready=lambda c, t: c.get_instance(**t)["state"] == "running",
+    ...     checkpoint="/var/tmp/reboot.jsonl",
+    ... )
+    >>> outcomes = rollout.run(
+    ...     [{"id": i["id"]} for i in c.list_instances()["instances"]]
+    ... )
+    >>> [(o.key, o.state) for o in outcomes]
+    [('8561ee34-...', 'success'), ('2f0c9a1e-...', 'success')]
+"""
+
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .exceptions import ExoscaleAPIClientException, ExoscaleAPIServerException
+from .runner import FAILURE, SKIPPED, SUCCESS
+from .watch import _key_function, _operation_method
+
+# States recorded in checkpoint files only.
+_STARTED = "started"
+
+RollingOutcome = namedtuple(
+    "RollingOutcome", ["key", "state", "operation", "error"]
+)
+RollingOutcome.__doc__ = """
+Outcome of the action applied to one target.
+
+Attributes:
+    key (str): target key.
+    state (str): one of ``'success'``, ``'failure'`` or ``'skipped'`` (not
+      started because the error budget was exhausted).
+    operation (dict): the completed operation, ``None`` when skipped or
+      completed in a previous run.
+    error (Exception): the exception raised by the action, if any.
+"""
+
+
+def _sleep(seconds):
+    return time.sleep(seconds)
+
+
+def _time():
+    return time.monotonic()
+
+
+def _load_checkpoint(path):
+    """
+    Returns the last recorded ``(state, operation_id)`` of each target of a
+    checkpoint file, skipping a truncated last line left by an interrupted
+    run.
+    """
+    states = {}
+    if path is None or not os.path.exists(path):
+        return states
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            states[record["key"]] = (record["state"], record.get("operation"))
+    return states
+
+
+class _Action:
+    def __init__(self, key, target):
+        self.key = key
+        self.target = target
+        self.operation_id = None
+        self.operation = None
+        self.poll_errors = 0
+        self.started_at = None
+
+
+class RollingExecutor:
+    """
+    Applies an operation to many targets with bounded concurrency.
+
+    Args:
+        client: API client.
+
+        operation (str): operation name, e.g. ``"reboot_instance"``. It must
+          return an asynchronous operation.
+
+        max_in_flight (int): maximum number of operations in progress.
+          Defaults to ``1``.
+
+        max_unavailable (int): maximum number of targets whose operation is
+          in progress or which are not ``ready`` yet. Defaults to
+          ``max_in_flight``.
+
+        error_budget (int): number of failed actions tolerated. Once
+          exceeded, no new action is started, and the remaining targets are
+          skipped. Defaults to ``0``.
+
+        ready (callable): function of ``(client, target)`` telling whether a
+          target is available again after its operation succeeded, e.g. an
+          instance is running. Called on every poll until true. Defaults to
+          ``None``: targets are available as soon as their operation
+          succeeds.
+
+        key (str or callable): target argument (or function of the target)
+          identifying a target in outcomes and checkpoints. Defaults to
+          ``"id"``.
+
+        checkpoint (str): path of a file where progress is appended. Targets
+          which succeeded in a previous run are not acted on again, and
+          operations which were in progress are waited for rather than
+          started again.
+
+        poll_interval (float): time in seconds between two polls of the
+          operations in progress. Defaults to ``3``.
+
+        poll_workers (int): maximum number of concurrent polling calls.
+          Defaults to ``8``.
+
+        max_wait_time (float): When set, a target whose operation is not
+          complete (and which is not ``ready``) after this time in seconds
+          is considered failed and counts toward the error budget; its
+          operation is no longer polled. Defaults to ``None``, which waits
+          until operation completion.
+    """
+
+    def __init__(
+        self,
+        client,
+        operation,
+        max_in_flight=1,
+        max_unavailable=None,
+        error_budget=0,
+        ready=None,
+        key="id",
+        checkpoint=None,
+        poll_interval=3,
+        poll_workers=8,
+        max_wait_time=None,
+    ):
+        self.client = client
+        self.method = _operation_method(client, operation)
+        self.max_in_flight = max_in_flight
+        self.max_unavailable = (
+            max_in_flight if max_unavailable is None else max_unavailable
+        )
+        if self.max_unavailable < self.max_in_flight:
+            raise ValueError("max_unavailable must be at least max_in_flight.")
+        self.error_budget = error_budget
+        self.ready = ready
+        self.key = _key_function(key)
+        self.checkpoint = checkpoint
+        self.poll_interval = poll_interval
+        self.poll_workers = poll_workers
+        self.max_wait_time = max_wait_time
+
+    def _record(self, key, state, operation_id=None):
+        if self.checkpoint is None:
+            return
+        record = {"key": key, "state": state}
+        if operation_id is not None:
+            record["operation"] = operation_id
+        with open(self.checkpoint, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _start(self, action):
+        action.operation_id = self.method(**action.target)["id"]
+        self._record(action.key, _STARTED, action.operation_id)
+
+    def _poll(self, action):
+        """
+        Returns the outcome of an action in progress, or ``None`` if it is
+        not done yet.
+        """
+        try:
+            operation, action.poll_errors = self.client.poll_operation(
+                action.operation_id, action.poll_errors
+            )
+        except ExoscaleAPIServerException as e:
+            return RollingOutcome(action.key, FAILURE, e.response, e)
+        if operation is None:
+            return None
+        return RollingOutcome(action.key, SUCCESS, operation, None)
+
+    def _timed_out(self, action):
+        """
+        Returns the outcome of an action past ``max_wait_time``, or ``None``.
+        """
+        if (
+            self.max_wait_time is None
+            or _time() - action.started_at <= self.max_wait_time
+        ):
+            return None
+        return RollingOutcome(
+            action.key,
+            FAILURE,
+            action.operation,
+            ExoscaleAPIClientException("Operation max wait time reached"),
+        )
+
+    def _is_ready(self, action):
+        try:
+            return self.ready(self.client, action.target)
+        except Exception:
+            # Availability checks are retried on the next poll.
+            return False
+
+    def run(self, targets):
+        """
+        Applies the operation to ``targets``, returning when every started
+        operation is complete.
+
+        Args:
+            targets (list): operation arguments of each target, e.g.
+              ``[{"id": "..."}, ...]``.
+
+        Returns:
+            list: :class:`RollingOutcome` instances, in target order.
+        """
+        targets = list(targets)
+        keys = [self.key(target) for target in targets]
+        previous = _load_checkpoint(self.checkpoint)
+        outcomes = {}
+        queue = []
+        in_flight = []
+        for key, target in zip(keys, targets, strict=True):
+            action = _Action(key, target)
+            state, operation_id = previous.get(key, (None, None))
+            if state == SUCCESS:
+                outcomes[key] = RollingOutcome(key, SUCCESS, None, None)
+            elif state == _STARTED:
+                action.operation_id = operation_id
+                action.started_at = _time()
+                in_flight.append(action)
+            else:
+                queue.append(action)
+        queue.reverse()
+        # Targets whose operation succeeded, waiting to be ready again.
+        recovering = []
+        failures = 0
+
+        with ThreadPoolExecutor(max_workers=self.poll_workers) as executor:
+            while True:
+                while (
+                    queue
+                    and failures <= self.error_budget
+                    and len(in_flight) < self.max_in_flight
+                    and len(in_flight) + len(recovering) < self.max_unavailable
+                ):
+                    action = queue.pop()
+                    action.started_at = _time()
+                    try:
+                        self._start(action)
+                    except Exception as e:
+                        failures += 1
+                        outcomes[action.key] = RollingOutcome(
+                            action.key, FAILURE, None, e
+                        )
+                        self._record(action.key, FAILURE)
+                        continue
+                    in_flight.append(action)
+
+                if not in_flight and not recovering:
+                    break
+                _sleep(self.poll_interval)
+
+                still_in_flight = []
+                for action, outcome in zip(
+                    in_flight, executor.map(self._poll, in_flight), strict=True
+                ):
+                    if outcome is None:
+                        outcome = self._timed_out(action)
+                    if outcome is None:
+                        still_in_flight.append(action)
+                    elif outcome.state == SUCCESS and self.ready is not None:
+                        action.operation = outcome.operation
+                        recovering.append(action)
+                    else:
+                        if outcome.state == FAILURE:
+                            failures += 1
+                        outcomes[action.key] = outcome
+                        self._record(action.key, outcome.state)
+                in_flight = still_in_flight
+
+                still_recovering = []
+                for action, ready in zip(
+                    recovering,
+                    executor.map(self._is_ready, recovering),
+                    strict=True,
+                ):
+                    if ready:
+                        outcomes[action.key] = RollingOutcome(
+                            action.key, SUCCESS, action.operation, None
+                        )
+                        self._record(action.key, SUCCESS)
+                    elif timed_out := self._timed_out(action):
+                        failures += 1
+                        outcomes[action.key] = timed_out
+                        self._record(action.key, FAILURE)
+                    else:
+                        still_recovering.append(action)
+                recovering = still_recovering
+
+        for action in queue:
+            outcomes[action.key] = RollingOutcome(
+                action.key, SKIPPED, None, None
+            )
+        return [outcomes[key] for key in keys]
@@ -0,0 +1,235 @@
+"""
+
+``exoscale.api.runner`` executes a graph of dependent API calls, running
+independent branches concurrently.
+
+Each node is an operation call, optionally followed by
+:meth:`exoscale.api.v2.Client.wait` on the returned operation. Arguments of a
+node can reference the output of other nodes with :class:`Ref`, which
+resolves by default to the ``reference.id`` of the completed operation.
+
+Examples:
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.runner import OperationRunner, Ref
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> runner = OperationRunner(c, max_workers=4)
+    >>> runner.add("network", "create_private_network", name="backend")
+    >>> runner.add("sg", "create_security_group", name="web")
+    >>> runner.add(
+    ...     "instance",
+    ...     "create_instance",
+    ...     name="web-1",
+    ...     instance_type={"id": "..."},
+    ...     template={"id": "..."},
+    ...     disk_size=10,
+    ...     security_groups=[{"id": Ref("sg")}],
+    ... )
+    >>> runner.add(
+    ...     "attach",
+    ...     "attach_instance_to_private_network",
+    ...     id=Ref("network"),
+    ...     instance={"id": Ref("instance")},
+    ... )
+    >>> results = runner.run()
+    >>> results["instance"].state
+    'success'
+"""
+
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .generator import _get_in
+from .watch import _operation_method
+
+SUCCESS = "success"
+FAILURE = "failure"
+SKIPPED = "skipped"
+
+NodeResult = namedtuple("NodeResult", ["state", "output", "error"])
+NodeResult.__doc__ = """
+Outcome of a node.
+
+Attributes:
+    state (str): one of ``'success'``, ``'failure'`` or ``'skipped'`` (a
+      dependency failed).
+    output (dict): the operation result, or the completed operation when the
+      node waits for it.
+    error (Exception): the exception raised by the node, if any.
+"""
+
+
+class Ref:
+    """
+    Placeholder for the output of another node, resolved when the node it
+    appears in is about to run.
+
+    Args:
+        node (str): name of the node.
+
+        path: keys to follow in the node output. Defaults to
+          ``("reference", "id")``, the id of the resource created by the
+          operation.
+    """
+
+    def __init__(self, node, *path):
+        self.node = node
+        self.path = path or ("reference", "id")
+
+    def __repr__(self):
+        return f"Ref({self.node!r}, {', '.join(map(repr, self.path))})"
+
+    def resolve(self, outputs):
+        return _get_in(outputs[self.node], self.path)
+
+
+def _refs(value):
+    if isinstance(value, Ref):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _refs(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _refs(v)
+
+
+def _resolve(value, outputs):
+    if isinstance(value, Ref):
+        return value.resolve(outputs)
+    elif isinstance(value, dict):
+        return {k: _resolve(v, outputs) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return type(value)(_resolve(v, outputs) for v in value)
+    return value
+
+
+class _Node:
+    def __init__(self, name, method, kwargs, depends_on, wait):
+        self.name = name
+        self.method = method
+        self.kwargs = kwargs
+        self.wait = wait
+        self.depends_on = set(depends_on)
+        self.depends_on.update(ref.node for ref in _refs(kwargs))
+
+
+class OperationRunner:
+    """
+    Runs a graph of API calls with bounded parallelism.
+
+    Args:
+        client: API client used to run the operations.
+
+        max_workers (int): maximum number of nodes running at the same time.
+          Defaults to ``4``.
+    """
+
+    def __init__(self, client, max_workers=4):
+        self.client = client
+        self.max_workers = max_workers
+        self.nodes = {}
+
+    def add(self, node, operation, /, depends_on=(), wait=True, **kwargs):
+        """
+        Adds a node to the graph.
+
+        Args:
+            node (str): unique node name.
+
+            operation (str): operation name, e.g. ``'create_instance'``.
+
+            depends_on (list): names of nodes that must succeed first, in
+              addition to those referenced through :class:`Ref` arguments.
+
+            wait (bool): whether to wait for the operation returned by the
+              call to complete. Defaults to ``True``.
+
+            kwargs: operation arguments, possibly containing :class:`Ref`
+              values.
+        """
+        if node in self.nodes:
+            raise ValueError(f"Duplicate node {node!r}")
+        method = _operation_method(self.client, operation)
+        self.nodes[node] = _Node(node, method, kwargs, depends_on, wait)
+
+    def _check(self):
+        for node in self.nodes.values():
+            for dep in node.depends_on:
+                if dep not in self.nodes:
+                    raise ValueError(
+                        f"Node {node.name!r} depends on unknown node {dep!r}"
+                    )
+        # Kahn's algorithm: anything left unvisited belongs to a cycle.
+        pending = {n: len(node.depends_on) for n, node in self.nodes.items()}
+        dependents = self._dependents()
+        ready = [n for n, count in pending.items() if count == 0]
+        visited = 0
+        while ready:
+            name = ready.pop()
+            visited += 1
+            for dependent in dependents[name]:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        if visited != len(self.nodes):
+            cycle = sorted(n for n, count in pending.items() if count)
+            raise ValueError(f"Dependency cycle between nodes {cycle!r}")
+
+    def _dependents(self):
+        dependents = {name: [] for name in self.nodes}
+        for node in self.nodes.values():
+            for dep in node.depends_on:
+                dependents[dep].append(node.name)
+        return dependents
+
+    def _run_node(self, node, outputs):
+        result = node.method(**_resolve(node.kwargs, outputs))
+        if node.wait:
+            result = self.client.wait(result["id"])
+        return result
+
+    def run(self):
+        """
+        Runs every node once all its dependencies succeeded. When a node
+        fails, the nodes depending on it, directly or not, are skipped while
+        independent branches carry on.
+
+        Returns:
+            dict: :class:`NodeResult` by node name.
+        """
+        self._check()
+        dependents = self._dependents()
+        pending = {n: set(node.depends_on) for n, node in self.nodes.items()}
+        outputs = {}
+        results = {}
+
+        def skip(name):
+            for dependent in dependents[name]:
+                if dependent not in results:
+                    results[dependent] = NodeResult(SKIPPED, None, None)
+                    pending.pop(dependent, None)
+                    skip(dependent)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while pending or running:
+                for name in [n for n, deps in pending.items() if not deps]:
+                    del pending[name]
+                    future = executor.submit(
+                        self._run_node, self.nodes[name], outputs
+                    )
+                    running[future] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        outputs[name] = future.result()
+                    except Exception as e:
+                        results[name] = NodeResult(FAILURE, None, e)
+                        skip(name)
+                        continue
+                    results[name] = NodeResult(SUCCESS, outputs[name], None)
+                    for dependent in dependents[name]:
+                        if dependent in pending:
+                            pending[dependent].discard(name)
+        return results
@@ -0,0 +1,334 @@
+"""
+
+``exoscale.api.security_group`` synchronizes the rules and external sources
+of a security group with a desired set, applying the minimal set of changes
+concurrently.
+
+Examples:
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.security_group import sync_security_group_rules
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> outcomes = sync_security_group_rules(
+    ...     c,
+    ...     "4e0b8b9d-7c7e-4b3c-8f2d-1f6a7b9c0d1e",
+    ...     [
+    ...         {
+    ...             "flow-direction": "ingress",
+    ...             "protocol": "tcp",
+    ...             "start-port": 443,
+    ...             "end-port": 443,
+    ...             "network": "0.0.0.0/0",
+    ...         },
+    ...         {
+    ...             "flow-direction": "ingress",
+    ...             "protocol": "tcp",
+    ...             "start-port": 22,
+    ...             "end-port": 22,
+    ...             "security-group": {"name": "bastion"},
+    ...         },
+    ...     ],
+    ...     external_sources=["198.51.100.0/24"],
+    ... )
+    >>> [(o.action, o.error) for o in outcomes if o.action != "unchanged"]
+    [('add', None), ('delete', None)]
+"""
+
+import ipaddress
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .exceptions import ExoscaleAPIServerException
+
+ADD = "add"
+DELETE = "delete"
+ADD_SOURCE = "add-source"
+REMOVE_SOURCE = "remove-source"
+UNCHANGED = "unchanged"
+
+# Rule attributes sent when adding a rule.
+_RULE_FIELDS = (
+    "flow-direction",
+    "protocol",
+    "start-port",
+    "end-port",
+    "network",
+    "security-group",
+    "icmp",
+    "description",
+)
+
+RuleChange = namedtuple("RuleChange", ["action", "rule", "current"])
+RuleChange.__doc__ = """
+A change planned by :func:`plan_security_group_rules`.
+
+Attributes:
+    action (str): one of ``'add'``, ``'delete'``, ``'add-source'``,
+      ``'remove-source'`` or ``'unchanged'``.
+    rule (dict or str): the desired rule, or external source for
+      ``'add-source'``, ``None`` for removals.
+    current (dict or str): the existing rule, or external source for
+      ``'remove-source'``, ``None`` for additions.
+"""
+
+RuleOutcome = namedtuple(
+    "RuleOutcome", ["action", "rule", "current", "result", "error"]
+)
+RuleOutcome.__doc__ = """
+Outcome of a change applied by :func:`sync_security_group_rules`.
+
+Attributes:
+    action (str): one of ``'add'``, ``'delete'``, ``'add-source'``,
+      ``'remove-source'`` or ``'unchanged'``.
+    rule (dict or str): the desired rule or external source.
+    current (dict or str): the existing rule or external source.
+    result (dict): the completed operation, or the operation returned by the
+      API call when not waiting.
+    error (Exception): the exception raised by the API call or the
+      operation, if any.
+"""
+
+
+def _sleep(seconds):
+    return time.sleep(seconds)
+
+
+def _network(cidr):
+    return str(ipaddress.ip_network(cidr, strict=False))
+
+
+def _targets(rule):
+    """
+    Returns the canonical forms of the target of a rule: its network, or its
+    security group by ID and by name.
+    """
+    if rule.get("network"):
+        return [("network", _network(rule["network"]))]
+    group = rule.get("security-group") or {}
+    targets = []
+    if group.get("id"):
+        targets.append(("id", group["id"]))
+    if group.get("name"):
+        targets.append(("name", group["name"]))
+    return targets or [None]
+
+
+def _rule_keys(rule):
+    """
+    Returns the canonical keys of a rule. Rules sharing a key are
+    equivalent; descriptions are not compared.
+    """
+    protocol = rule["protocol"]
+    ports = None
+    if protocol in {"tcp", "udp"}:
+        start = rule.get("start-port")
+        ports = (start, rule.get("end-port") or start)
+    icmp = None
+    if protocol in {"icmp", "icmpv6"}:
+        details = rule.get("icmp") or {}
+        icmp = tuple(
+            -1 if details.get(k) is None else details[k]
+            for k in ("type", "code")
+        )
+    base = (rule["flow-direction"], protocol, ports, icmp)
+    return [(*base, target) for target in _targets(rule)]
+
+
+def plan_security_group_rules(
+    security_group, rules, external_sources=None, delete=True
+):
+    """
+    Computes the minimal list of changes turning the rules and external
+    sources of a security group into the desired ones.
+
+    Rules are compared on their direction, protocol, ports (for TCP and
+    UDP), ICMP type and code (for ICMP), and network (in canonical form) or
+    security group (by ID or by name). Rules can not be updated: other
+    differences, such as descriptions, are ignored.
+
+    Args:
+        security_group (dict): security group as returned by
+          ``get_security_group``.
+
+        rules (list): desired rules, with the keys of
+          ``add_rule_to_security_group`` arguments, e.g. ``flow-direction``.
+
+        external_sources (list): desired external source CIDRs. Defaults to
+          ``None`` (external sources are left as is).
+
+        delete (bool): whether to delete current rules and external sources
+          absent from the desired ones.
+
+    Returns:
+        list: :class:`RuleChange` instances.
+    """
+    current = security_group.get("rules", [])
+    by_key = defaultdict(list)
+    for rule in current:
+        for key in _rule_keys(rule):
+            by_key[key].append(rule)
+
+    changes = []
+    matched = set()
+    seen = set()
+    for rule in rules:
+        keys = _rule_keys(rule)
+        if seen.intersection(keys):
+            # Duplicate of a desired rule.
+            continue
+        seen.update(keys)
+        existing = next(
+            (
+                r
+                for key in keys
+                for r in by_key.get(key, [])
+                if r["id"] not in matched
+            ),
+            None,
+        )
+        if existing is None:
+            changes.append(RuleChange(ADD, rule, None))
+        else:
+            matched.add(existing["id"])
+            changes.append(RuleChange(UNCHANGED, rule, existing))
+    if delete:
+        for rule in current:
+            if rule["id"] not in matched:
+                changes.append(RuleChange(DELETE, None, rule))
+                matched.add(rule["id"])
+
+    if external_sources is not None:
+        current_sources = {
+            _network(cidr): cidr
+            for cidr in security_group.get("external-sources", [])
+        }
+        desired = {_network(cidr): cidr for cidr in external_sources}
+        for network, cidr in desired.items():
+            if network in current_sources:
+                changes.append(
+                    RuleChange(UNCHANGED, cidr, current_sources[network])
+                )
+            else:
+                changes.append(RuleChange(ADD_SOURCE, cidr, None))
+        if delete:
+            for network, cidr in current_sources.items():
+                if network not in desired:
+                    changes.append(RuleChange(REMOVE_SOURCE, None, cidr))
+    return changes
+
+
+def _body(rule):
+    return {
+        k.replace("-", "_"): v for k, v in rule.items() if k in _RULE_FIELDS
+    }
+
+
+def _start(client, security_group_id, change):
+    if change.action == ADD:
+        return client.add_rule_to_security_group(
+            id=security_group_id, **_body(change.rule)
+        )
+    if change.action == DELETE:
+        return client.delete_rule_from_security_group(
+            id=security_group_id, rule_id=change.current["id"]
+        )
+    if change.action == ADD_SOURCE:
+        return client.add_external_source_to_security_group(
+            id=security_group_id, cidr=change.rule
+        )
+    return client.remove_external_source_from_security_group(
+        id=security_group_id, cidr=change.current
+    )
+
+
+def sync_security_group_rules(
+    client,
+    security_group_id,
+    rules,
+    external_sources=None,
+    max_workers=8,
+    delete=True,
+    wait=True,
+    poll_interval=3,
+):
+    """
+    Makes the rules and external sources of a security group match
+    ``rules`` and ``external_sources``.
+
+    The security group is fetched once, compared with the desired rules
+    through :func:`plan_security_group_rules`, and the resulting additions
+    and deletions are applied concurrently. Their operations are then polled
+    together until they complete. A failing change does not prevent the
+    others from being applied.
+
+    Args:
+        client: API client.
+
+        security_group_id (str): security group ID.
+
+        rules (list): desired rules, see
+          :func:`plan_security_group_rules`.
+
+        external_sources (list): desired external source CIDRs. Defaults to
+          ``None`` (external sources are left as is).
+
+        max_workers (int): maximum number of concurrent API calls. Defaults
+          to ``8``.
+
+        delete (bool): whether to delete rules and external sources absent
+          from the desired ones. Defaults to ``True``.
+
+        wait (bool): whether to wait for the change operations to complete.
+          Defaults to ``True``.
+
+        poll_interval (float): time in seconds between two polls of the
+          operations in progress. Defaults to ``3``.
+
+    Returns:
+        list: :class:`RuleOutcome` instances, one per change.
+    """
+    security_group = client.get_security_group(id=security_group_id)
+    changes = plan_security_group_rules(
+        security_group, rules, external_sources, delete=delete
+    )
+    outcomes = [RuleOutcome(*change, None, None) for change in changes]
+    started = [i for i, c in enumerate(changes) if c.action != UNCHANGED]
+
+    def start(i):
+        try:
+            return _start(client, security_group_id, changes[i]), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        for i, (operation, error) in zip(
+            started, executor.map(start, started), strict=True
+        ):
+            outcomes[i] = outcomes[i]._replace(result=operation, error=error)
+            if error is None and wait:
+                pending[i] = operation["id"]
+
+        errors = defaultdict(int)
+
+        def poll(i):
+            try:
+                operation, errors[i] = client.poll_operation(
+                    pending[i], errors[i]
+                )
+            except ExoscaleAPIServerException as e:
+                return True, e.response, e
+            return operation is not None, operation, None
+
+        while pending:
+            _sleep(poll_interval)
+            for i, (done, operation, error) in zip(
+                list(pending), executor.map(poll, list(pending)), strict=True
+            ):
+                if not done:
+                    continue
+                del pending[i]
+                if operation is not None:
+                    outcomes[i] = outcomes[i]._replace(result=operation)
+                outcomes[i] = outcomes[i]._replace(error=error)
+    return outcomes
@@ -0,0 +1,226 @@
+"""
+HTTP sessions shared by the API clients.
+
+API clients send their requests through their ``http_client`` attribute,
+which can be any object with a ``requests.Session``-like method::
+
+    request(method, url, params=None, json=None, headers=None)
+
+returning a response with ``status_code``, ``content`` and ``text``
+attributes and a ``json()`` method. Requests must be signed with
+``exoscale_auth.ExoscaleV2Auth``. ``requests.Session``,
+:class:`ThreadLocalSession` and :class:`HTTP2Session` implement this
+interface.
+
+These sessions ask for compressed responses, with ``gzip`` and ``deflate``,
+as well as ``br`` and ``zstd`` when the ``brotli`` and ``zstandard`` packages
+are installed (``pip install exoscale[compression]``). Responses are
+decompressed incrementally as they are received.
+"""
+
+import os
+import threading
+import weakref
+
+import requests
+from exoscale_auth import ExoscaleV2Auth
+
+# Sessions created by create_session(), whose connections must not be reused
+# by forked processes.
+_sessions = weakref.WeakSet()
+
+
+class ThreadLocalSession:
+    """
+    Drop-in replacement for ``requests.Session.request()`` giving each thread
+    its own session, hence its own connection pool, while sharing a single
+    authentication object.
+
+    Args:
+        auth (requests.auth.AuthBase): authentication of all the sessions.
+    """
+
+    def __init__(self, auth):
+        self.auth = auth
+        self._reset()
+
+    def _reset(self):
+        self._local = threading.local()
+        # Sessions go away with their thread; this only keeps track of the
+        # live ones.
+        self._sessions = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<ThreadLocalSession sessions={len(self._sessions)}>"
+
+    @property
+    def session(self):
+        """
+        The session of the current thread.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.auth = self.auth
+            self._local.session = session
+            with self._lock:
+                self._sessions.add(session)
+        return session
+
+    def request(self, *args, **kwargs):
+        return self.session.request(*args, **kwargs)
+
+    def close(self):
+        """
+        Closes the sessions of all threads.
+        """
+        with self._lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            session.close()
+
+
+class HTTP2Session:
+    """
+    Sends requests over HTTP/2 with ``httpx``, multiplexing concurrent
+    requests over a single connection per endpoint. Unlike
+    ``requests.Session``, it is safe to share between threads.
+
+    Requests are prepared and signed by ``requests``, so that they are
+    signed exactly like with the default transport. Requires the ``http2``
+    extra (``pip install exoscale[http2]``).
+
+    Requests have no timeout by default, like with ``requests``, and
+    ``httpx`` transport errors are raised as their ``requests`` equivalent
+    (``requests.Timeout`` or ``requests.ConnectionError``), so that callers
+    handle them the same way with both transports.
+
+    Args:
+        auth (requests.auth.AuthBase): authentication of the requests.
+
+        kwargs: arguments of ``httpx.Client``, e.g. ``http1=False`` to use
+          HTTP/2 without TLS (prior knowledge), or ``timeout=30``.
+    """
+
+    def __init__(self, auth, **kwargs):
+        self.auth = auth
+        self._kwargs = kwargs
+        self._reset()
+
+    def _reset(self):
+        import httpx
+
+        self._transport_error = httpx.TransportError
+        self.client = httpx.Client(
+            http2=True, **{"timeout": None, **self._kwargs}
+        )
+
+    def __repr__(self):
+        return "<HTTP2Session>"
+
+    def request(self, method, url, params=None, json=None, headers=None):
+        prepared = requests.Request(
+            method, url, params=params, json=json, headers=headers
+        ).prepare()
+        self.auth(prepared)
+        try:
+            return self.client.request(
+                prepared.method,
+                prepared.url,
+                content=prepared.body,
+                headers=dict(prepared.headers),
+            )
+        except self._transport_error as e:
+            raise _requests_exception(e, prepared) from e
+
+    def close(self):
+        self.client.close()
+
+
+def _requests_exception(error, request):
+    """
+    Returns the ``requests`` exception equivalent to an ``httpx`` transport
+    error.
+    """
+    import httpx
+
+    if isinstance(error, httpx.ConnectTimeout):
+        cls = requests.ConnectTimeout
+    elif isinstance(error, httpx.TimeoutException):
+        cls = requests.ReadTimeout
+    else:
+        cls = requests.ConnectionError
+    return cls(str(error) or type(error).__name__, request=request)
+
+
+def wire_bytes(response):
+    """
+    Returns the size of the body of a response as transferred, before
+    decompression.
+    """
+    # httpx counts the bytes it received, unless the body was not streamed.
+    downloaded = getattr(response, "num_bytes_downloaded", None)
+    if isinstance(downloaded, int) and downloaded:
+        return downloaded
+    # urllib3 (requests) tells the position in the raw stream.
+    try:
+        position = response.raw.tell()
+    except (AttributeError, OSError, ValueError):
+        position = None
+    if isinstance(position, int):
+        return position
+    length = getattr(response, "headers", {}).get("Content-Length", "")
+    if length.isdigit():
+        return int(length)
+    return len(response.content)
+
+
+def _reset_session(session):
+    """
+    Drops the connection pools of a session without closing their sockets,
+    which are still in use by the parent process after a fork.
+    """
+    if isinstance(session, (ThreadLocalSession, HTTP2Session)):
+        # Other threads do not survive a fork, and a lock may have been
+        # held by one of them.
+        session._reset()
+        return
+    for adapter in session.adapters.values():
+        if isinstance(adapter, requests.adapters.HTTPAdapter):
+            adapter.init_poolmanager(
+                adapter._pool_connections,
+                adapter._pool_maxsize,
+                block=adapter._pool_block,
+            )
+            adapter.proxy_manager = {}
+
+
+def _reset_sessions_after_fork():
+    for session in list(_sessions):
+        _reset_session(session)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_sessions_after_fork)
+
+
+def create_session(key, secret, thread_safe=False, http2=False):
+    """
+    Returns a ``requests.Session`` signing its requests with the given
+    Exoscale API credentials, a :class:`ThreadLocalSession` if
+    ``thread_safe`` is set, or an :class:`HTTP2Session` if ``http2`` is set.
+
+    Connection pools of the returned session are reset in forked child
+    processes, so that parent and child never share a connection.
+    """
+    auth = ExoscaleV2Auth(key, secret)
+    if http2:
+        session = HTTP2Session(auth)
+    elif thread_safe:
+        session = ThreadLocalSession(auth)
+    else:
+        session = requests.Session()
+        session.auth = auth
+    _sessions.add(session)
+    return session
@@ -0,0 +1,318 @@
+"""
+
+``exoscale.api.sos`` transfers objects to and from SOS buckets through
+presigned URLs.
+
+Download URLs are obtained with ``get_sos_presigned_url``, which only signs
+``GET`` requests: uploads need a function returning URLs signed for ``PUT``
+requests, e.g. built with an S3 client. Presigned URLs are requested
+concurrently ahead of the transfers and cached until they expire, separately
+for downloads and uploads.
+
+Object data is streamed in chunks and never buffered in full: downloads are
+written to disk as they arrive, and large uploads are sent from a
+memory-mapped view of the file.
+
+Examples:
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.sos import Transfer
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> transfer = Transfer(c, "my-bucket", max_workers=16)
+    >>> report = transfer.download(
+    ...     [("logs/1.gz", "/tmp/1.gz"), ("logs/2.gz", "/tmp/2.gz")]
+    ... )
+    >>> report.errors
+    []
+    >>> f"{report.throughput / 2**20:.1f} MiB/s"
+    '87.3 MiB/s'
+"""
+
+import mmap
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+# Presigned URLs are renewed when they would expire within this many seconds.
+_EXPIRY_MARGIN = 30
+# Lifetime assumed for presigned URLs not carrying their expiration date.
+_DEFAULT_TTL = 300
+# Minimum number of cached URLs before expired ones are pruned.
+_PRUNE_MIN = 1024
+
+
+def _url_expiry(url, now):
+    """
+    Returns the expiration timestamp of a presigned URL, from its SigV4
+    (``X-Amz-Date`` + ``X-Amz-Expires``) or SigV2 (``Expires``) query
+    parameters.
+    """
+    query = {k.lower(): v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+    try:
+        if "x-amz-date" in query and "x-amz-expires" in query:
+            signed_at = datetime.strptime(
+                query["x-amz-date"], "%Y%m%dT%H%M%SZ"
+            ).replace(tzinfo=timezone.utc)
+            return signed_at.timestamp() + int(query["x-amz-expires"])
+        if "expires" in query:
+            return int(query["expires"])
+    except ValueError:
+        pass
+    return now + _DEFAULT_TTL
+
+
+class PresignedURLCache:
+    """
+    Cache of presigned URLs for the objects of a bucket.
+
+    Args:
+        client: API client.
+
+        bucket (str): bucket name.
+
+        max_workers (int): maximum number of concurrent
+          ``get_sos_presigned_url`` calls when prefetching. Defaults to
+          ``16``.
+
+        presign (callable): function of ``(bucket, key)`` returning a
+          presigned URL. Defaults to calling ``get_sos_presigned_url``.
+    """
+
+    def __init__(self, client, bucket, max_workers=16, presign=None):
+        self.bucket = bucket
+        self.max_workers = max_workers
+        if presign is None:
+
+            def presign(bucket, key):
+                return client.get_sos_presigned_url(bucket=bucket, key=key)[
+                    "url"
+                ]
+
+        self._presign = presign
+        self._urls = {}
+        # Size from which expired URLs are pruned when adding one, doubled
+        # afterwards so that pruning costs constant amortized time.
+        self._prune_at = _PRUNE_MIN
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns a presigned URL for ``key``, requesting a new one when none
+        is cached or the cached one is about to expire. Expired URLs of other
+        keys are dropped as the cache grows.
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._urls.get(key)
+        if cached is not None and cached[1] - _EXPIRY_MARGIN > now:
+            return cached[0]
+        url = self._presign(self.bucket, key)
+        with self._lock:
+            self._urls[key] = (url, _url_expiry(url, now))
+            if len(self._urls) >= self._prune_at:
+                self._urls = {
+                    k: cached
+                    for k, cached in self._urls.items()
+                    if cached[1] - _EXPIRY_MARGIN > now
+                }
+                self._prune_at = max(_PRUNE_MIN, 2 * len(self._urls))
+        return url
+
+    def prefetch(self, keys):
+        """
+        Requests presigned URLs for ``keys`` concurrently. Failures are
+        ignored here and surface when the URL is requested again with
+        :meth:`get`.
+        """
+
+        def get(key):
+            try:
+                self.get(key)
+            except Exception:
+                pass
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(get, keys))
+
+    def __len__(self):
+        return len(self._urls)
+
+
+TransferOutcome = namedtuple(
+    "TransferOutcome", ["key", "path", "bytes", "error"]
+)
+TransferOutcome.__doc__ = """
+Outcome of a single object transfer.
+
+Attributes:
+    key (str): object key.
+    path (str): local file path.
+    bytes (int): number of bytes transferred.
+    error (Exception): the exception raised by the transfer, if any.
+"""
+
+
+class TransferReport(namedtuple("TransferReport", ["outcomes", "seconds"])):
+    """
+    Outcomes of a batch of transfers.
+
+    Attributes:
+        outcomes (list): :class:`TransferOutcome` instances.
+        seconds (float): wall-clock duration of the batch.
+    """
+
+    __slots__ = ()
+
+    @property
+    def bytes(self):
+        return sum(o.bytes for o in self.outcomes)
+
+    @property
+    def throughput(self):
+        """
+        Transferred bytes per second.
+        """
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    @property
+    def errors(self):
+        return [o for o in self.outcomes if o.error is not None]
+
+
+class Transfer:
+    """
+    Transfers objects between local files and a bucket with a bounded pool
+    of workers.
+
+    Args:
+        client: API client.
+
+        bucket (str): bucket name.
+
+        max_workers (int): maximum number of concurrent transfers. Defaults
+          to ``8``.
+
+        chunk_size (int): size of the chunks streamed to disk on download.
+          Defaults to 1 MiB.
+
+        mmap_threshold (int): files at least this large are uploaded from a
+          memory map rather than read in blocks. Defaults to 8 MiB.
+
+        presign (callable): function of ``(bucket, key)`` returning a URL
+          presigned for downloading (``GET``). Defaults to calling
+          ``get_sos_presigned_url``.
+
+        upload_presign (callable): function of ``(bucket, key)`` returning a
+          URL presigned for uploading (``PUT``). Required by :meth:`upload`.
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket,
+        max_workers=8,
+        chunk_size=2**20,
+        mmap_threshold=8 * 2**20,
+        presign=None,
+        upload_presign=None,
+    ):
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.mmap_threshold = mmap_threshold
+        self.download_urls = PresignedURLCache(
+            client, bucket, max_workers=max_workers, presign=presign
+        )
+        self.upload_urls = None
+        if upload_presign is not None:
+            self.upload_urls = PresignedURLCache(
+                client, bucket, max_workers=max_workers, presign=upload_presign
+            )
+        # Presigned URLs carry their own signature: object transfers must not
+        # go through the API client's authenticated session.
+        self.http_client = requests.Session()
+
+    def _download(self, key, path):
+        url = self.download_urls.get(key)
+        with self.http_client.get(url, stream=True) as response:
+            response.raise_for_status()
+            size = 0
+            with open(path, "wb") as f:
+                for chunk in response.iter_content(self.chunk_size):
+                    f.write(chunk)
+                    size += len(chunk)
+        return size
+
+    def _upload(self, key, path):
+        url = self.upload_urls.get(key)
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= self.mmap_threshold:
+                with (
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+                    memoryview(mm) as data,
+                ):
+                    response = self.http_client.put(url, data=data)
+            else:
+                # Empty files are sent as an empty body: requests would
+                # otherwise use chunked encoding for a zero-length stream.
+                response = self.http_client.put(url, data=f if size else b"")
+        response.raise_for_status()
+        return size
+
+    def _run(self, fn, urls, items, keys):
+        start = time.monotonic()
+        urls.prefetch(keys)
+
+        def run(item):
+            key, path = item
+            try:
+                return TransferOutcome(key, path, fn(key, path), None)
+            except Exception as e:
+                return TransferOutcome(key, path, 0, e)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            outcomes = list(executor.map(run, items))
+        return TransferReport(outcomes, time.monotonic() - start)
+
+    def download(self, items):
+        """
+        Downloads objects to local files.
+
+        Args:
+            items (list): ``(key, path)`` tuples.
+
+        Returns:
+            TransferReport
+        """
+        items = list(items)
+        return self._run(
+            self._download, self.download_urls, items, [k for k, _ in items]
+        )
+
+    def upload(self, items):
+        """
+        Uploads local files as objects.
+
+        Args:
+            items (list): ``(key, path)`` tuples, as for :meth:`download`.
+
+        Returns:
+            TransferReport
+
+        Raises:
+            ValueError: if the transfer has no ``upload_presign`` function.
+        """
+        if self.upload_urls is None:
+            raise ValueError(
+                "Uploads require an upload_presign function returning URLs "
+                "presigned for PUT requests."
+            )
+        items = list(items)
+        return self._run(
+            self._upload, self.upload_urls, items, [k for k, _ in items]
+        )
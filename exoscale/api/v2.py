@@ -38,6 +38,23 @@ Examples:
          'link': '/v2/sks-cluster/8561ee34-09f0-42da-a765-abde807f944b',
          'command': 'get-sks-cluster'}}
 
+    Watching a listing for changes between polls:
+
+    >>> from exoscale.api.v2 import Client
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> for event in c.watch("list_instances", interval=30):
+    ...     print(event.type, event.key)
+    added 8561ee34-09f0-42da-a765-abde807f944b
+
+    Sharing a client between threads, each thread getting its own HTTP
+    session and connection pool:
+
+    >>> from concurrent.futures import ThreadPoolExecutor
+    >>> from exoscale.api.v2 import Client
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2", thread_safe=True)
+    >>> with ThreadPoolExecutor(max_workers=16) as pool:
+    ...     instances = list(pool.map(lambda id: c.get_instance(id=id), ids))
+
     In case of a conflict between argument names and Python keywords, ``**kwargs`` syntax can be used:
 
     >>> from exoscale.api.v2 import Client
@@ -50,15 +67,16 @@ import json
 import time
 from pathlib import Path
 
-import requests
-from exoscale_auth import ExoscaleV2Auth
-
+from .codegen import load_generated_client
 from .generator import (
-    _return_docstring,
+    _reduce_client,
+    _returns_section,
     create_client_class,
     ExoscaleAPIClientException,
     ExoscaleAPIServerException,
 )
+from .session import create_session
+from .watch import Watcher
 
 
 def _poll_interval(run_time):
@@ -92,20 +110,45 @@ def _sleep(start_time):
     return time.sleep(interval)
 
 
-with open(Path(__file__).parent.parent / "openapi.json", "r") as f:
-    api_spec = json.load(f)
-    BaseClient = create_client_class(api_spec)
+BaseClient = load_generated_client("openapi.json")
+if BaseClient is None:
+    with open(Path(__file__).parent.parent / "openapi.json", "r") as f:
+        BaseClient = create_client_class(json.load(f))
+
+
+def __getattr__(name):
+    # The API definition is only loaded when needed by generated clients.
+    if name == "api_spec":
+        return BaseClient._api_spec
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class Client(BaseClient):
-    def __init__(self, key, secret, *args, url=None, **kwargs):
+    def __init__(
+        self,
+        key,
+        secret,
+        *args,
+        url=None,
+        thread_safe=False,
+        http2=False,
+        pickle_secret=False,
+        **kwargs,
+    ):
         super().__init__(*args, url=url, **kwargs)
         self.WAIT_ABORT_ERRORS_COUNT = 5
 
-        client = requests.Session()
-        client.auth = ExoscaleV2Auth(key, secret)
-        self.http_client = client
+        self.http_client = create_session(
+            key, secret, thread_safe=thread_safe, http2=http2
+        )
         self.key = key
+        self.thread_safe = thread_safe
+        self.http2 = http2
+        self.pickle_secret = pickle_secret
+        self._secret = secret
+
+    def __reduce__(self):
+        return _reduce_client(self)
 
     def __repr__(self):
         return (
@@ -113,6 +156,51 @@ class Client(BaseClient):
             f" key={self.key} secret=***masked***>"
         )
 
+    def poll_operation(self, operation_id: str, errors: int = 0):
+        """
+        Poll an asynchronous operation once, without waiting.
+
+        Server errors are tolerated until ``WAIT_ABORT_ERRORS_COUNT``
+        consecutive ones, counted across polls: pass the count returned by
+        the previous poll of the same operation.
+
+        Args:
+            operation_id (str)
+            errors (int): number of consecutive server errors of the
+              previous polls. Defaults to ``0``.
+
+        Returns:
+            tuple: ``(operation, errors)``, the operation once it completed
+            successfully or ``None`` while it is pending or after a
+            tolerated server error, and the number of consecutive server
+            errors.
+
+        Raises:
+            ExoscaleAPIServerException: if the operation failed or timed out,
+              the operation being the exception ``response``, or after too
+              many server errors.
+        """
+        try:
+            result = self.get_operation(id=operation_id)
+        except ExoscaleAPIServerException as e:
+            errors += 1
+            if errors >= self.WAIT_ABORT_ERRORS_COUNT:
+                raise ExoscaleAPIServerException(
+                    "Server error while polling operation"
+                ) from e
+            return None, errors
+        state = result["state"]
+        if state == "success":
+            return result, 0
+        elif state in {"failure", "timeout"}:
+            raise ExoscaleAPIServerException(
+                f"Operation error: {state}, {result.get('reason')}",
+                response=result,
+            )
+        elif state == "pending":
+            return None, 0
+        raise ExoscaleAPIServerException(f"Invalid operation state: {state}")
+
     def wait(self, operation_id: str, max_wait_time: int = None):
         """
         Wait for completion of an asynchronous operation.
@@ -127,41 +215,44 @@ class Client(BaseClient):
             {ret}
         """
         start_time = _time()
-        subsequent_errors = 0
+        errors = 0
         while True:
-            try:
-                result = self.get_operation(id=operation_id)
-                subsequent_errors = 0
-            except ExoscaleAPIServerException as e:
-                subsequent_errors += 1
-                if subsequent_errors >= self.WAIT_ABORT_ERRORS_COUNT:
-                    raise ExoscaleAPIServerException(
-                        "Server error while polling operation"
-                    ) from e
-                _sleep(start_time)
-                continue
-            state = result["state"]
-            if state == "success":
+            result, errors = self.poll_operation(operation_id, errors)
+            if result is not None:
                 return result
-            elif state in {"failure", "timeout"}:
-                raise ExoscaleAPIServerException(
-                    f"Operation error: {state}, {result['reason']}"
-                )
-            elif state == "pending":
+            if not errors:
+                # Pending operation.
                 run_time = _time() - start_time
                 if max_wait_time is not None and run_time > max_wait_time:
                     raise ExoscaleAPIClientException(
                         "Operation max wait time reached"
                     )
-                _sleep(start_time)
-            else:
-                raise ExoscaleAPIServerException(
-                    f"Invalid operation state: {state}"
-                )
+            _sleep(start_time)
+
+    def watch(self, operation: str, interval: float = 10, key="id", **kwargs):
+        """
+        Poll a ``list_*`` operation and yield the changes between polls.
+
+        Items are indexed by ``key``: on the first poll every item is
+        reported as added, then only added, removed and changed items are
+        reported. Use :class:`exoscale.api.watch.Watcher` to run several
+        watches on one schedule or to dispatch events to a callback.
+
+        Args:
+            operation (str): operation name, e.g. ``"list_instances"``.
+            interval (float): time in seconds between two polls.
+            key (str or callable): item attribute (or function of the item)
+              identifying an item across polls. Defaults to ``"id"``.
+            kwargs: parameters passed to the operation.
+
+        Yields:
+            WatchEvent: see :class:`exoscale.api.watch.WatchEvent`.
+        """
+        watcher = Watcher(interval=interval)
+        watcher.add(self, operation, key=key, **kwargs)
+        return watcher.events()
 
 
 Client.wait.__doc__ = Client.wait.__doc__.format(
-    ret=_return_docstring(
-        Client._api_spec, Client._by_operation["get-operation"]["operation"]
-    )
+    ret=_returns_section(Client.get_operation.__doc__)
 )
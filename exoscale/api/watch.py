@@ -0,0 +1,259 @@
+"""
+
+``exoscale.api.watch`` polls ``list_*`` operations on a fixed schedule and
+reports the differences between two consecutive results as events.
+
+Examples:
+    Watching the instances of a zone:
+
+    >>> from exoscale.api.v2 import Client
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> for event in c.watch("list_instances", interval=30):
+    ...     print(event.type, event.key)
+    added 8561ee34-09f0-42da-a765-abde807f944b
+    changed 8561ee34-09f0-42da-a765-abde807f944b
+
+    Running several watches on a single schedule:
+
+    >>> from exoscale.api.watch import Watcher
+    >>> w = Watcher(interval=30)
+    >>> w.add(c, "list_instances")
+    >>> w.add(c, "list_load_balancers")
+    >>> w.run(print)
+"""
+
+import time
+from collections import namedtuple
+
+import requests
+
+from .exceptions import ExoscaleAPIServerException
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+# Errors after which a watch is polled again later.
+_TRANSIENT_ERRORS = (
+    ExoscaleAPIServerException,
+    requests.ConnectionError,
+    requests.Timeout,
+)
+# Maximum number of polls a failing watch skips.
+_MAX_SKIPPED_POLLS = 15
+
+WatchEvent = namedtuple(
+    "WatchEvent", ["type", "operation", "key", "item", "previous"]
+)
+WatchEvent.__doc__ = """
+An event emitted when an item appears, disappears or changes between two
+polls.
+
+Attributes:
+    type (str): one of ``'added'``, ``'removed'`` or ``'changed'``.
+    operation (str): name of the polled operation.
+    key: value identifying the item, as extracted by the watch ``key``.
+    item (dict): current version of the item, ``None`` when removed.
+    previous (dict): previous version of the item, ``None`` when added.
+"""
+
+
+def _time():
+    return time.time()
+
+
+def _sleep(seconds):
+    return time.sleep(seconds)
+
+
+def _operation_method(client, operation):
+    """
+    Returns the bound client method for an operation name, accepting both the
+    API (``list-instances``) and Python (``list_instances``) spellings.
+    """
+    name = operation.replace("-", "_")
+    method = getattr(client, name, None)
+    if method is None:
+        raise TypeError(f"Unknown operation {operation!r}.")
+    return method
+
+
+def _list_items(result):
+    """
+    Returns the list of items held by a ``list_*`` response, which is either
+    a bare list or a dict with a single list value. Empty listings may omit
+    the list altogether.
+    """
+    if result is None:
+        return []
+    if isinstance(result, list):
+        return result
+    lists = [v for v in result.values() if isinstance(v, list)]
+    if not lists:
+        return []
+    if len(lists) > 1:
+        raise ValueError(
+            "Unable to find the list of items in response with keys "
+            f"{sorted(result)!r}."
+        )
+    return lists[0]
+
+
+def _key_function(key):
+    if callable(key):
+        return key
+    return lambda item: item[key]
+
+
+def _diff(snapshot, items, key, operation):
+    """
+    Compares a fresh list of items with the previous snapshot (a dict indexed
+    by key). Returns the new snapshot and the list of events.
+
+    Unchanged items are carried over from the previous snapshot so that the
+    freshly decoded copies can be released right away.
+    """
+    get_key = _key_function(key)
+    new_snapshot = {}
+    events = []
+    for item in items:
+        k = get_key(item)
+        previous = snapshot.get(k)
+        if previous is None:
+            new_snapshot[k] = item
+            events.append(WatchEvent(ADDED, operation, k, item, None))
+        elif previous == item:
+            new_snapshot[k] = previous
+        else:
+            new_snapshot[k] = item
+            events.append(WatchEvent(CHANGED, operation, k, item, previous))
+    for k, previous in snapshot.items():
+        if k not in new_snapshot:
+            events.append(WatchEvent(REMOVED, operation, k, None, previous))
+    return new_snapshot, events
+
+
+class Watch:
+    """
+    Tracks the result of one ``list_*`` operation between polls.
+
+    Args:
+        client: API client used to call the operation.
+
+        operation (str): operation name, e.g. ``'list_instances'``.
+
+        key (str or callable): item attribute (or function of the item)
+          identifying an item across polls. Defaults to ``'id'``.
+
+        parameters: keyword arguments passed to the operation.
+    """
+
+    def __init__(self, client, operation, key="id", **parameters):
+        self.operation = operation.replace("-", "_")
+        self.key = key
+        self.parameters = parameters
+        self.snapshot = {}
+        # Consecutive failed polls, and polls to skip before the next one.
+        self.errors = 0
+        self._skip = 0
+        self._method = _operation_method(client, operation)
+
+    def __repr__(self):
+        return f"<Watch operation={self.operation} items={len(self.snapshot)}>"
+
+    def poll(self):
+        """
+        Calls the operation once and returns the events since the previous
+        poll. On the first poll, every existing item is reported as added.
+
+        Returns:
+            list: :class:`WatchEvent` instances.
+        """
+        items = _list_items(self._method(**self.parameters))
+        self.snapshot, events = _diff(
+            self.snapshot, items, self.key, self.operation
+        )
+        return events
+
+
+class Watcher:
+    """
+    Polls several watches on a single schedule.
+
+    Args:
+        interval (float): time in seconds between the start of two polls.
+          Defaults to ``10``.
+    """
+
+    def __init__(self, interval=10):
+        self.interval = interval
+        self.watches = []
+
+    def add(self, client, operation, key="id", **parameters):
+        """
+        Registers a new watch. See :class:`Watch` for the arguments.
+
+        Returns:
+            Watch: the registered watch.
+        """
+        watch = Watch(client, operation, key=key, **parameters)
+        self.watches.append(watch)
+        return watch
+
+    def poll(self):
+        """
+        Polls every watch once.
+
+        A watch whose poll fails with a server or connection error is
+        skipped, its snapshot unchanged, and polled again after a number of
+        intervals doubling with each consecutive failure, up to
+        ``_MAX_SKIPPED_POLLS``. Other errors are raised.
+
+        Returns:
+            list: :class:`WatchEvent` instances of all watches.
+        """
+        events = []
+        for watch in self.watches:
+            if watch._skip:
+                watch._skip -= 1
+                continue
+            try:
+                events.extend(watch.poll())
+            except _TRANSIENT_ERRORS:
+                watch.errors += 1
+                watch._skip = min(
+                    2 ** (watch.errors - 1) - 1, _MAX_SKIPPED_POLLS
+                )
+                continue
+            watch.errors = 0
+        return events
+
+    def events(self):
+        """
+        Polls forever, yielding events as they are detected. Server and
+        connection errors do not interrupt the watch, see :meth:`poll`.
+
+        Yields:
+            WatchEvent
+        """
+        next_poll = _time()
+        while True:
+            yield from self.poll()
+            next_poll += self.interval
+            delay = next_poll - _time()
+            if delay > 0:
+                _sleep(delay)
+            else:
+                # Polling took longer than the interval: start over from now
+                # rather than issuing a burst of late polls.
+                next_poll = _time()
+
+    def __iter__(self):
+        return self.events()
+
+    def run(self, callback):
+        """
+        Polls forever, calling ``callback(event)`` for every event.
+        """
+        for event in self.events():
+            callback(event)
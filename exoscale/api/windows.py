@@ -0,0 +1,312 @@
+"""
+
+``exoscale.api.windows`` fetches time-ranged data (events, usage and impact
+reports) as a series of smaller windows fetched concurrently.
+
+Windows which are over — and whose data therefore no longer changes — can be
+kept in a :class:`WindowCache`, so that repeating a query only fetches the
+most recent windows.
+
+Examples:
+    >>> from datetime import datetime, timedelta, timezone
+    >>> from exoscale.api.v2 import Client
+    >>> from exoscale.api.windows import WindowCache, fetch_events
+    >>> c = Client("api-key", "api-secret", zone="ch-gva-2")
+    >>> cache = WindowCache("/var/cache/exoscale-events")
+    >>> end = datetime.now(timezone.utc)
+    >>> for event in fetch_events(
+    ...     c, end - timedelta(days=30), end, window=timedelta(days=1),
+    ...     cache=cache,
+    ... ):
+    ...     print(event["timestamp"], event["handler"])
+    2025-03-10T14:52:34Z authenticate
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from hashlib import sha256
+
+from .logs import _parse_time
+
+# Events may be recorded shortly after they happened: a window is only
+# considered over once this delay has passed after its end.
+_SETTLE_DELAY = timedelta(minutes=5)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _as_datetime(value):
+    if isinstance(value, str):
+        value = _parse_time(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _format_time(value):
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def split_windows(start, end, window):
+    """
+    Splits the ``[start, end)`` time range into consecutive windows.
+
+    Args:
+        start (datetime or str): range start.
+
+        end (datetime or str): range end.
+
+        window (timedelta): window duration. The last window may be shorter.
+
+    Returns:
+        list: ``(start, end)`` tuples of timezone-aware datetimes.
+    """
+    start, end = _as_datetime(start), _as_datetime(end)
+    windows = []
+    while start < end:
+        windows.append((start, min(start + window, end)))
+        start += window
+    return windows
+
+
+class WindowCache:
+    """
+    Cache of the results of closed windows, kept in memory and, if ``path``
+    is set, as JSON files in that directory.
+
+    Args:
+        path (str): directory where results are persisted. Defaults to
+          ``None``, for an in-memory cache.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        name = sha256(json.dumps(key).encode()).hexdigest()
+        return os.path.join(self.path, f"{name}.json")
+
+    def get(self, key):
+        """
+        Returns the cached result for ``key``, or ``None``.
+        """
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+        if self.path is None:
+            return None
+        try:
+            with open(self._file(key)) as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._entries[key] = value
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+        if self.path is not None:
+            # Write then rename, so that readers never see a partial file.
+            tmp = f"{self._file(key)}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp, self._file(key))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def fetch_windows(
+    fetch, windows, max_workers=4, cache=None, closed=None, scope=None
+):
+    """
+    Calls ``fetch(window)`` for every window concurrently and yields the
+    results in window order, as soon as all previous windows are done.
+
+    Args:
+        fetch (callable): function of a window returning a JSON-serializable
+          result.
+
+        windows (list): hashable, JSON-serializable window descriptions.
+
+        max_workers (int): maximum number of concurrent fetches.
+
+        cache (WindowCache): cache for the results of closed windows.
+
+        closed (callable): function of a window telling whether its result
+          is final and can be cached. Defaults to never caching.
+
+        scope: JSON-serializable, hashable value identifying what the
+          results depend on besides the window, e.g. the API endpoint and
+          key, added to the cache keys.
+
+    Yields:
+        tuple: ``(window, result)``.
+    """
+
+    def run(window):
+        if cache is None or closed is None or not closed(window):
+            return fetch(window)
+        key = window if scope is None else (scope, window)
+        result = cache.get(key)
+        if result is None:
+            result = fetch(window)
+            cache.put(key, result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield from zip(windows, executor.map(run, windows), strict=False)
+
+
+def _scope(client):
+    # Cached results are only valid for the same zone and organization.
+    return client.endpoint, getattr(client, "key", None)
+
+
+def _event_key(event):
+    return event.get("request-id") or json.dumps(event, sort_keys=True)
+
+
+def fetch_events(
+    client, start, end, window=timedelta(hours=6), max_workers=4, cache=None
+):
+    """
+    Yields the events between ``start`` and ``end`` in timestamp order,
+    fetching ``list_events`` over consecutive windows concurrently.
+
+    Events reported by two adjacent windows (logged on their common bound)
+    are only yielded once.
+
+    Args:
+        client: API client.
+
+        start (datetime or str): range start.
+
+        end (datetime or str): range end.
+
+        window (timedelta): duration of the windows. Defaults to 6 hours.
+
+        max_workers (int): maximum number of concurrent requests.
+
+        cache (WindowCache): cache for windows ended for more than 5
+          minutes.
+
+    Yields:
+        dict: events.
+    """
+    windows = [
+        ("list-events", _format_time(s), _format_time(e))
+        for s, e in split_windows(start, end, window)
+    ]
+    settled = _now() - _SETTLE_DELAY
+
+    def fetch(window):
+        _, s, e = window
+        return client.list_events(**{"from": s, "to": e})
+
+    def closed(window):
+        return _as_datetime(window[2]) <= settled
+
+    last_time = None
+    seen_at_last_time = set()
+    for _, events in fetch_windows(
+        fetch, windows, max_workers, cache, closed, _scope(client)
+    ):
+        for event in sorted(events, key=lambda e: _parse_time(e["timestamp"])):
+            event_time = _parse_time(event["timestamp"])
+            key = _event_key(event)
+            if event_time == last_time:
+                if key in seen_at_last_time:
+                    continue
+            else:
+                last_time = event_time
+                seen_at_last_time = set()
+            seen_at_last_time.add(key)
+            yield event
+
+
+def fetch_impact_reports(
+    client, start, end, window=timedelta(days=30), max_workers=4, cache=None
+):
+    """
+    Fetches ``get_impact_report`` over consecutive windows concurrently.
+
+    Reports are aggregates, so they are yielded per window rather than
+    merged.
+
+    Args:
+        client: API client.
+
+        start (datetime or str): range start.
+
+        end (datetime or str): range end.
+
+        window (timedelta): duration of the windows. Defaults to 30 days.
+
+        max_workers (int): maximum number of concurrent requests.
+
+        cache (WindowCache): cache for windows ended for more than 5
+          minutes.
+
+    Yields:
+        tuple: ``((start, end), report)``, bounds as ISO 8601 strings.
+    """
+    windows = [
+        ("get-impact-report", _format_time(s), _format_time(e))
+        for s, e in split_windows(start, end, window)
+    ]
+    settled = _now() - _SETTLE_DELAY
+
+    def fetch(window):
+        _, s, e = window
+        return client.get_impact_report(**{"from": s, "to": e})
+
+    def closed(window):
+        return _as_datetime(window[2]) <= settled
+
+    for window, report in fetch_windows(
+        fetch, windows, max_workers, cache, closed, _scope(client)
+    ):
+        yield window[1:], report
+
+
+def fetch_usage_reports(client, periods, max_workers=4, cache=None):
+    """
+    Fetches ``get_usage_report`` for several periods concurrently.
+
+    Args:
+        client: API client.
+
+        periods (list): periods in ``YYYY-MM`` format.
+
+        max_workers (int): maximum number of concurrent requests.
+
+        cache (WindowCache): cache for the reports of past months.
+
+    Yields:
+        tuple: ``(period, report)``, in the order of ``periods``.
+    """
+    current = _now().strftime("%Y-%m")
+    windows = [("get-usage-report", period) for period in periods]
+
+    def fetch(window):
+        return client.get_usage_report(period=window[1])
+
+    def closed(window):
+        return window[1] < current
+
+    for window, report in fetch_windows(
+        fetch, windows, max_workers, cache, closed, _scope(client)
+    ):
+        yield window[1], report
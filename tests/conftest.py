@@ -0,0 +1,55 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture
+def http_server():
+    """
+    Starts local HTTP servers, stopped at the end of the test.
+
+    Returns a function of ``(respond, path="")`` starting a server and
+    returning it, ``respond`` being a function of the request handler
+    returning the ``(status, body)`` of every response. Bodies other than
+    bytes are sent as JSON. The request body is available as
+    ``request.body``. The server ``url`` ends with ``path`` and its
+    ``paths`` attribute lists the paths requested.
+    """
+    servers = []
+
+    def start(respond, path=""):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.body = self.rfile.read(length)
+                server.paths.append(self.path)
+                status, body = respond(self)
+                self.send_response(status)
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_PUT = do_POST = do_DELETE = _respond
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.paths = []
+        server.url = f"http://127.0.0.1:{server.server_port}{path}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,221 @@
+import pickle
+from unittest.mock import patch
+
+import pytest
+
+from exoscale.api import circuit
+from exoscale.api.circuit import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    circuit_breakers,
+)
+from exoscale.api.exceptions import (
+    ExoscaleAPIAuthException,
+    ExoscaleAPICircuitOpenException,
+    ExoscaleAPIClientException,
+    ExoscaleAPIServerException,
+)
+from exoscale.api.v2 import Client
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+
+
+@pytest.fixture
+def clock():
+    now = [1000.0]
+    with (
+        patch.dict(circuit._breakers, clear=True),
+        patch("exoscale.api.circuit._time", lambda: now[0]),
+    ):
+        yield now
+
+
+def test_breaker_opens_on_failure_rate(clock):
+    breaker = CircuitBreaker("e", failure_rate=0.5, min_calls=4)
+    for error in (None, None, None):
+        breaker.before_call()
+        breaker.after_call(0.1, error)
+    breaker.before_call()
+    breaker.after_call(0.1, ExoscaleAPIServerException("boom"))
+    assert breaker.state == CLOSED
+
+    # 4xx errors are the caller's fault, not the endpoint's.
+    breaker.before_call()
+    breaker.after_call(0.1, ExoscaleAPIClientException("bad"))
+    assert breaker.state == CLOSED
+
+    # 4 failures out of 8 calls.
+    for _ in range(3):
+        assert breaker.state == CLOSED
+        breaker.before_call()
+        breaker.after_call(0.1, ConnectionError())
+    assert breaker.state == OPEN
+    with pytest.raises(ExoscaleAPICircuitOpenException):
+        breaker.before_call()
+
+
+def test_breaker_window(clock):
+    breaker = CircuitBreaker("e", min_calls=2, window=10)
+    breaker.before_call()
+    breaker.after_call(0.1, ConnectionError())
+    clock[0] += 11
+    breaker.before_call()
+    breaker.after_call(0.1, ConnectionError())
+    # The first failure is out of the window.
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["calls"] == 1
+    assert breaker._failures == 1
+    breaker.before_call()
+    breaker.after_call(0.1, ConnectionError())
+    assert breaker.state == OPEN
+
+
+def test_breaker_interrupted_calls(clock):
+    breaker = CircuitBreaker("e", min_calls=2)
+    for error in [KeyboardInterrupt(), SystemExit(), ConnectionError()]:
+        breaker.before_call()
+        breaker.after_call(0.1, error)
+    # Interruptions are neither successes nor failures.
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["calls"] == 1
+    breaker.before_call()
+    breaker.after_call(0.1, ConnectionError())
+    assert breaker.state == OPEN
+
+
+def test_breaker_half_open(clock):
+    breaker = CircuitBreaker("e", min_calls=1, open_timeout=30)
+    breaker.before_call()
+    breaker.after_call(0.1, ConnectionError())
+    assert breaker.state == OPEN
+
+    clock[0] += 31
+    probe = breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time.
+    with pytest.raises(ExoscaleAPICircuitOpenException):
+        breaker.before_call()
+    breaker.after_call(0.1, ConnectionError(), probe)
+    assert breaker.state == OPEN
+
+    clock[0] += 31
+    probe = breaker.before_call()
+    breaker.after_call(0.1, probe=probe)
+    assert breaker.state == CLOSED
+    assert breaker.before_call() is None
+
+
+def test_breaker_stale_calls(clock):
+    breaker = CircuitBreaker("e", min_calls=1, open_timeout=30)
+    assert breaker.before_call() is None
+    breaker.before_call()
+    breaker.after_call(0.1, ConnectionError())
+    assert breaker.state == OPEN
+
+    clock[0] += 31
+    probe = breaker.before_call()
+    # A call admitted while closed completes during the probe.
+    breaker.after_call(0.1)
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(ExoscaleAPICircuitOpenException):
+        breaker.before_call()
+    # An interrupted probe frees its slot without closing the circuit.
+    breaker.after_call(0.1, KeyboardInterrupt(), probe)
+    assert breaker.state == HALF_OPEN
+    probe = breaker.before_call()
+    breaker.after_call(0.1, ConnectionError(), probe)
+    assert breaker.state == OPEN
+    # Tokens of earlier probes are ignored.
+    clock[0] += 31
+    new_probe = breaker.before_call()
+    breaker.after_call(0.1, probe=probe)
+    assert breaker.state == HALF_OPEN
+    breaker.after_call(0.1, probe=new_probe)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_slow_calls(clock):
+    breaker = CircuitBreaker("e", min_calls=2, slow_call=1)
+    breaker.before_call()
+    breaker.after_call(0.5)
+    breaker.before_call()
+    breaker.after_call(5)
+    assert breaker.state == OPEN
+
+
+def test_breaker_snapshot(clock):
+    breaker = CircuitBreaker("e")
+    assert breaker.snapshot()["latency_p50"] is None
+    for latency in (0.1, 0.2, 0.3, 0.4):
+        breaker.before_call()
+        breaker.after_call(latency)
+    breaker.before_call()
+    breaker.after_call(1.0, ConnectionError())
+    snapshot = breaker.snapshot()
+    assert snapshot["state"] == "closed"
+    assert snapshot["calls"] == 5
+    assert snapshot["failures"] == 1
+    assert snapshot["failure_rate"] == 0.2
+    assert snapshot["latency_p50"] == 0.3
+    assert snapshot["latency_p95"] == 1.0
+
+
+def test_client_auth_errors(clock, requests_mock):
+    client = Client("key", "secret", zone="ch-gva-2", circuit_breaker=True)
+    requests_mock.get(f"{URL}/instance", status_code=403, text="denied")
+    for _ in range(20):
+        with pytest.raises(ExoscaleAPIAuthException):
+            client.list_instances()
+    # A client with a bad key does not block the endpoint for the others.
+    assert client.circuit_breaker.state == CLOSED
+    assert circuit_breakers()[URL]["failures"] == 0
+
+
+def test_client_circuit_breaker(clock, requests_mock):
+    client = Client("key", "secret", zone="ch-gva-2", circuit_breaker=True)
+    other = Client("key", "secret", zone="ch-gva-2", circuit_breaker=True)
+    assert client.circuit_breaker is other.circuit_breaker
+    assert Client("key", "secret").circuit_breaker is None
+
+    requests_mock.get(f"{URL}/instance", status_code=503, text="down")
+    for _ in range(10):
+        with pytest.raises(ExoscaleAPIServerException, match="503"):
+            client.list_instances()
+    assert requests_mock.call_count == 10
+
+    # The circuit is open for every client of the endpoint.
+    with pytest.raises(ExoscaleAPICircuitOpenException):
+        other.list_instances()
+    assert requests_mock.call_count == 10
+    assert circuit_breakers()[URL]["state"] == "open"
+
+    clock[0] += 31
+    requests_mock.get(f"{URL}/instance", json={"instances": []})
+    assert client.list_instances() == {"instances": []}
+    assert circuit_breakers()[URL]["state"] == "closed"
+
+    client.pickle_secret = True
+    copy = pickle.loads(pickle.dumps(client))
+    assert copy.circuit_breaker is client.circuit_breaker
+
+
+def test_pickle_custom_breaker(clock):
+    breaker = CircuitBreaker(URL, min_calls=3, open_timeout=5, slow_call=2)
+    breaker.after_call(0.1, ExoscaleAPIServerException("down"))
+    client = Client(
+        "key",
+        "secret",
+        zone="ch-gva-2",
+        circuit_breaker=breaker,
+        pickle_secret=True,
+    )
+    copy = pickle.loads(pickle.dumps(client)).circuit_breaker
+    # Same configuration, fresh statistics, not shared.
+    assert isinstance(copy, CircuitBreaker)
+    assert copy is not breaker
+    assert URL not in circuit_breakers()
+    assert (copy.endpoint, copy.min_calls, copy.open_timeout) == (URL, 3, 5)
+    assert copy.slow_call == 2
+    assert copy.snapshot()["calls"] == 0
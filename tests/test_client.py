@@ -164,6 +164,28 @@ def test_wait_time_success(requests_mock):
         assert len(sleep.call_args_list) == 2
 
 
+def test_poll_operation(requests_mock):
+    url = "https://api-ch-gva-2.exoscale.com/v2/operation/op"
+    client = Client(key="EXOtest", secret="sdsd")
+    requests_mock.get(
+        url, _mock_poll_response(1, status_code=500) + _mock_poll_response(2)
+    )
+    assert client.poll_operation("op") == (None, 1)
+    assert client.poll_operation("op", 1) == (None, 0)
+    operation, errors = client.poll_operation("op")
+    assert (operation["state"], errors) == ("success", 0)
+
+    requests_mock.get(url, _mock_poll_response(1, status_code=500))
+    with pytest.raises(ExoscaleAPIServerException, match="polling"):
+        client.poll_operation("op", client.WAIT_ABORT_ERRORS_COUNT - 1)
+
+    requests_mock.get(url, _mock_poll_response(1, result="timeout"))
+    with pytest.raises(ExoscaleAPIServerException) as exc:
+        client.poll_operation("op")
+    assert str(exc.value) == "Operation error: timeout, some reason"
+    assert exc.value.response["state"] == "timeout"
+
+
 def test_wait_time_poll_errors(requests_mock):
     requests_mock.get(
         "https://api-ch-gva-2.exoscale.com/v2/operation/e2047130-b86e-11ef-83b3-0d8312b2c2d7",  # noqa
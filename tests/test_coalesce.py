@@ -0,0 +1,165 @@
+import asyncio
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from exoscale.api.exceptions import ExoscaleAPIServerException
+from exoscale.api.v2 import Client
+
+ID = "00000000-0000-0000-0000-000000000000"
+
+
+@pytest.fixture
+def api_server(http_server):
+    release = threading.Event()
+
+    def respond(request):
+        # Hold the response until the test lets it through, so that
+        # concurrent calls pile up behind it.
+        release.wait(5)
+        status = 500 if "fail" in request.path else 200
+        return status, {"path": request.path, "tags": []}
+
+    server = http_server(respond, "/v2")
+    server.release = release
+    yield server
+    release.set()
+
+
+def _release_when(server, condition):
+    def release():
+        while not condition():
+            threading.Event().wait(0.01)
+        server.release.set()
+
+    thread = threading.Thread(target=release, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_coalesce_identical_gets(api_server):
+    client = Client(
+        "key", "secret", url=api_server.url, thread_safe=True, coalesce=True
+    )
+    _release_when(api_server, lambda: client.stats["coalesced"] == 7)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(lambda _: client.get_instance(id=ID), range(8))
+        )
+
+    assert api_server.paths == [f"/v2/instance/{ID}"]
+    assert client.stats["coalesced"] == 7
+    assert all(r == results[0] for r in results)
+    # Every caller gets its own copy.
+    assert len({id(r) for r in results}) == 8
+    results[0]["tags"].append("changed")
+    assert results[1]["tags"] == []
+
+
+def test_coalesce_errors(api_server):
+    client = Client(
+        "key", "secret", url=api_server.url, thread_safe=True, coalesce=True
+    )
+    _release_when(api_server, lambda: client.stats["coalesced"] == 3)
+
+    def get(_):
+        with pytest.raises(ExoscaleAPIServerException) as e:
+            client.get_instance(id="fail")
+        return e.value
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        errors = list(executor.map(get, range(4)))
+    assert len(api_server.paths) == 1
+    # Every caller gets its own exception, chained to the shared one.
+    assert len({id(e) for e in errors}) == 4
+    (shared,) = [e for e in errors if e.__cause__ is None]
+    assert all(e.__cause__ is shared for e in errors if e is not shared)
+    assert all(str(e) == str(shared) for e in errors)
+
+
+def test_coalesce_interrupted(api_server):
+    client = Client(
+        "key", "secret", url=api_server.url, thread_safe=True, coalesce=True
+    )
+    api_server.release.set()
+    send = client._send
+    calls = []
+
+    class Interrupted(BaseException):
+        pass
+
+    def interrupted_send(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            while client.stats["coalesced"] < 3:
+                threading.Event().wait(0.01)
+            raise Interrupted()
+        return send(*args)
+
+    client._send = interrupted_send
+
+    def get(_):
+        try:
+            return client.get_instance(id=ID)
+        except Interrupted:
+            return "interrupted"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(get, range(4)))
+    # The waiting callers sent the request themselves instead of getting
+    # the result the interrupted one never had.
+    assert results.count("interrupted") == 1
+    assert [r for r in results if r != "interrupted"] == [
+        {"path": f"/v2/instance/{ID}", "tags": []}
+    ] * 3
+    assert len(api_server.paths) >= 1
+
+
+def test_coalesce_distinct_parameters(api_server):
+    client = Client(
+        "key", "secret", url=api_server.url, thread_safe=True, coalesce=True
+    )
+    _release_when(api_server, lambda: len(api_server.paths) == 2)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(lambda id: client.get_instance(id=id), ["a", "b"]))
+    assert sorted(api_server.paths) == ["/v2/instance/a", "/v2/instance/b"]
+    assert client.stats["coalesced"] == 0
+
+
+def test_no_coalescing_by_default(api_server):
+    client = Client("key", "secret", url=api_server.url, thread_safe=True)
+    _release_when(api_server, lambda: len(api_server.paths) == 4)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: client.get_instance(id=ID), range(4)))
+    assert len(api_server.paths) == 4
+
+
+def test_coalesce_asyncio(api_server):
+    client = Client(
+        "key", "secret", url=api_server.url, thread_safe=True, coalesce=True
+    )
+    _release_when(api_server, lambda: client.stats["coalesced"] == 3)
+
+    async def main():
+        return await asyncio.gather(
+            *(asyncio.to_thread(client.get_instance, id=ID) for _ in range(4))
+        )
+
+    results = asyncio.run(main())
+    assert len(results) == 4
+    assert len(api_server.paths) == 1
+
+
+def test_coalesce_only_reads(requests_mock):
+    client = Client(
+        "key", "secret", zone="ch-gva-2", coalesce=True, pickle_secret=True
+    )
+    requests_mock.post(
+        "https://api-ch-gva-2.exoscale.com/v2/security-group", json={}
+    )
+    client.create_security_group(name="a")
+    client.create_security_group(name="a")
+    assert requests_mock.call_count == 2
+    assert pickle.loads(pickle.dumps(client)).coalesce
@@ -0,0 +1,168 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import pytest
+import requests_mock as requests_mock_module
+
+import exoscale
+import exoscale.api
+from exoscale.api import codegen
+from exoscale.api.codegen import (
+    _UNSET,
+    _arguments as _spec_arguments,
+    generate_client_module,
+    load_generated_client,
+    spec_digest,
+)
+from exoscale.api.generator import create_client_class
+
+SPEC_PATH = Path(exoscale.__file__).parent / "openapi.json"
+with open(SPEC_PATH) as f:
+    API_SPEC = json.load(f)
+
+RUNTIME = create_client_class(API_SPEC, lazy=False)
+
+
+@pytest.fixture(scope="module")
+def generated(tmp_path_factory):
+    source = generate_client_module(
+        API_SPEC,
+        "openapi.json",
+        spec_digest(SPEC_PATH),
+        SPEC_PATH.stat().st_size,
+    )
+    path = tmp_path_factory.mktemp("codegen") / "v2_generated.py"
+    path.write_text(source)
+    spec = importlib.util.spec_from_file_location("v2_generated", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _arguments(operation_name):
+    """
+    Returns keyword arguments for every parameter and body property of an
+    operation.
+    """
+    entry = RUNTIME._by_operation[operation_name]
+    parameters, body = _spec_arguments(API_SPEC, entry["operation"])
+    return {name: f"v-{name}" for name in {**parameters, **body}}
+
+
+def _request(client, operation_name, kwargs):
+    method = getattr(client, operation_name.replace("-", "_"))
+    with requests_mock_module.Mocker() as m:
+        m.register_uri(requests_mock_module.ANY, requests_mock_module.ANY)
+        try:
+            method(**kwargs)
+        except TypeError:
+            # Messages differ between Python and runtime generated
+            # signature checks.
+            return TypeError
+        except Exception as e:
+            return type(e), str(e)
+        request = m.request_history[0]
+        return (
+            request.method,
+            request.url,
+            request.body and json.loads(request.body),
+        )
+
+
+def test_same_interface(generated):
+    assert generated.SPEC_DIGEST == spec_digest(SPEC_PATH)
+    assert generated.Client.__doc__ == RUNTIME.__doc__
+    for name in RUNTIME._by_operation:
+        py_name = name.replace("-", "_")
+        assert (
+            getattr(generated.Client, py_name).__doc__
+            == getattr(RUNTIME, py_name).__doc__
+        ), name
+
+
+def test_same_requests(generated):
+    runtime = RUNTIME(zone="de-fra-1")
+    client = generated.Client(zone="de-fra-1")
+    assert client.endpoint == runtime.endpoint
+    for name in RUNTIME._by_operation:
+        kwargs = _arguments(name)
+        assert _request(client, name, kwargs) == _request(
+            runtime, name, kwargs
+        ), name
+        # Without arguments, either the same request or the same error.
+        assert _request(client, name, {}) == _request(runtime, name, {}), name
+
+
+def test_same_errors(generated):
+    client = generated.Client()
+    runtime = RUNTIME()
+    for c in (client, runtime):
+        with pytest.raises(TypeError):
+            c.get_instance("abc")
+        with pytest.raises(TypeError):
+            c.get_instance(id="abc", unknown=1)
+        with pytest.raises(TypeError):
+            c.list_events(**{"from": "2025-03-01", "unknown": 1})
+        with pytest.raises(ValueError, match="Missing mandatory param 'id'"):
+            c.get_instance()
+        with pytest.raises(TypeError, match="Invalid zone"):
+            type(c)(zone="nowhere")
+
+
+def test_unset_arguments_are_not_sent(generated, requests_mock):
+    requests_mock.post(
+        "https://api-ch-gva-2.exoscale.com/v2/security-group", json={}
+    )
+    generated.Client().create_security_group(name="sg", description=None)
+    assert requests_mock.last_request.json() == {
+        "name": "sg",
+        "description": None,
+    }
+    assert repr(_UNSET) == "_UNSET"
+
+
+def test_full_spec_loaded_on_demand(generated):
+    assert "_api_spec" in vars(generated.Client)
+    assert generated.Client._api_spec == API_SPEC
+    assert vars(generated.Client)["_api_spec"] == API_SPEC
+
+
+def test_stale_module_is_ignored(tmp_path, monkeypatch):
+    # Generate a module, and the definition it checks, into tmp_path.
+    data = SPEC_PATH.read_bytes()
+    generated_path = tmp_path / "_v2_generated.py"
+    generated_path.write_text(
+        generate_client_module(
+            API_SPEC, "openapi.json", spec_digest(SPEC_PATH), len(data)
+        )
+    )
+    spec_path = tmp_path / "openapi.json"
+    monkeypatch.setattr(codegen, "_PACKAGE_DIR", tmp_path)
+    monkeypatch.setattr(exoscale.api, "__path__", [str(tmp_path)])
+    monkeypatch.setenv("EXOSCALE_API_CODEGEN", "")
+    name = "exoscale.api._v2_generated"
+    assert name not in sys.modules
+    importlib.invalidate_caches()
+    try:
+        spec_path.write_bytes(data)
+        client = load_generated_client("openapi.json")
+        assert client.__module__ == name
+        monkeypatch.setenv("EXOSCALE_API_CODEGEN", "check")
+        assert load_generated_client("openapi.json") is client
+
+        # Changed without changing size: only caught by the digest.
+        spec_path.write_bytes(data.replace(b"Exoscale", b"Exoscalf", 1))
+        assert load_generated_client("openapi.json") is None
+        monkeypatch.setenv("EXOSCALE_API_CODEGEN", "")
+        assert load_generated_client("openapi.json") is client
+
+        spec_path.write_bytes(data + b"\n")
+        assert load_generated_client("openapi.json") is None
+
+        monkeypatch.setenv("EXOSCALE_API_CODEGEN", "0")
+        spec_path.write_bytes(data)
+        assert load_generated_client("openapi.json") is None
+    finally:
+        sys.modules.pop(name, None)
@@ -0,0 +1,92 @@
+import io
+from array import array
+
+import pytest
+
+from exoscale.api import partner
+from exoscale.api.columnar import Table, write_parquet
+from exoscale.api.v2 import Client
+
+INSTANCES = {
+    "instances": [
+        {
+            "id": "i-1",
+            "name": "web-1",
+            "instance-type": {"id": "t-1", "cpus": 50},
+            "labels": {"env": "prod"},
+        },
+        {
+            "id": "i-2",
+            "name": "db-1",
+            "template": {"password-enabled": True},
+        },
+    ]
+}
+
+
+def test_table_for_operation():
+    client = Client(key="EXOtest", secret="sdsd")
+    table = Table.for_operation(client, "list_instances")
+    table.extend(INSTANCES)
+    assert len(table) == 2
+    assert table.columns["id"] == ["i-1", "i-2"]
+    assert table.columns["instance-type.cpus"] == array("q", [50, 0])
+    assert table.validity["instance-type.cpus"] == array("b", [1, 0])
+    assert table.columns["template.password-enabled"] == array("b", [0, 1])
+    assert table.columns["instance-type.id"] == ["t-1", None]
+    assert table.columns["labels"] == [{"env": "prod"}, None]
+
+    row = next(table.rows())
+    assert row[list(table.columns).index("instance-type.cpus")] == 50
+
+    out = io.StringIO()
+    table.write_csv(out)
+    header, first, second = out.getvalue().splitlines()
+    columns = header.split(",")
+    assert first.split(",")[columns.index("instance-type.cpus")] == "50"
+    assert second.split(",")[columns.index("instance-type.cpus")] == ""
+
+
+def test_table_array_response():
+    client = Client(key="EXOtest", secret="sdsd")
+    table = Table.for_operation(client, "list_events")
+    table.extend([{"status": 200, "handler": "authenticate"}])
+    assert table.columns["status"] == array("q", [200])
+    assert "iam-user.email" in table.columns
+
+
+def test_table_partner_usage():
+    client = partner.Client("key", "secret")
+    table = Table.for_operation(client, "list_distributor_organization_usage")
+    table.extend([{"code": "c", "total-excl-vat": 12.5}])
+    assert table.columns["total-excl-vat"] == array("d", [12.5])
+
+
+def test_table_not_a_list():
+    client = Client(key="EXOtest", secret="sdsd")
+    with pytest.raises(ValueError):
+        Table.for_operation(client, "get_instance")
+
+
+def test_table_numpy_arrow(tmp_path):
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    client = Client(key="EXOtest", secret="sdsd")
+    table = Table.for_operation(client, "list_instances")
+    table.extend(INSTANCES)
+
+    columns = table.to_numpy()
+    assert isinstance(columns["instance-type.cpus"], np.ma.MaskedArray)
+    assert columns["instance-type.cpus"].mask.tolist() == [False, True]
+
+    arrow = table.to_arrow()
+    assert arrow.column("instance-type.cpus").to_pylist() == [50, None]
+    assert arrow.column("labels").to_pylist() == ['{"env": "prod"}', None]
+
+    path = tmp_path / "instances.parquet"
+    write_parquet([table, table], str(path))
+    parquet = pq.ParquetFile(str(path))
+    assert parquet.metadata.num_row_groups == 2
+    assert parquet.metadata.num_rows == 4
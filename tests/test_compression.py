@@ -0,0 +1,75 @@
+import gzip
+import json
+
+import pytest
+
+from exoscale.api.session import HTTP2Session
+from exoscale.api.v2 import Client
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+
+EVENTS = [
+    {
+        "timestamp": f"2026-10-19T10:{i % 60:02}:00Z",
+        "handler": "create-instance",
+        "iam-user": {"email": "ops@example.net"},
+        "zone": "ch-gva-2",
+    }
+    for i in range(500)
+]
+BODY = json.dumps(EVENTS).encode()
+
+
+def test_compressed_response(requests_mock):
+    requests_mock.get(
+        f"{URL}/event",
+        content=gzip.compress(BODY),
+        headers={"Content-Encoding": "gzip"},
+    )
+    requests_mock.get(f"{URL}/zone", json={"zones": []})
+    client = Client("key", "secret", zone="ch-gva-2")
+    assert client.list_events() == EVENTS
+    assert client.list_events() == EVENTS
+    client.list_zones()
+
+    assert (
+        "gzip" in requests_mock.request_history[0].headers["Accept-Encoding"]
+    )
+    events = client.transfer_stats["list-events"]
+    assert events["responses"] == 2
+    assert events["decoded_bytes"] == 2 * len(BODY)
+    assert events["wire_bytes"] == 2 * len(gzip.compress(BODY))
+    assert events["wire_bytes"] * 10 < events["decoded_bytes"]
+    zones = client.transfer_stats["list-zones"]
+    assert (
+        zones["wire_bytes"] == zones["decoded_bytes"] == len(b'{"zones": []}')
+    )
+    assert client.stats["wire_bytes"] == (
+        events["wire_bytes"] + zones["wire_bytes"]
+    )
+    assert client.stats["decoded_bytes"] == (
+        events["decoded_bytes"] + zones["decoded_bytes"]
+    )
+
+
+def test_compressed_response_http2():
+    httpx = pytest.importorskip("httpx")
+
+    def handler(request):
+        assert "gzip" in request.headers["Accept-Encoding"]
+        return httpx.Response(
+            200,
+            content=gzip.compress(BODY),
+            headers={"Content-Encoding": "gzip"},
+        )
+
+    client = Client("key", "secret", zone="ch-gva-2", http2=True)
+    client.http_client = HTTP2Session(
+        client.http_client.auth, transport=httpx.MockTransport(handler)
+    )
+    assert client.list_events() == EVENTS
+    assert client.transfer_stats["list-events"] == {
+        "responses": 1,
+        "wire_bytes": len(gzip.compress(BODY)),
+        "decoded_bytes": len(BODY),
+    }
@@ -0,0 +1,68 @@
+import json
+
+from exoscale.api.decoding import decode
+from exoscale.api.v2 import Client
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+
+LISTING = {
+    "instances": [
+        {
+            "id": f"{i:08x}-0000-0000-0000-000000000000",
+            "state": "running",
+            "instance-type": {"id": "b6cd1ff5-3a2f-4e9d-a4d1-8988c1191fe8"},
+            "labels": {"team-name": "web"},
+            "security-groups": [{"id": "sg"}],
+            "ipv6-address": None,
+            "tags": ["a-b", "a-b"],
+        }
+        for i in range(3)
+    ]
+}
+
+
+def test_decode_plain():
+    assert decode(json.dumps(LISTING)) == LISTING
+
+
+def test_decode_intern_strings():
+    result = decode(json.dumps(LISTING).encode(), intern_strings=True)
+    assert result == LISTING
+    first, second = result["instances"][:2]
+    assert first["state"] is second["state"]
+    assert first["instance-type"]["id"] is second["instance-type"]["id"]
+    assert first["tags"][0] is second["tags"][1]
+    assert list(first)[2] is list(second)[2]
+    assert decode('["a", "a"]', intern_strings=True) == ["a", "a"]
+
+
+def test_decode_snake_case_keys():
+    result = decode(json.dumps(LISTING), snake_case_keys=True)
+    instance = result["instances"][0]
+    assert set(instance) == {
+        "id",
+        "state",
+        "instance_type",
+        "labels",
+        "security_groups",
+        "ipv6_address",
+        "tags",
+    }
+    # Label keys and values are left as is.
+    assert instance["labels"] == {"team-name": "web"}
+    assert instance["tags"] == ["a-b", "a-b"]
+
+
+def test_client_decoding(requests_mock):
+    requests_mock.get(f"{URL}/instance", json=LISTING)
+    client = Client(
+        "key",
+        "secret",
+        zone="ch-gva-2",
+        intern_strings=True,
+        snake_case_keys=True,
+    )
+    instances = client.list_instances()["instances"]
+    assert instances[0]["instance_type"] == instances[1]["instance_type"]
+    assert instances[0]["state"] is instances[1]["state"]
+    assert Client("key", "secret").list_instances() == LISTING
@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+from exoscale.api.dns import (
+    RateLimiter,
+    plan_dns_domain_records,
+    sync_dns_domain_records,
+)
+from exoscale.api.v2 import Client
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+DOMAIN = "3a2c1f0e-6b1e-4b1f-9e4e-2b3b6f1c8d9a"
+
+CURRENT = [
+    {"id": "soa", "name": "", "type": "SOA", "content": "ns1", "ttl": 3600},
+    {"id": "ns", "name": "", "type": "NS", "content": "ns1", "ttl": 3600},
+    {"id": "r1", "name": "www", "type": "A", "content": "1.1.1.1", "ttl": 60},
+    {"id": "r2", "name": "api", "type": "A", "content": "2.2.2.2", "ttl": 60},
+    {"id": "r3", "name": "old", "type": "A", "content": "3.3.3.3", "ttl": 60},
+    {"id": "r4", "name": "mx", "type": "MX", "content": "m", "priority": 5},
+]
+
+DESIRED = [
+    {"name": "www", "type": "A", "content": "1.1.1.1"},
+    {"name": "api", "type": "A", "content": "2.2.2.3"},
+    {"name": "new", "type": "A", "content": "4.4.4.4"},
+    {"name": "mx", "type": "MX", "content": "m", "priority": 10},
+]
+
+
+def test_plan():
+    changes = plan_dns_domain_records(CURRENT, DESIRED)
+    summary = sorted(
+        (
+            c.action,
+            (c.record or {}).get("name"),
+            (c.current or {}).get("id"),
+        )
+        for c in changes
+    )
+    assert summary == [
+        ("create", "new", None),
+        ("delete", None, "r3"),
+        ("unchanged", "www", "r1"),
+        ("update", "api", "r2"),
+        ("update", "mx", "r4"),
+    ]
+
+    changes = plan_dns_domain_records(CURRENT, DESIRED, delete=False)
+    assert "delete" not in {c.action for c in changes}
+
+
+def test_plan_duplicates():
+    current = [
+        {"id": "a", "name": "x", "type": "TXT", "content": "v"},
+        {"id": "b", "name": "x", "type": "TXT", "content": "v"},
+    ]
+    desired = [{"name": "x", "type": "TXT", "content": "v"}]
+    actions = sorted(
+        c.action for c in plan_dns_domain_records(current, desired)
+    )
+    assert actions == ["delete", "unchanged"]
+
+
+def test_sync(requests_mock):
+    base = f"{URL}/dns-domain/{DOMAIN}/record"
+    requests_mock.get(base, json={"dns-domain-records": CURRENT})
+    requests_mock.post(base, json={"id": "op-create"})
+    requests_mock.put(f"{base}/r2", json={"id": "op-r2"})
+    requests_mock.put(f"{base}/r4", status_code=400, text="bad priority")
+    requests_mock.delete(f"{base}/r3", json={"id": "op-r3"})
+
+    client = Client(key="EXOtest", secret="sdsd")
+    outcomes = sync_dns_domain_records(
+        client, DOMAIN, DESIRED, max_workers=4, wait=False
+    )
+    by_action = {
+        (o.action, (o.current or o.record)["name"]): o for o in outcomes
+    }
+    assert by_action[("create", "new")].result == {"id": "op-create"}
+    assert by_action[("delete", "old")].result == {"id": "op-r3"}
+    assert by_action[("unchanged", "www")].result is None
+    assert by_action[("update", "api")].error is None
+    assert "bad priority" in str(by_action[("update", "mx")].error)
+
+    [create] = [r for r in requests_mock.request_history if r.method == "POST"]
+    assert create.json() == {"name": "new", "type": "A", "content": "4.4.4.4"}
+    [update] = [
+        r for r in requests_mock.request_history if r.path.endswith("/r2")
+    ]
+    assert update.json() == {"name": "api", "content": "2.2.2.3"}
+    # one listing, four changes
+    assert requests_mock.call_count == 5
+
+
+def test_rate_limiter():
+    with (
+        patch("exoscale.api.dns.time.monotonic", return_value=100),
+        patch("exoscale.api.dns.time.sleep") as sleep,
+    ):
+        limiter = RateLimiter(4)
+        for _ in range(3):
+            limiter.acquire()
+    assert [c.args[0] for c in sleep.call_args_list] == [0.25, 0.5]
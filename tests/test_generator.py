@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import exoscale
+from exoscale.api.generator import _LazyOperation, create_client_class
+
+with open(Path(exoscale.__file__).parent / "openapi.json") as f:
+    API_SPEC = json.load(f)
+
+
+def test_lazy_client_class(requests_mock):
+    eager = create_client_class(API_SPEC, lazy=False)
+    lazy = create_client_class(API_SPEC, lazy=True)
+    assert isinstance(lazy.__dict__["list_zones"], _LazyOperation)
+    assert dir(lazy) == dir(eager)
+
+    client = lazy(zone="ch-gva-2")
+    assert hasattr(client, "list_zones")
+    # materialized on first access and cached on the class
+    assert callable(lazy.__dict__["list_zones"])
+    assert lazy.list_zones.__doc__ == eager.list_zones.__doc__
+    assert lazy.get_instance.__name__ == "get_instance"
+
+    requests_mock.get(
+        "https://api-ch-gva-2.exoscale.com/v2/instance/abc",
+        json={"id": "abc"},
+    )
+    assert client.get_instance(id="abc") == {"id": "abc"}
+
+
+def test_lazy_client_from_environment():
+    code = (
+        "from exoscale.api.v2 import BaseClient, Client\n"
+        "from exoscale.api.generator import _LazyOperation\n"
+        "op = BaseClient.__dict__['list_zones']\n"
+        "assert isinstance(op, _LazyOperation)\n"
+        "c = Client('key', 'secret')\n"
+        "assert hasattr(c, 'list_zones')\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        env={
+            **os.environ,
+            "EXOSCALE_API_LAZY": "1",
+            "EXOSCALE_API_CODEGEN": "0",
+        },
+    )
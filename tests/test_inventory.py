@@ -0,0 +1,99 @@
+import pytest
+
+from exoscale.api.inventory import Inventory
+from exoscale.api.v2 import Client
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+
+
+def _web(state="running", labels=None):
+    return {
+        "id": "i-1",
+        "name": "web-1",
+        "state": state,
+        "public-ip": "194.182.0.1",
+        "labels": labels or {"env": "prod"},
+        "security-groups": [{"id": "sg-1"}],
+    }
+
+
+def test_inventory_lookups(requests_mock):
+    requests_mock.get(
+        f"{URL}/instance",
+        json={
+            "instances": [
+                _web(),
+                {"id": "i-2", "name": "db-1", "labels": {"env": "dev"}},
+            ]
+        },
+    )
+    requests_mock.get(
+        f"{URL}/private-network",
+        json={
+            "private-networks": [
+                {
+                    "id": "pn-1",
+                    "name": "web-1",
+                    "leases": [{"instance-id": "i-2", "ip": "10.0.0.2"}],
+                }
+            ]
+        },
+    )
+    client = Client(key="EXOtest", secret="sdsd")
+    inventory = Inventory(client, ["instances", "private-networks"])
+    events = inventory.refresh()
+    assert len(events) == 3
+    assert len(inventory) == 3
+    assert "i-1" in inventory
+
+    assert inventory.get("i-2")["name"] == "db-1"
+    assert inventory.resource_type("pn-1") == "private-networks"
+    assert inventory.get("nope") is None
+    assert {i["id"] for i in inventory.find_by_name("web-1")} == {
+        "i-1",
+        "pn-1",
+    }
+    assert [i["id"] for i in inventory.find_by_name("web-1", "instances")] == [
+        "i-1"
+    ]
+    assert [i["id"] for i in inventory.find_by_label("env", "prod")] == ["i-1"]
+    assert len(inventory.find_by_label("env")) == 2
+    assert [i["id"] for i in inventory.find_by_ip("194.182.0.1")] == ["i-1"]
+    assert [i["id"] for i in inventory.find_by_ip("10.0.0.2")] == ["i-2"]
+    assert [i["id"] for i in inventory.find_by_security_group("sg-1")] == [
+        "i-1"
+    ]
+
+
+def test_inventory_incremental_refresh(requests_mock):
+    requests_mock.get(
+        f"{URL}/instance",
+        [
+            {"json": {"instances": [_web()]}},
+            {"json": {"instances": [_web("stopped", {"env": "staging"})]}},
+            {"json": {"instances": []}},
+        ],
+    )
+    client = Client(key="EXOtest", secret="sdsd")
+    inventory = Inventory(client, ["instances"])
+    inventory.refresh()
+
+    [event] = inventory.refresh("instances")
+    assert event.type == "changed"
+    assert inventory.get("i-1")["state"] == "stopped"
+    assert inventory.find_by_label("env", "prod") == []
+    assert len(inventory.find_by_label("env", "staging")) == 1
+
+    inventory.refresh()
+    assert len(inventory) == 0
+    assert inventory.find_by_ip("194.182.0.1") == []
+    assert inventory.find_by_label("env") == []
+    assert requests_mock.call_count == 3
+
+
+def test_inventory_unknown_resource():
+    client = Client(key="EXOtest", secret="sdsd")
+    with pytest.raises(TypeError):
+        Inventory(client, ["nothing"])
+    with pytest.raises(TypeError):
+        Inventory(client, ["instances"]).refresh("load-balancers")
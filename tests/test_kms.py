@@ -0,0 +1,196 @@
+import base64
+import io
+import json
+import os
+import re
+from unittest.mock import patch
+
+import pytest
+
+from exoscale.api.exceptions import ExoscaleAPIClientException
+from exoscale.api.kms import EnvelopeCipher
+from exoscale.api.v2 import Client
+
+pytest.importorskip("cryptography")
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+KEY = "5ba2d1e6-3c8a-4d1b-9a0e-04d5e1b6b7a3"
+OTHER_KEY = "8f0e3c7a-2b1d-4e6f-9a8b-7c6d5e4f3a2b"
+
+
+class KMS:
+    """
+    Wraps data keys by remembering them.
+    """
+
+    def __init__(self, requests_mock):
+        self.keys = {}
+        self.calls = []
+        requests_mock.post(
+            re.compile(rf"{URL}/kms-key/[^/]+/generate-data-key"),
+            json=self.generate,
+        )
+        requests_mock.post(
+            re.compile(rf"{URL}/kms-key/[^/]+/decrypt"), json=self.decrypt
+        )
+        requests_mock.post(
+            re.compile(rf"{URL}/kms-key/[^/]+/re-encrypt"), json=self.rewrap
+        )
+
+    def _wrap(self, key_id, context, plaintext):
+        wrapped = base64.b64encode(os.urandom(40)).decode()
+        self.keys[wrapped] = (key_id, context, plaintext)
+        return wrapped
+
+    def generate(self, request, context):
+        self.calls.append("generate")
+        key_id = request.path.split("/")[-2]
+        body = request.json()
+        plaintext = base64.b64encode(os.urandom(32)).decode()
+        return {
+            "plaintext": plaintext,
+            "ciphertext": self._wrap(
+                key_id, body.get("encryption-context"), plaintext
+            ),
+        }
+
+    def decrypt(self, request, context):
+        self.calls.append("decrypt")
+        key_id = request.path.split("/")[-2]
+        body = request.json()
+        expected = (key_id, body.get("encryption-context"))
+        key_id, key_context, plaintext = self.keys[body["ciphertext"]]
+        if expected != (key_id, key_context):
+            context.status_code = 400
+            return {"title": "Invalid ciphertext"}
+        return {"plaintext": plaintext}
+
+    def rewrap(self, request, context):
+        self.calls.append("re-encrypt")
+        body = request.json()
+        _, _, plaintext = self.keys[body["source"]["ciphertext"]]
+        destination = body["destination"]
+        return {
+            "ciphertext": self._wrap(
+                destination["key"],
+                destination.get("encryption-context"),
+                plaintext,
+            )
+        }
+
+
+@pytest.fixture
+def client():
+    return Client("key", "secret", zone="ch-gva-2")
+
+
+def test_envelope_roundtrip(client, requests_mock):
+    kms = KMS(requests_mock)
+    cipher = EnvelopeCipher(client, KEY)
+    payloads = [b"", b"x", os.urandom(1000)]
+    envelopes = [cipher.encrypt(payload) for payload in payloads]
+    assert [cipher.decrypt(e) for e in envelopes] == payloads
+    # Envelopes encrypted by the cipher are decrypted with its data key.
+    assert kms.calls == ["generate"]
+    assert cipher.stats == {"generated": 1, "cache_hits": 5}
+
+    # Another process unwraps the data key once.
+    reader = EnvelopeCipher(client, KEY)
+    assert [reader.decrypt(e) for e in envelopes] == payloads
+    assert kms.calls == ["generate", "decrypt"]
+    assert reader.stats == {"unwrapped": 1, "cache_hits": 2}
+
+
+def test_envelope_stream(client, requests_mock):
+    KMS(requests_mock)
+    cipher = EnvelopeCipher(client, KEY, segment_size=100)
+    for size in (0, 99, 100, 101, 1000):
+        payload = os.urandom(size)
+        envelope = io.BytesIO()
+        cipher.encrypt_stream(io.BytesIO(payload), envelope)
+        envelope.seek(0)
+        decrypted = io.BytesIO()
+        EnvelopeCipher(client, KEY).decrypt_stream(envelope, decrypted)
+        assert decrypted.getvalue() == payload
+
+
+def test_envelope_tampering(client, requests_mock):
+    KMS(requests_mock)
+    cipher = EnvelopeCipher(client, KEY, segment_size=10)
+    envelope = cipher.encrypt(os.urandom(25))
+    # Header: magic, key ID, 40-byte wrapped key and salt.
+    header = 4 + 1 + len(KEY) + 2 + 40 + 16
+    segment = 4 + 10 + 16
+
+    tampered = bytearray(envelope)
+    tampered[-1] ^= 1
+    with pytest.raises(ValueError, match="authentication"):
+        cipher.decrypt(bytes(tampered))
+    # Dropping the last segment.
+    with pytest.raises(ValueError, match="Truncated"):
+        cipher.decrypt(envelope[: header + 2 * segment])
+    # Swapping the first two segments.
+    first = envelope[header : header + segment]
+    second = envelope[header + segment : header + 2 * segment]
+    swapped = envelope[:header] + second + first + envelope[-(4 + 5 + 16) :]
+    with pytest.raises(ValueError, match="authentication"):
+        cipher.decrypt(swapped)
+    with pytest.raises(ValueError, match="Trailing"):
+        cipher.decrypt(envelope + b"\0")
+    with pytest.raises(ValueError, match="Not an envelope"):
+        cipher.decrypt(b"nope" + envelope)
+
+
+def test_envelope_key_rotation(client, requests_mock):
+    kms = KMS(requests_mock)
+    now = [0]
+    with patch("exoscale.api.kms._time", lambda: now[0]):
+        cipher = EnvelopeCipher(client, KEY, ttl=60, max_uses=3)
+        envelopes = [cipher.encrypt(b"data") for _ in range(4)]
+        assert kms.calls == ["generate"] * 2
+        now[0] = 60
+        envelopes.append(cipher.encrypt(b"data"))
+        assert kms.calls == ["generate"] * 3
+
+        # Cached data keys expire as well.
+        reader = EnvelopeCipher(client, KEY, ttl=60, cache_size=1)
+        for envelope in envelopes[:3]:
+            reader.decrypt(envelope)
+        assert reader.stats["unwrapped"] == 1
+        now[0] = 120
+        reader.decrypt(envelopes[0])
+        reader.decrypt(envelopes[4])
+        reader.decrypt(envelopes[0])
+        assert reader.stats["unwrapped"] == 4
+
+
+def test_envelope_context(client, requests_mock):
+    kms = KMS(requests_mock)
+    cipher = EnvelopeCipher(client, KEY, encryption_context=b"tenant-1")
+    envelope = cipher.encrypt(b"data")
+    assert json.loads(requests_mock.last_request.body) == {
+        "key-spec": "AES-256",
+        "encryption-context": base64.b64encode(b"tenant-1").decode(),
+    }
+    assert (
+        EnvelopeCipher(client, KEY, encryption_context=b"tenant-1").decrypt(
+            envelope
+        )
+        == b"data"
+    )
+    with pytest.raises(ExoscaleAPIClientException):
+        EnvelopeCipher(client, KEY).decrypt(envelope)
+    assert kms.calls == ["generate", "decrypt", "decrypt"]
+
+
+def test_envelope_rewrap(client, requests_mock):
+    kms = KMS(requests_mock)
+    cipher = EnvelopeCipher(client, KEY, segment_size=10)
+    payload = os.urandom(25)
+    envelope = cipher.rewrap(cipher.encrypt(payload), OTHER_KEY)
+    assert kms.calls == ["generate", "re-encrypt"]
+    assert EnvelopeCipher(client, OTHER_KEY).decrypt(envelope) == payload
+    assert kms.calls[-1] == "decrypt"
+    assert re.search(
+        rf"/kms-key/{OTHER_KEY}/decrypt", requests_mock.last_request.url
+    )
@@ -0,0 +1,142 @@
+from itertools import islice
+from unittest.mock import patch
+
+from exoscale.api.logs import (
+    _AdaptiveInterval,
+    follow_dbaas_service_logs,
+    follow_deployment_logs,
+)
+from exoscale.api.v2 import Client
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+DEPLOYMENT = "8561ee34-09f0-42da-a765-abde807f944b"
+
+
+def _entry(time, message, node="n1"):
+    return {"time": time, "message": message, "node": node}
+
+
+def test_adaptive_interval():
+    interval = _AdaptiveInterval(1, 5)
+    assert [interval.update(False) for _ in range(4)] == [2, 4, 5, 5]
+    assert interval.update(True) == 1
+
+
+def test_follow_deployment_logs(requests_mock):
+    requests_mock.get(
+        f"{URL}/ai/deployment/{DEPLOYMENT}/logs",
+        [
+            {
+                "json": {
+                    "logs": [
+                        _entry("2025-03-10T14:52:34Z", "a"),
+                        _entry("2025-03-10T14:52:35Z", "b"),
+                    ]
+                }
+            },
+            {
+                "json": {
+                    "logs": [
+                        _entry("2025-03-10T14:52:35Z", "b"),
+                        _entry("2025-03-10T14:52:35Z", "c"),
+                        _entry("2025-03-10T14:52:36Z", "d"),
+                    ]
+                }
+            },
+            {"json": {"logs": [_entry("2025-03-10T14:52:36Z", "d")]}},
+            {"json": {"logs": [_entry("2025-03-10T14:52:37Z", "e")]}},
+        ],
+    )
+    client = Client(key="EXOtest", secret="sdsd")
+    with patch("exoscale.api.logs._sleep") as sleep:
+        entries = list(islice(follow_deployment_logs(client, DEPLOYMENT), 5))
+    assert [e["message"] for e in entries] == ["a", "b", "c", "d", "e"]
+    assert [c.args[0] for c in sleep.call_args_list] == [1, 1, 2]
+    assert requests_mock.last_request.qs == {"tail": ["100"]}
+
+
+def test_follow_deployment_logs_repeated(requests_mock):
+    requests_mock.get(
+        f"{URL}/ai/deployment/{DEPLOYMENT}/logs",
+        [
+            {
+                "json": {
+                    "logs": [
+                        _entry("2025-03-10T14:52:34Z", "retry"),
+                        _entry("2025-03-10T14:52:35Z", "retry"),
+                        _entry("2025-03-10T14:52:35Z", "retry"),
+                    ]
+                }
+            },
+            {
+                "json": {
+                    "logs": [
+                        _entry("2025-03-10T14:52:35Z", "retry"),
+                        _entry("2025-03-10T14:52:35Z", "retry"),
+                        _entry("2025-03-10T14:52:35Z", "retry"),
+                        _entry("2025-03-10T14:52:35Z", "retry", node="n2"),
+                    ]
+                }
+            },
+            {"json": {"logs": [_entry("2025-03-10T14:52:36Z", "done")]}},
+        ],
+    )
+    client = Client(key="EXOtest", secret="sdsd")
+    with patch("exoscale.api.logs._sleep"):
+        entries = list(islice(follow_deployment_logs(client, DEPLOYMENT), 6))
+    # Identical lines logged in the same instant are all yielded, once.
+    assert [(e["time"][-3:], e["node"]) for e in entries] == [
+        ("34Z", "n1"),
+        ("35Z", "n1"),
+        ("35Z", "n1"),
+        ("35Z", "n1"),
+        ("35Z", "n2"),
+        ("36Z", "n1"),
+    ]
+
+
+def test_follow_deployment_logs_since(requests_mock):
+    requests_mock.get(
+        f"{URL}/ai/deployment/{DEPLOYMENT}/logs",
+        json={
+            "logs": [
+                _entry("2025-03-10T14:52:34Z", "a"),
+                _entry("2025-03-10T14:52:40Z", "b"),
+            ]
+        },
+    )
+    client = Client(key="EXOtest", secret="sdsd")
+    with patch("exoscale.api.logs._sleep"):
+        logs = follow_deployment_logs(
+            client, DEPLOYMENT, since="2025-03-10T14:52:35+00:00"
+        )
+        assert next(logs)["message"] == "b"
+
+
+def test_follow_dbaas_service_logs(requests_mock):
+    requests_mock.post(
+        f"{URL}/dbaas-service-logs/pg-1",
+        [
+            {
+                "json": {
+                    "offset": "o1",
+                    "first-log-offset": "o2",
+                    "logs": [{"message": "2"}, {"message": "1"}],
+                }
+            },
+            {"json": {"offset": "o3", "logs": [{"message": "3"}]}},
+            {"json": {"offset": "o3", "logs": []}},
+            {"json": {"offset": "o4", "logs": [{"message": "4"}]}},
+        ],
+    )
+    client = Client(key="EXOtest", secret="sdsd")
+    with patch("exoscale.api.logs._sleep") as sleep:
+        entries = list(
+            islice(follow_dbaas_service_logs(client, "pg-1", limit=2), 4)
+        )
+    assert [e["message"] for e in entries] == ["1", "2", "3", "4"]
+    bodies = [r.json() for r in requests_mock.request_history]
+    assert bodies[0] == {"limit": 2, "sort-order": "desc"}
+    assert bodies[1] == {"limit": 2, "sort-order": "asc", "offset": "o2"}
+    assert bodies[3]["offset"] == "o3"
+    assert [c.args[0] for c in sleep.call_args_list] == [1, 2]
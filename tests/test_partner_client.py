@@ -1,5 +1,9 @@
 """Tests for Partner API client."""
 
+import json
+import subprocess
+import sys
+import time
 from unittest.mock import patch
 
 import pytest
@@ -75,14 +79,28 @@ def test_client_error_handling(requests_mock):
     assert "Server error 503" in str(exc.value)
 
 
-def test_authentication():
-    """Test that Partner client reuses V2 authentication."""
-    with patch("exoscale.api.partner.V2Client") as mock_v2:
-        client = Client("key", "secret")
+def test_authentication(requests_mock):
+    """Test that Partner client signs requests like the V2 client."""
+    requests_mock.get(
+        "https://partner-api.exoscale.com/v1.alpha/distributor/organization",
+        json={"organizations": []},
+    )
+    client = Client("key", "secret")
+    client.list_distributor_organizations()
 
-        mock_v2.assert_called_once_with("key", "secret", url=None)
+    authorization = requests_mock.last_request.headers["Authorization"]
+    assert authorization.startswith("EXO2-HMAC-SHA256 credential=key,")
 
-        assert client.http_client == mock_v2.return_value.http_client
+
+def test_does_not_load_v2_client():
+    """Test that the Partner client does not load the V2 API definition."""
+    code = (
+        "import sys\n"
+        "from exoscale.api.partner import Client\n"
+        "Client('key', 'secret')\n"
+        "assert 'exoscale.api.v2' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
 
 
 def test_create_organization_with_structured_address(requests_mock):
@@ -252,3 +270,253 @@ def test_list_organizations(requests_mock):
     assert len(result["organizations"]) == 2
     assert result["organizations"][0]["id"] == "org-1"
     assert result["organizations"][1]["status"] == "suspended"
+
+
+def _mock_organizations_usage(requests_mock):
+    base = "https://partner-api.exoscale.com/v1.alpha/distributor/organization"
+    requests_mock.get(
+        base,
+        json={
+            "organizations": [
+                {"id": "org-1", "status": "active"},
+                {"id": "org-2", "status": "active"},
+                {"id": "org-3", "status": "suspended"},
+            ]
+        },
+    )
+
+    def statement(total):
+        return {
+            "currency": "CHF",
+            "start-date": "2025-01-01T00:00:00Z",
+            "total-excl-vat": total,
+            "total-incl-vat": total * 2,
+        }
+
+    requests_mock.get(f"{base}/org-1/usage", json=[statement(1.5)])
+    requests_mock.get(
+        f"{base}/org-2/usage",
+        [
+            {"status_code": 503, "text": "unavailable"},
+            {"json": [statement(2.0)]},
+        ],
+    )
+    requests_mock.get(f"{base}/org-3/usage", json=[statement(100.0)])
+
+
+def test_aggregate_organizations_usage(requests_mock):
+    _mock_organizations_usage(requests_mock)
+    client = Client(key="EXOtest", secret="test")
+    with patch("exoscale.api.partner._sleep") as sleep:
+        summary = client.aggregate_organizations_usage(
+            "2025-01", status="active", max_workers=2
+        )
+    assert summary.organizations == 2
+    assert summary.errors == []
+    assert summary.totals == {
+        "2025-01": {"CHF": {"total-excl-vat": 3.5, "total-incl-vat": 7.0}}
+    }
+    assert sleep.call_count == 1
+    assert requests_mock.last_request.qs == {"period": ["2025-01"]}
+
+
+def test_organizations_usage_checkpoint(requests_mock, tmp_path):
+    _mock_organizations_usage(requests_mock)
+    base = "https://partner-api.exoscale.com/v1.alpha/distributor/organization"
+    requests_mock.get(f"{base}/org-2/usage", status_code=500, text="down")
+    checkpoint = str(tmp_path / "usage.jsonl")
+    client = Client(key="EXOtest", secret="test")
+
+    with patch("exoscale.api.partner._sleep"):
+        results = {
+            r.id: r
+            for r in client.iter_organizations_usage(
+                "2025-01",
+                ids=["org-1", "org-2"],
+                retries=1,
+                checkpoint=checkpoint,
+            )
+        }
+    assert results["org-1"].error is None
+    assert isinstance(results["org-2"].error, ExoscaleAPIServerException)
+
+    # the second run only fetches the organization which failed
+    requests_mock.get(f"{base}/org-2/usage", json=[])
+    requests_mock.reset_mock()
+    results = list(
+        client.iter_organizations_usage(
+            "2025-01", ids=["org-1", "org-2"], checkpoint=checkpoint
+        )
+    )
+    assert {r.id for r in results if r.error is None} == {"org-1", "org-2"}
+    assert [r.path for r in requests_mock.request_history] == [
+        "/v1.alpha/distributor/organization/org-2/usage"
+    ]
+
+    # records of another period are not reused
+    requests_mock.reset_mock()
+    results = list(
+        client.iter_organizations_usage(
+            "2025-02", ids=["org-1"], checkpoint=checkpoint
+        )
+    )
+    assert results[0].error is None
+    assert [r.path for r in requests_mock.request_history] == [
+        "/v1.alpha/distributor/organization/org-1/usage"
+    ]
+    assert requests_mock.last_request.qs == {"period": ["2025-02"]}
+    with open(checkpoint) as f:
+        periods = [json.loads(line)["period"] for line in f]
+    assert periods == ["2025-01", "2025-01", "2025-02"]
+
+    # the default period changes over time
+    with pytest.raises(ValueError, match="period"):
+        next(client.iter_organizations_usage(checkpoint=checkpoint))
+
+
+def test_organizations_usage_rate_limited(requests_mock):
+    base = "https://partner-api.exoscale.com/v1.alpha/distributor/organization"
+    requests_mock.get(
+        f"{base}/org-1/usage",
+        [{"status_code": 429, "text": "slow down"}, {"json": []}],
+    )
+    requests_mock.get(f"{base}/org-2/usage", status_code=404, text="nope")
+    client = Client(key="EXOtest", secret="test")
+    with patch("exoscale.api.partner._sleep") as sleep:
+        results = {
+            r.id: r
+            for r in client.iter_organizations_usage(ids=["org-1", "org-2"])
+        }
+    assert results["org-1"].usage == []
+    assert isinstance(results["org-2"].error, ExoscaleAPIClientException)
+    # only the rate limited call is retried
+    assert sleep.call_count == 1
+    assert requests_mock.call_count == 3
+
+
+METERING_URL = "https://partner-api.exoscale.com/v1.alpha/metering:apply"
+
+
+def test_metering_buffer_flush(requests_mock):
+    requests_mock.post(METERING_URL, status_code=204)
+    client = Client(key="EXOtest", secret="test")
+    buffer = client.metering_buffer()
+    buffer.add("org-1", "compute", "hours", 1.0)
+    buffer.add("org-2", "compute", "hours", 2.0)
+    buffer.add("org-1", "storage", "gb", 3.0)
+    assert buffer.backlog == 3
+    buffer.flush()
+
+    assert buffer.backlog == 0
+    bodies = {
+        r.json()["organization"]: r.json()
+        for r in requests_mock.request_history
+    }
+    assert bodies["org-1"]["usage"] == [
+        {"product": "compute", "variable": "hours", "quantity": 1.0},
+        {"product": "storage", "variable": "gb", "quantity": 3.0},
+    ]
+    keys = {
+        r.headers["Idempotency-Key"] for r in requests_mock.request_history
+    }
+    assert len(keys) == 2
+    assert buffer.metrics["batches_sent"] == 2
+    assert buffer.metrics["records_sent"] == 3
+    assert buffer.metrics["flushes"] == 1
+
+
+def test_metering_buffer_spool(requests_mock, tmp_path):
+    requests_mock.post(METERING_URL, status_code=503, text="down")
+    spool = str(tmp_path / "metering.jsonl")
+    client = Client(key="EXOtest", secret="test")
+    buffer = client.metering_buffer(spool=spool, retries=1)
+    buffer.add("org-1", "compute", "hours", 1.0)
+    with patch("exoscale.api.partner._sleep"):
+        buffer.flush()
+    assert requests_mock.call_count == 2
+    assert buffer.backlog == 1
+    assert buffer.metrics["batches_pending"] == 1
+    first_key = requests_mock.last_request.headers["Idempotency-Key"]
+
+    # a new buffer picks up the spooled batch and resends it with its key
+    requests_mock.post(METERING_URL, status_code=204)
+    buffer = client.metering_buffer(spool=spool)
+    assert buffer.backlog == 1
+    assert buffer.metrics["batches_pending"] == 1
+    buffer.flush()
+    assert buffer.backlog == 0
+    assert buffer.metrics["batches_pending"] == 0
+    assert requests_mock.last_request.headers["Idempotency-Key"] == first_key
+
+
+def test_metering_buffer_outage(requests_mock, tmp_path):
+    requests_mock.post(METERING_URL, status_code=503, text="down")
+    spool = str(tmp_path / "metering.jsonl")
+    client = Client(key="EXOtest", secret="test")
+    buffer = client.metering_buffer(spool=spool, retries=2)
+    for organization in ["org-1", "org-2", "org-3"]:
+        buffer.add(organization, "compute", "hours", 1.0)
+    with patch("exoscale.api.partner._sleep") as sleep:
+        buffer.flush()
+        buffer.add("org-4", "compute", "hours", 1.0)
+        buffer.flush()
+    # Only the first batch is tried by each flush, the others are spooled.
+    assert requests_mock.call_count == 6
+    assert sleep.call_count == 4
+    assert {
+        r.json()["organization"] for r in requests_mock.request_history
+    } == {"org-1"}
+    assert buffer.metrics["batches_pending"] == 4
+    assert buffer.backlog == 4
+
+
+def test_metering_buffer_rate_limited(requests_mock, tmp_path):
+    requests_mock.post(
+        METERING_URL,
+        [{"status_code": 429, "text": "slow down"}, {"status_code": 204}],
+    )
+    client = Client(key="EXOtest", secret="test")
+    buffer = client.metering_buffer()
+    buffer.add("org-1", "compute", "hours", 1.0)
+    with patch("exoscale.api.partner._sleep") as sleep:
+        buffer.flush()
+    assert sleep.call_count == 1
+    assert buffer.metrics["batches_sent"] == 1
+    assert buffer.metrics["batches_rejected"] == 0
+
+    # Still rate limited after the retries: spooled, not dropped.
+    requests_mock.post(METERING_URL, status_code=429, text="slow down")
+    buffer = client.metering_buffer(
+        spool=str(tmp_path / "metering.jsonl"), retries=1
+    )
+    buffer.add("org-1", "compute", "hours", 1.0)
+    with patch("exoscale.api.partner._sleep"):
+        buffer.flush()
+    assert buffer.metrics["batches_rejected"] == 0
+    assert buffer.metrics["batches_pending"] == 1
+
+
+def test_metering_buffer_rejected(requests_mock):
+    requests_mock.post(METERING_URL, status_code=400, text="bad")
+    buffer = Client(key="EXOtest", secret="test").metering_buffer()
+    buffer.add("org-1", "compute", "hours", 1.0)
+    buffer.flush()
+    assert buffer.metrics["batches_rejected"] == 1
+    assert buffer.backlog == 0
+
+
+def test_metering_buffer_background(requests_mock):
+    requests_mock.post(METERING_URL, status_code=204)
+    client = Client(key="EXOtest", secret="test")
+    with client.metering_buffer(max_records=2, max_delay=60) as buffer:
+        buffer.add("org-1", "compute", "hours", 1.0)
+        buffer.add("org-1", "compute", "hours", 2.0)
+        for _ in range(100):
+            if buffer.metrics["batches_sent"]:
+                break
+            time.sleep(0.01)
+        assert buffer.metrics["records_sent"] == 2
+        buffer.add("org-1", "compute", "hours", 3.0)
+    # remaining records are flushed on close
+    assert buffer.metrics["records_sent"] == 3
+    assert requests_mock.call_count == 2
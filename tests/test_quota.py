@@ -0,0 +1,139 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from exoscale.api.exceptions import (
+    ExoscaleAPIQuotaExceededException,
+    ExoscaleAPIServerException,
+)
+from exoscale.api.quota import QuotaAdmission
+from exoscale.api.v2 import Client
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+
+
+class Quotas:
+    def __init__(self, requests_mock, limits):
+        self.limits = limits
+        self.usage = {resource: 0 for resource in limits}
+        self.syncs = 0
+        self.created = 0
+        self.lock = threading.Lock()
+        requests_mock.get(f"{URL}/quota", json=self.list)
+        requests_mock.post(f"{URL}/instance", json=self.create)
+
+    def list(self, request, context):
+        self.syncs += 1
+        return {
+            "quotas": [
+                {"resource": r, "limit": limit, "usage": self.usage[r]}
+                for r, limit in self.limits.items()
+            ]
+        }
+
+    def create(self, request, context):
+        with self.lock:
+            self.created += 1
+            self.usage["instance"] += 1
+        return {"id": "op", "state": "pending"}
+
+
+@pytest.fixture
+def client():
+    return Client("key", "secret", zone="ch-gva-2")
+
+
+def test_quota_reject(client, requests_mock):
+    quotas = Quotas(requests_mock, {"instance": 5, "elastic-ip": -1})
+    quotas.usage["instance"] = 2
+    admission = QuotaAdmission(client)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [
+            executor.submit(admission.call, "create_instance", name=f"vm-{i}")
+            for i in range(10)
+        ]
+    errors = [f.exception() for f in futures if f.exception()]
+    assert quotas.created == 3
+    assert len(errors) == 7
+    assert all(
+        isinstance(e, ExoscaleAPIQuotaExceededException) for e in errors
+    )
+    assert "Quota of instance exceeded" in str(errors[0])
+    assert quotas.syncs == 1
+    assert admission.snapshot() == {
+        "instance": {"limit": 5, "usage": 2, "reserved": 3},
+        "elastic-ip": {"limit": -1, "usage": 0, "reserved": 0},
+    }
+
+    # Unlimited and unknown resources are not limited.
+    for _ in range(10):
+        with admission.reserve("create-elastic-ip"):
+            pass
+        with admission.reserve("create_dns_domain"):
+            pass
+
+
+def test_quota_release_and_resync(client, requests_mock):
+    quotas = Quotas(requests_mock, {"instance": 2})
+    now = [0]
+    with patch("exoscale.api.quota._time", lambda: now[0]):
+        admission = QuotaAdmission(client, resync_interval=60)
+        # Failed creations release their reservation.
+        with pytest.raises(ExoscaleAPIServerException):
+            with admission.reserve("create_instance"):
+                raise ExoscaleAPIServerException("fault")
+        admission.call("create_instance")
+        admission.call("create_instance")
+        with pytest.raises(ExoscaleAPIQuotaExceededException):
+            admission.call("create_instance")
+        assert admission.snapshot()["instance"]["reserved"] == 2
+
+        # Once synced, completed creations are part of the usage.
+        now[0] = 60
+        quotas.usage["instance"] = 1
+        admission.call("create_instance")
+        assert quotas.syncs == 2
+        assert admission.snapshot()["instance"] == {
+            "limit": 2,
+            "usage": 1,
+            "reserved": 1,
+        }
+
+
+def test_quota_costs(client, requests_mock):
+    Quotas(requests_mock, {"instance": 10})
+    admission = QuotaAdmission(client, costs={"create_instance": {}})
+    assert admission.cost("create_instance_pool", size=4) == {"instance": 4}
+    assert admission.cost("create_instance") == {}
+    with admission.reserve("create_instance_pool", size=10):
+        pass
+    with pytest.raises(ExoscaleAPIQuotaExceededException):
+        admission.reserve("create_sks_nodepool", size=1)
+
+
+def test_quota_wait(client, requests_mock):
+    Quotas(requests_mock, {"instance": 1})
+    admission = QuotaAdmission(client, wait=True, timeout=5)
+    first = admission.reserve("create_instance")
+    admitted = threading.Event()
+
+    def second():
+        with admission.reserve("create_instance"):
+            admitted.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    assert not admitted.wait(0.1)
+    first.__exit__(ValueError, ValueError(), None)
+    assert admitted.wait(5)
+    thread.join()
+
+    # Waiting is pointless when it can never fit, or after the timeout.
+    with pytest.raises(ExoscaleAPIQuotaExceededException):
+        admission.reserve("create_instance_pool", size=2)
+    admission = QuotaAdmission(client, wait=True, timeout=0.1)
+    admission.reserve("create_instance")
+    with pytest.raises(ExoscaleAPIQuotaExceededException):
+        admission.reserve("create_instance")
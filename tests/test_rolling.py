@@ -0,0 +1,172 @@
+import re
+from itertools import count
+from unittest.mock import patch
+
+import pytest
+
+from exoscale.api.rolling import RollingExecutor
+from exoscale.api.v2 import Client
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+
+
+class Fleet:
+    """
+    Simulates reboot operations completing after a number of polls.
+    """
+
+    def __init__(self, requests_mock, polls=2, failing=()):
+        self.polls = polls
+        self.failing = set(failing)
+        self.remaining = {}
+        self.started = []
+        self.max_in_flight = 0
+        requests_mock.put(
+            re.compile(rf"{URL}/instance/[^/]+:reboot"), json=self.reboot
+        )
+        requests_mock.get(
+            re.compile(rf"{URL}/operation/[^/]+"), json=self.operation
+        )
+
+    def reboot(self, request, context):
+        id = request.path.split("/")[-1].split(":")[0]
+        self.started.append(id)
+        self.remaining[id] = self.polls
+        in_flight = sum(1 for n in self.remaining.values() if n > 0)
+        self.max_in_flight = max(self.max_in_flight, in_flight)
+        return {"id": f"op-{id}", "state": "pending"}
+
+    def operation(self, request, context):
+        id = request.path.split("/")[-1][len("op-") :]
+        self.remaining[id] -= 1
+        if self.remaining[id] > 0:
+            state = "pending"
+        elif id in self.failing:
+            state = "failure"
+        else:
+            state = "success"
+        return {"id": f"op-{id}", "state": state, "reason": "fault"}
+
+
+@pytest.fixture
+def client():
+    with patch("exoscale.api.rolling._sleep"):
+        yield Client("key", "secret", zone="ch-gva-2")
+
+
+def _targets(n):
+    return [{"id": f"vm-{i}"} for i in range(n)]
+
+
+def test_rolling_window(client, requests_mock):
+    fleet = Fleet(requests_mock, polls=2)
+    rollout = RollingExecutor(client, "reboot_instance", max_in_flight=3)
+    outcomes = rollout.run(_targets(10))
+    assert [o.key for o in outcomes] == [f"vm-{i}" for i in range(10)]
+    assert all(o.state == "success" for o in outcomes)
+    assert outcomes[0].operation["state"] == "success"
+    assert fleet.started == [f"vm-{i}" for i in range(10)]
+    assert fleet.max_in_flight == 3
+
+
+def test_rolling_max_unavailable(client, requests_mock):
+    fleet = Fleet(requests_mock, polls=1)
+    checks = {}
+    unavailable = []
+
+    def ready(client, target):
+        # Each target becomes ready on its second check.
+        checks[target["id"]] = checks.get(target["id"], 0) + 1
+        return checks[target["id"]] >= 2
+
+    def reboot(request, context):
+        ready_count = sum(1 for n in checks.values() if n >= 2)
+        unavailable.append(len(fleet.started) + 1 - ready_count)
+        return fleet.reboot(request, context)
+
+    requests_mock.put(re.compile(rf"{URL}/instance/[^/]+:reboot"), json=reboot)
+    rollout = RollingExecutor(
+        client,
+        "reboot_instance",
+        max_in_flight=1,
+        max_unavailable=2,
+        ready=ready,
+    )
+    outcomes = rollout.run(_targets(5))
+    assert all(o.state == "success" for o in outcomes)
+    assert len(fleet.started) == 5
+    assert all(n == 2 for n in checks.values())
+    assert max(unavailable) == 2
+
+    with pytest.raises(ValueError):
+        RollingExecutor(
+            client, "reboot_instance", max_in_flight=2, max_unavailable=1
+        )
+
+
+def test_rolling_error_budget(client, requests_mock):
+    fleet = Fleet(requests_mock, polls=1, failing={"vm-1", "vm-2"})
+    rollout = RollingExecutor(
+        client, "reboot_instance", max_in_flight=1, error_budget=1
+    )
+    outcomes = rollout.run(_targets(6))
+    assert [o.state for o in outcomes] == [
+        "success",
+        "failure",
+        "failure",
+        "skipped",
+        "skipped",
+        "skipped",
+    ]
+    assert "fault" in str(outcomes[1].error)
+    assert fleet.started == ["vm-0", "vm-1", "vm-2"]
+
+
+def test_rolling_max_wait_time(client, requests_mock):
+    fleet = Fleet(requests_mock, polls=100)
+    rollout = RollingExecutor(
+        client, "reboot_instance", error_budget=1, max_wait_time=25
+    )
+    # Every clock reading is 10 seconds later.
+    with patch("exoscale.api.rolling._time", side_effect=count(0, 10)):
+        outcomes = rollout.run(_targets(3))
+    assert [o.state for o in outcomes] == ["failure", "failure", "skipped"]
+    assert "max wait time" in str(outcomes[0].error)
+    assert fleet.started == ["vm-0", "vm-1"]
+    assert fleet.remaining == {"vm-0": 97, "vm-1": 97}
+
+
+def test_rolling_checkpoint(client, requests_mock, tmp_path):
+    checkpoint = str(tmp_path / "rollout.jsonl")
+    fleet = Fleet(requests_mock, polls=1, failing={"vm-2"})
+    rollout = RollingExecutor(
+        client, "reboot_instance", max_in_flight=2, checkpoint=checkpoint
+    )
+    outcomes = rollout.run(_targets(5))
+    # vm-3 was already in progress when vm-2 failed.
+    assert [o.state for o in outcomes] == [
+        "success",
+        "success",
+        "failure",
+        "success",
+        "skipped",
+    ]
+
+    # Simulate an operation left in progress by an interrupted run, and a
+    # truncated last line.
+    with open(checkpoint, "a") as f:
+        f.write(
+            '{"key": "vm-3", "state": "started", "operation": "op-vm-3"}\n'
+        )
+        f.write('{"key": "vm-4", "sta')
+    fleet.remaining["vm-3"] = 1
+    fleet.started.clear()
+    fleet.failing.clear()
+
+    outcomes = rollout.run(_targets(5))
+    assert all(o.state == "success" for o in outcomes)
+    # Previous successes are not acted on again, and the operation in
+    # progress is waited for rather than started again.
+    assert fleet.started == ["vm-2", "vm-4"]
+    assert outcomes[0].operation is None
+    assert outcomes[3].operation["id"] == "op-vm-3"
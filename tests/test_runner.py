@@ -0,0 +1,101 @@
+import pytest
+
+from exoscale.api.exceptions import ExoscaleAPIServerException
+from exoscale.api.runner import OperationRunner, Ref
+from exoscale.api.v2 import Client
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+
+
+def _mock_operation(requests_mock, operation_id, reference_id):
+    requests_mock.get(
+        f"{URL}/operation/{operation_id}",
+        json={
+            "id": operation_id,
+            "state": "success",
+            "reference": {"id": reference_id},
+        },
+    )
+
+
+def _mock_stack(requests_mock):
+    requests_mock.post(
+        f"{URL}/private-network", json={"id": "op-net", "state": "pending"}
+    )
+    _mock_operation(requests_mock, "op-net", "net-1")
+    requests_mock.post(
+        f"{URL}/instance", json={"id": "op-vm", "state": "pending"}
+    )
+    _mock_operation(requests_mock, "op-vm", "vm-1")
+    requests_mock.put(
+        f"{URL}/private-network/net-1:attach",
+        json={"id": "op-attach", "state": "pending"},
+    )
+    _mock_operation(requests_mock, "op-attach", "net-1")
+
+
+def _stack_runner(client):
+    runner = OperationRunner(client, max_workers=2)
+    runner.add("network", "create_private_network", name="backend")
+    runner.add(
+        "instance",
+        "create_instance",
+        name="web-1",
+        instance_type={"id": "type"},
+        template={"id": "template"},
+        disk_size=10,
+    )
+    runner.add(
+        "attach",
+        "attach_instance_to_private_network",
+        id=Ref("network"),
+        instance={"id": Ref("instance")},
+    )
+    return runner
+
+
+def test_runner(requests_mock):
+    _mock_stack(requests_mock)
+    results = _stack_runner(Client(key="EXOtest", secret="sdsd")).run()
+
+    assert {name: r.state for name, r in results.items()} == {
+        "network": "success",
+        "instance": "success",
+        "attach": "success",
+    }
+    assert results["instance"].output["reference"]["id"] == "vm-1"
+    [attach] = [r for r in requests_mock.request_history if r.method == "PUT"]
+    assert attach.json() == {"instance": {"id": "vm-1"}}
+
+
+def test_runner_failure_skips_dependents(requests_mock):
+    _mock_stack(requests_mock)
+    requests_mock.post(f"{URL}/instance", status_code=500, text="boom")
+    results = _stack_runner(Client(key="EXOtest", secret="sdsd")).run()
+
+    assert results["network"].state == "success"
+    assert results["instance"].state == "failure"
+    assert isinstance(results["instance"].error, ExoscaleAPIServerException)
+    assert results["attach"].state == "skipped"
+    assert not [r for r in requests_mock.request_history if r.method == "PUT"]
+
+
+def test_runner_no_wait(requests_mock):
+    requests_mock.post(f"{URL}/security-group", json={"id": "op-sg"})
+    runner = OperationRunner(Client(key="EXOtest", secret="sdsd"))
+    runner.add("sg", "create_security_group", wait=False, name="web")
+    assert runner.run()["sg"].output == {"id": "op-sg"}
+    assert requests_mock.call_count == 1
+
+
+def test_runner_invalid_graph():
+    client = Client(key="EXOtest", secret="sdsd")
+    runner = OperationRunner(client)
+    runner.add("a", "create_security_group", name=Ref("b"))
+    with pytest.raises(ValueError, match="unknown node"):
+        runner.run()
+    runner.add("b", "create_security_group", name=Ref("a"))
+    with pytest.raises(ValueError, match="cycle"):
+        runner.run()
+    with pytest.raises(ValueError, match="Duplicate"):
+        runner.add("a", "create_security_group", name="a")
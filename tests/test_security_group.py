@@ -0,0 +1,211 @@
+import re
+from unittest.mock import patch
+
+from exoscale.api.security_group import (
+    plan_security_group_rules,
+    sync_security_group_rules,
+)
+from exoscale.api.v2 import Client
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+GROUP = "4e0b8b9d-7c7e-4b3c-8f2d-1f6a7b9c0d1e"
+BASTION = "9a8b7c6d-5e4f-4a3b-8c2d-1e0f9a8b7c6d"
+
+
+def _rule(id, protocol="tcp", port=None, **kwargs):
+    rule = {"id": id, "flow-direction": "ingress", "protocol": protocol}
+    if port is not None:
+        rule["start-port"] = rule["end-port"] = port
+    rule.update(kwargs)
+    return rule
+
+
+SECURITY_GROUP = {
+    "id": GROUP,
+    "name": "web",
+    "external-sources": ["198.51.100.0/24", "203.0.113.7/32"],
+    "rules": [
+        _rule("r1", port=443, network="0.0.0.0/0", description="https"),
+        _rule(
+            "r2",
+            port=22,
+            **{"security-group": {"id": BASTION, "name": "bastion"}},
+        ),
+        _rule("r3", "icmp", icmp={"type": 8, "code": 0}, network="::/0"),
+        _rule("r4", port=80, network="0.0.0.0/0"),
+        _rule("r5", "icmp", icmp={"type": -1, "code": -1}, network="::/0"),
+    ],
+}
+
+DESIRED = [
+    # Same rules in other forms.
+    _rule(None, port=443, network="0.0.0.0/0"),
+    _rule(None, port=22, **{"security-group": {"name": "bastion"}}),
+    _rule(None, "icmp", icmp={"type": 8, "code": 0}, network="0:0::/0"),
+    _rule(None, "icmp", network="::/0"),
+    _rule(None, "icmp", network="::/0"),
+    # New rules.
+    _rule(None, port=8080, network="10.0.0.1/8"),
+    _rule(None, "udp", port=53, network="0.0.0.0/0"),
+]
+
+
+def _summary(changes):
+    return sorted(
+        (
+            c.action,
+            (c.current or {}).get("id")
+            if isinstance(c.current, dict) or c.current is None
+            else c.current,
+            (c.rule or {}).get("start-port")
+            if isinstance(c.rule, dict) or c.rule is None
+            else c.rule,
+        )
+        for c in changes
+    )
+
+
+def test_plan():
+    changes = plan_security_group_rules(
+        SECURITY_GROUP,
+        [{k: v for k, v in r.items() if k != "id"} for r in DESIRED],
+        external_sources=["198.51.100.1/24", "192.0.2.0/24"],
+    )
+    assert _summary(changes) == [
+        ("add", None, 53),
+        ("add", None, 8080),
+        ("add-source", None, "192.0.2.0/24"),
+        ("delete", "r4", None),
+        ("remove-source", "203.0.113.7/32", None),
+        ("unchanged", "198.51.100.0/24", "198.51.100.1/24"),
+        ("unchanged", "r1", 443),
+        ("unchanged", "r2", 22),
+        ("unchanged", "r3", None),
+        ("unchanged", "r5", None),
+    ]
+
+    changes = plan_security_group_rules(SECURITY_GROUP, [], delete=False)
+    assert changes == []
+    changes = plan_security_group_rules(
+        SECURITY_GROUP, SECURITY_GROUP["rules"]
+    )
+    assert {c.action for c in changes} == {"unchanged"}
+
+
+class SecurityGroups:
+    def __init__(self, requests_mock, polls=2, failing=()):
+        self.polls = polls
+        self.failing = set(failing)
+        self.remaining = {}
+        self.calls = []
+        requests_mock.get(f"{URL}/security-group/{GROUP}", json=SECURITY_GROUP)
+        requests_mock.post(
+            f"{URL}/security-group/{GROUP}/rules", json=self.change
+        )
+        requests_mock.delete(
+            re.compile(rf"{URL}/security-group/{GROUP}/rules/.+"),
+            json=self.change,
+        )
+        requests_mock.put(
+            re.compile(rf"{URL}/security-group/{GROUP}:(add|remove)-source"),
+            json=self.change,
+        )
+        requests_mock.get(
+            re.compile(rf"{URL}/operation/.+"), json=self.operation
+        )
+
+    def change(self, request, context):
+        id = f"op-{len(self.calls)}"
+        body = request.json() if request.body else {}
+        self.calls.append((request.method, request.path, body))
+        self.remaining[id] = self.polls
+        return {"id": id, "state": "pending"}
+
+    def operation(self, request, context):
+        id = request.path.split("/")[-1]
+        self.remaining[id] -= 1
+        state = "pending"
+        if self.remaining[id] == 0:
+            path = self.calls[int(id.split("-")[1])][1]
+            state = "failure" if path in self.failing else "success"
+        return {"id": id, "state": state, "reason": "conflict"}
+
+
+def test_sync(requests_mock):
+    groups = SecurityGroups(requests_mock, polls=3)
+    client = Client("key", "secret", zone="ch-gva-2")
+    with patch("exoscale.api.security_group._sleep") as sleep:
+        outcomes = sync_security_group_rules(
+            client,
+            GROUP,
+            DESIRED,
+            external_sources=["198.51.100.0/24"],
+            max_workers=4,
+        )
+    # Operations are polled together.
+    assert sleep.call_count == 3
+    assert sorted(
+        ((method, body) for method, _, body in groups.calls),
+        key=lambda call: (call[0], sorted(call[1].items())),
+    ) == [
+        ("DELETE", {}),
+        (
+            "POST",
+            {
+                "flow-direction": "ingress",
+                "protocol": "udp",
+                "start-port": 53,
+                "end-port": 53,
+                "network": "0.0.0.0/0",
+            },
+        ),
+        (
+            "POST",
+            {
+                "flow-direction": "ingress",
+                "protocol": "tcp",
+                "start-port": 8080,
+                "end-port": 8080,
+                "network": "10.0.0.1/8",
+            },
+        ),
+        ("PUT", {"cidr": "203.0.113.7/32"}),
+    ]
+    assert all(o.error is None for o in outcomes)
+    changed = [o for o in outcomes if o.action != "unchanged"]
+    assert len(changed) == 4
+    assert [p for m, p, _ in groups.calls if m == "DELETE"] == [
+        f"/v2/security-group/{GROUP}/rules/r4"
+    ]
+    assert all(o.result["state"] == "success" for o in changed)
+
+
+def test_sync_failures(requests_mock):
+    groups = SecurityGroups(
+        requests_mock,
+        failing={f"/v2/security-group/{GROUP}/rules/r4"},
+    )
+    requests_mock.put(
+        f"{URL}/security-group/{GROUP}:add-source",
+        status_code=400,
+        json={"message": "invalid"},
+    )
+    client = Client("key", "secret", zone="ch-gva-2")
+    with patch("exoscale.api.security_group._sleep"):
+        outcomes = sync_security_group_rules(
+            client, GROUP, DESIRED, external_sources=["192.0.2.0/24"]
+        )
+    errors = {o.action: str(o.error) for o in outcomes if o.error is not None}
+    assert errors["add-source"].startswith("Client error 400")
+    assert errors["delete"] == "Operation error: failure, conflict"
+    assert len(groups.calls) == 5
+
+    with patch("exoscale.api.security_group._sleep") as sleep:
+        outcomes = sync_security_group_rules(
+            client, GROUP, DESIRED, delete=False, wait=False
+        )
+    assert not sleep.called
+    assert [o.result["state"] for o in outcomes if o.action == "add"] == [
+        "pending",
+        "pending",
+    ]
@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+import requests
+
+from exoscale.api.partner import Client as PartnerClient
+from exoscale.api.session import ThreadLocalSession, create_session
+from exoscale.api.v2 import Client
+
+
+@pytest.fixture
+def api_server(http_server):
+    def respond(request):
+        id = request.path.rstrip("/").rsplit("/", 1)[-1]
+        return 200, {
+            "id": id,
+            "auth": request.headers.get("Authorization", ""),
+        }
+
+    return http_server(respond, "/v2")
+
+
+def test_create_session():
+    session = create_session("key", "secret")
+    assert isinstance(session, requests.Session)
+    shared = create_session("key", "secret", thread_safe=True)
+    assert isinstance(shared, ThreadLocalSession)
+
+
+def test_thread_local_session_per_thread():
+    shared = create_session("key", "secret", thread_safe=True)
+    main = shared.session
+    assert shared.session is main
+    assert main.auth is shared.auth
+
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(shared.session))
+    thread.start()
+    thread.join()
+    assert sessions[0] is not main
+    assert sessions[0].auth is shared.auth
+
+
+def test_thread_safe_client_stress(api_server):
+    client = Client("key", "secret", url=api_server.url, thread_safe=True)
+    ids = [f"{i:08x}-0000-0000-0000-000000000000" for i in range(800)]
+    threads = set()
+
+    def get(id):
+        threads.add(threading.get_ident())
+        return client.get_instance(id=id)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(get, ids))
+        # One session per worker thread, while the workers are alive.
+        assert len(client.http_client._sessions) == len(threads)
+
+    # Every response matches its request, and is signed with the shared key.
+    assert [r["id"] for r in results] == ids
+    assert all(
+        r["auth"].startswith("EXO2-HMAC-SHA256 credential=key,")
+        for r in results
+    )
+    client.http_client.close()
+
+
+def _describe(client):
+    return type(client).__module__, client.endpoint, client.key
+
+
+def test_pickle_client(monkeypatch):
+    client = Client("key", "s3cr3t", zone="de-fra-1", thread_safe=True)
+    # The secret is not pickled without an explicit opt-in.
+    with pytest.raises(pickle.PicklingError, match="pickle_secret"):
+        pickle.dumps(client)
+
+    client = Client(
+        "key",
+        "s3cr3t",
+        zone="de-fra-1",
+        thread_safe=True,
+        pickle_secret="EXOSCALE_API_SECRET",
+    )
+    data = pickle.dumps(client)
+    # Neither the API definition nor the session are serialized.
+    assert len(data) < 500
+    assert b"s3cr3t" not in data
+    with pytest.raises(pickle.UnpicklingError, match="EXOSCALE_API_SECRET"):
+        pickle.loads(data)
+    monkeypatch.setenv("EXOSCALE_API_SECRET", "from-env")
+    copy = pickle.loads(data)
+    assert type(copy) is Client
+    assert copy.endpoint == "https://api-de-fra-1.exoscale.com/v2"
+    assert copy.key == "key"
+    assert copy._secret == "from-env"
+    assert copy.thread_safe
+    assert isinstance(copy.http_client, ThreadLocalSession)
+    assert pickle.loads(pickle.dumps(copy))._secret == "from-env"
+
+
+def test_pickle_partner_client():
+    client = PartnerClient(
+        "key", "secret", url="https://partner.test/v1", pickle_secret=True
+    )
+    copy = pickle.loads(pickle.dumps(client))
+    assert type(copy) is PartnerClient
+    assert copy.endpoint == "https://partner.test/v1"
+    assert copy.http_client.auth.key == "key"
+    assert copy._secret == "secret"
+
+
+def test_process_pool(monkeypatch):
+    monkeypatch.setenv("EXOSCALE_API_SECRET", "secret")
+    client = Client(
+        "key", "secret", zone="ch-gva-2", pickle_secret="EXOSCALE_API_SECRET"
+    )
+    with ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        results = list(executor.map(_describe, [client] * 4))
+    assert (
+        results
+        == [("exoscale.api.v2", "https://api-ch-gva-2.exoscale.com/v2", "key")]
+        * 4
+    )
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "register_at_fork"), reason="requires os.fork()"
+)
+def test_pools_reset_after_fork():
+    client = Client("key", "secret", zone="ch-gva-2")
+    shared = Client("key", "secret", zone="ch-gva-2", thread_safe=True)
+    adapter = client.http_client.get_adapter(client.endpoint)
+    poolmanager = adapter.poolmanager
+    local = shared.http_client.session
+
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        ok = (
+            adapter.poolmanager is not poolmanager
+            and shared.http_client.session is not local
+        )
+        os.write(write, b"1" if ok else b"0")
+        os._exit(0)
+    os.close(write)
+    assert os.read(read, 1) == b"1"
+    os.close(read)
+    os.waitpid(pid, 0)
+    # The parent keeps its pools.
+    assert adapter.poolmanager is poolmanager
+    assert shared.http_client.session is local
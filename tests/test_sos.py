@@ -0,0 +1,158 @@
+from unittest.mock import patch
+
+import pytest
+
+from exoscale.api.sos import PresignedURLCache, Transfer, _url_expiry
+from exoscale.api.v2 import Client
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+
+
+@pytest.fixture
+def sos_server(http_server):
+    objects = {}
+
+    def respond(request):
+        key, _, query = request.path.lstrip("/").partition("?")
+        # URLs signed for another method are rejected, as by SOS.
+        if f"method={request.command}" not in query.split("&"):
+            return 403, b""
+        if request.command == "PUT":
+            objects[key] = request.body
+            return 200, b""
+        if key not in objects:
+            return 404, b""
+        return 200, objects[key]
+
+    server = http_server(respond)
+    server.objects = objects
+    return server
+
+
+def test_url_expiry():
+    assert (
+        _url_expiry(
+            "https://sos/k?X-Amz-Date=20250101T000000Z&X-Amz-Expires=60", 0
+        )
+        == 1735689600 + 60
+    )
+    assert _url_expiry("https://sos/k?Expires=1700000000", 0) == 1700000000
+    assert _url_expiry("https://sos/k", 1000) == 1300
+
+
+def test_presigned_url_cache():
+    calls = []
+
+    def presign(bucket, key):
+        calls.append(key)
+        return f"https://sos/{bucket}/{key}?Expires=1100"
+
+    cache = PresignedURLCache(None, "b", presign=presign)
+    with patch("exoscale.api.sos.time.time", return_value=1000):
+        cache.prefetch(["a", "b"])
+        assert cache.get("a") == "https://sos/b/a?Expires=1100"
+    assert sorted(calls) == ["a", "b"]
+    # close to expiry: renewed
+    with patch("exoscale.api.sos.time.time", return_value=1080):
+        cache.get("a")
+    assert sorted(calls) == ["a", "a", "b"]
+
+
+def test_presigned_url_cache_pruning():
+    def presign(bucket, key):
+        expires = 1100 if key.startswith("old-") else 9999
+        return f"https://sos/{key}?Expires={expires}"
+
+    cache = PresignedURLCache(None, "b", presign=presign)
+    with patch("exoscale.api.sos.time.time", return_value=1000):
+        for i in range(1000):
+            cache.get(f"old-{i}")
+    assert len(cache) == 1000
+    # Expired URLs are dropped as new keys are added.
+    with patch("exoscale.api.sos.time.time", return_value=2000):
+        for i in range(100):
+            cache.get(f"new-{i}")
+    assert len(cache) == 100
+
+
+def test_transfer(requests_mock, sos_server, tmp_path):
+    requests_mock.real_http = True
+    requests_mock.get(
+        f"{URL}/sos/bucket/presigned-url",
+        json={"url": f"{sos_server.url}/obj?Expires=99999999999&method=GET"},
+    )
+    client = Client(key="EXOtest", secret="sdsd")
+    upload_presigned = []
+
+    def upload_presign(bucket, key):
+        upload_presigned.append(key)
+        return f"{sos_server.url}/obj?Expires=99999999999&method=PUT"
+
+    small = tmp_path / "small"
+    small.write_bytes(b"hello")
+    large = tmp_path / "large"
+    large.write_bytes(b"x" * 5000)
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+
+    with pytest.raises(ValueError, match="upload_presign"):
+        Transfer(client, "bucket").upload([("small", small)])
+
+    transfer = Transfer(
+        client,
+        "bucket",
+        chunk_size=1024,
+        mmap_threshold=4096,
+        upload_presign=upload_presign,
+    )
+    # The presign endpoint always returns the same URL, cached per key.
+    report = transfer.upload([("large", large)])
+    assert report.errors == []
+    assert report.bytes == 5000
+    assert report.throughput > 0
+    assert sos_server.objects["obj"] == b"x" * 5000
+
+    report = transfer.upload([("small", small)])
+    assert sos_server.objects["obj"] == b"hello"
+    report = transfer.upload([("empty", empty)])
+    assert sos_server.objects["obj"] == b""
+
+    sos_server.objects["obj"] = b"y" * 3000
+    report = transfer.download(
+        [("k1", tmp_path / "out1"), ("k2", tmp_path / "out2")]
+    )
+    assert report.errors == []
+    assert report.bytes == 6000
+    assert (tmp_path / "out2").read_bytes() == b"y" * 3000
+    # Downloads of uploaded keys do not reuse the upload URLs, and the
+    # other way around.
+    report = transfer.download([("small", tmp_path / "out3")])
+    assert report.errors == []
+    report = transfer.upload([("k1", small)])
+    assert report.errors == []
+    # one presigned URL request per distinct key and direction
+    presign_calls = [
+        r
+        for r in requests_mock.request_history
+        if r.path.endswith("/presigned-url")
+    ]
+    assert len(presign_calls) == 3
+    assert upload_presigned == ["large", "small", "empty", "k1"]
+
+
+def test_transfer_errors(sos_server, tmp_path):
+    transfer = Transfer(
+        None,
+        "bucket",
+        presign=lambda b, k: f"{sos_server.url}/{k}?method=GET",
+        upload_presign=lambda b, k: f"{sos_server.url}/{k}?method=GET",
+    )
+    report = transfer.download([("missing", tmp_path / "missing")])
+    [outcome] = report.errors
+    assert outcome.key == "missing"
+    assert "404" in str(outcome.error)
+    # Download URLs are rejected for uploads.
+    path = tmp_path / "file"
+    path.write_bytes(b"data")
+    [outcome] = transfer.upload([("file", path)]).errors
+    assert "403" in str(outcome.error)
@@ -0,0 +1,139 @@
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from exoscale.api.exceptions import (
+    ExoscaleAPIAuthException,
+    ExoscaleAPIClientException,
+    ExoscaleAPIServerException,
+)
+from exoscale.api.partner import Client as PartnerClient
+from exoscale.api.session import HTTP2Session, create_session
+from exoscale.api.v2 import Client
+
+httpx = pytest.importorskip("httpx")
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+
+
+def _client(handler):
+    client = Client("key", "secret", zone="ch-gva-2", http2=True)
+    client.http_client = HTTP2Session(
+        client.http_client.auth, transport=httpx.MockTransport(handler)
+    )
+    return client
+
+
+def test_create_http2_session():
+    session = create_session("key", "secret", http2=True)
+    assert isinstance(session, HTTP2Session)
+    assert isinstance(session.client, httpx.Client)
+    session.close()
+
+
+def test_http2_signature():
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json={"instances": []})
+
+    client = _client(handler)
+    with patch("exoscale_auth.time.time", return_value=1700000000):
+        assert client.list_instances(manager_id="m", manager_type="pool") == {
+            "instances": []
+        }
+        client.create_security_group(name="web")
+
+    # Requests are signed exactly like with requests.Session.
+    with patch("exoscale_auth.time.time", return_value=1700000000):
+        get = requests.Request(
+            "GET",
+            f"{URL}/instance",
+            params={"manager-id": "m", "manager-type": "pool"},
+        ).prepare()
+        client.http_client.auth(get)
+        post = requests.Request(
+            "POST", f"{URL}/security-group", json={"name": "web"}
+        ).prepare()
+        client.http_client.auth(post)
+
+    signature = requests_seen[0].headers["authorization"]
+    assert str(requests_seen[0].url) == get.url
+    assert signature == get.headers["Authorization"]
+    assert "signed-query-args=manager-id;manager-type" in signature
+    assert json.loads(requests_seen[1].content) == {"name": "web"}
+    signature = requests_seen[1].headers["authorization"]
+    assert signature == post.headers["Authorization"]
+
+
+@pytest.mark.parametrize(
+    "status,exception",
+    [
+        (403, ExoscaleAPIAuthException),
+        (404, ExoscaleAPIClientException),
+        (503, ExoscaleAPIServerException),
+    ],
+)
+def test_http2_errors(status, exception):
+    client = _client(lambda request: httpx.Response(status, text="nope"))
+    with pytest.raises(exception, match=f"{status}: nope"):
+        client.get_instance(id="abc")
+
+
+def test_http2_empty_response():
+    client = _client(lambda request: httpx.Response(204))
+    assert client.delete_security_group(id="abc") is None
+
+
+def test_http2_slow_response(http_server):
+    def respond(request):
+        time.sleep(0.3)
+        return 200, {"instances": []}
+
+    server = http_server(respond, "/v2")
+    client = Client("key", "secret", url=server.url, http2=True)
+    # Cleartext endpoint: HTTP/1.1 with httpx, without timeout by default.
+    client.http_client = HTTP2Session(client.http_client.auth)
+    assert client.http_client.client.timeout == httpx.Timeout(None)
+    assert client.list_instances() == {"instances": []}
+
+    client.http_client = HTTP2Session(client.http_client.auth, timeout=0.05)
+    with pytest.raises(requests.Timeout):
+        client.list_instances()
+
+
+def test_http2_transport_error():
+    def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    client = _client(handler)
+    with pytest.raises(requests.ConnectionError, match="refused") as exc:
+        client.list_instances()
+    assert isinstance(exc.value.__cause__, httpx.ConnectError)
+
+    # Transport errors are retried like with requests.
+    responses = iter(
+        [
+            httpx.ConnectError("connection reset"),
+            httpx.Response(200, json=[]),
+        ]
+    )
+
+    def flaky(request):
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    partner = PartnerClient("key", "secret", http2=True)
+    partner.http_client = HTTP2Session(
+        partner.http_client.auth, transport=httpx.MockTransport(flaky)
+    )
+    with patch("exoscale.api.partner._sleep") as sleep:
+        [usage] = partner.iter_organizations_usage(ids=["org-1"])
+    assert usage.error is None
+    assert sleep.call_count == 1
@@ -0,0 +1,137 @@
+from itertools import islice
+from unittest.mock import patch
+
+import pytest
+
+from exoscale.api.exceptions import ExoscaleAPIClientException
+from exoscale.api.v2 import Client
+from exoscale.api.watch import Watcher, _diff, _list_items
+
+
+def _instances(*items):
+    return {"json": {"instances": list(items)}}
+
+
+def test_diff():
+    a = {"id": "a", "state": "running"}
+    b = {"id": "b", "state": "running"}
+    snapshot, events = _diff({}, [a, b], "id", "list_instances")
+    assert [(e.type, e.key) for e in events] == [
+        ("added", "a"),
+        ("added", "b"),
+    ]
+
+    a2 = {"id": "a", "state": "running"}
+    b2 = {"id": "b", "state": "stopped"}
+    new_snapshot, events = _diff(snapshot, [a2, b2], "id", "list_instances")
+    assert [(e.type, e.key) for e in events] == [("changed", "b")]
+    assert events[0].previous is b
+    assert events[0].item is b2
+    # unchanged items are carried over from the previous snapshot
+    assert new_snapshot["a"] is a
+
+    _, events = _diff(new_snapshot, [], "id", "list_instances")
+    assert [(e.type, e.key) for e in events] == [
+        ("removed", "a"),
+        ("removed", "b"),
+    ]
+    assert events[0].item is None
+
+
+def test_diff_key_function():
+    snapshot, _ = _diff({}, [{"name": "x"}], lambda i: i["name"].upper(), "op")
+    assert list(snapshot) == ["X"]
+
+
+def test_list_items():
+    assert _list_items([1]) == [1]
+    assert _list_items({"instances": [1]}) == [1]
+    # empty listings may omit the list
+    assert _list_items({}) == []
+    assert _list_items({"total": 0}) == []
+    assert _list_items(None) == []
+    with pytest.raises(ValueError):
+        _list_items({"a": [], "b": []})
+
+
+def test_client_watch(requests_mock):
+    requests_mock.get(
+        "https://api-ch-gva-2.exoscale.com/v2/instance",
+        [
+            _instances({"id": "a", "state": "starting"}),
+            _instances({"id": "a", "state": "starting"}),
+            _instances({"id": "a", "state": "running"}, {"id": "b"}),
+            _instances({"id": "b"}),
+        ],
+    )
+    client = Client(key="EXOtest", secret="sdsd")
+    with patch("exoscale.api.watch._sleep") as sleep:
+        events = list(islice(client.watch("list_instances", interval=5), 4))
+    assert [(e.type, e.key) for e in events] == [
+        ("added", "a"),
+        ("changed", "a"),
+        ("added", "b"),
+        ("removed", "a"),
+    ]
+    assert requests_mock.call_count == 4
+    assert sleep.call_count == 3
+
+
+def test_watcher_multiple_watches(requests_mock):
+    requests_mock.get(
+        "https://api-ch-gva-2.exoscale.com/v2/instance",
+        json={"instances": [{"id": "a"}]},
+    )
+    requests_mock.get(
+        "https://api-ch-gva-2.exoscale.com/v2/load-balancer",
+        json={"load-balancers": [{"id": "lb"}]},
+    )
+    client = Client(key="EXOtest", secret="sdsd")
+    watcher = Watcher(interval=5)
+    watcher.add(client, "list_instances")
+    watcher.add(client, "list-load-balancers")
+    events = watcher.poll()
+    assert [(e.operation, e.key) for e in events] == [
+        ("list_instances", "a"),
+        ("list_load_balancers", "lb"),
+    ]
+    assert watcher.poll() == []
+
+    with pytest.raises(TypeError):
+        watcher.add(client, "list_nothing")
+
+
+def test_watcher_transient_errors(requests_mock):
+    down = {"status_code": 503, "text": "down"}
+    requests_mock.get(
+        "https://api-ch-gva-2.exoscale.com/v2/instance",
+        [
+            _instances({"id": "a"}),
+            down,
+            down,
+            down,
+            _instances({"id": "b"}),
+        ],
+    )
+    client = Client(key="EXOtest", secret="sdsd")
+    with patch("exoscale.api.watch._sleep") as sleep:
+        events = list(islice(client.watch("list_instances", interval=5), 3))
+    # Failed polls neither end the watch nor report removals.
+    assert [(e.type, e.key) for e in events] == [
+        ("added", "a"),
+        ("added", "b"),
+        ("removed", "a"),
+    ]
+    # Backing off: the second and third failures skip 1 and 3 intervals.
+    assert requests_mock.call_count == 5
+    assert sleep.call_count == 8
+
+    requests_mock.get(
+        "https://api-ch-gva-2.exoscale.com/v2/instance",
+        status_code=400,
+        text="bad",
+    )
+    watcher = Watcher()
+    watcher.add(client, "list_instances")
+    with pytest.raises(ExoscaleAPIClientException):
+        watcher.poll()
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from exoscale.api.v2 import Client
+from exoscale.api.windows import (
+    WindowCache,
+    fetch_events,
+    fetch_impact_reports,
+    fetch_usage_reports,
+    split_windows,
+)
+
+URL = "https://api-ch-gva-2.exoscale.com/v2"
+NOW = datetime(2025, 3, 11, tzinfo=timezone.utc)
+
+
+def _event(timestamp, request_id):
+    return {"timestamp": timestamp, "request-id": request_id}
+
+
+def test_split_windows():
+    windows = split_windows(
+        "2025-03-10T00:00:00Z", "2025-03-10T10:00:00Z", timedelta(hours=4)
+    )
+    assert [(s.hour, e.hour) for s, e in windows] == [(0, 4), (4, 8), (8, 10)]
+    assert windows[0][0].tzinfo is not None
+    assert split_windows(NOW, NOW, timedelta(hours=1)) == []
+
+
+def _events_callback(request, context):
+    start = request.qs["from"][0].upper()
+    return {
+        "2025-03-10T00:00:00Z": [
+            _event("2025-03-10T11:00:00Z", "b"),
+            _event("2025-03-10T01:00:00Z", "a"),
+            _event("2025-03-10T12:00:00Z", "c"),
+        ],
+        "2025-03-10T12:00:00Z": [
+            _event("2025-03-10T12:00:00Z", "c"),
+            _event("2025-03-10T12:00:00Z", "d"),
+        ],
+    }[start]
+
+
+def test_fetch_events(requests_mock, tmp_path):
+    requests_mock.get(f"{URL}/event", json=_events_callback)
+    client = Client(key="EXOtest", secret="sdsd")
+    cache = WindowCache(str(tmp_path))
+    with patch("exoscale.api.windows._now", return_value=NOW):
+        events = fetch_events(
+            client,
+            "2025-03-10T00:00:00Z",
+            "2025-03-11T00:00:00Z",
+            window=timedelta(hours=12),
+            cache=cache,
+        )
+        assert [e["request-id"] for e in events] == ["a", "b", "c", "d"]
+        assert requests_mock.call_count == 2
+        assert len(cache) == 1
+
+        # the first window is closed and served from the cache, including
+        # from a fresh cache instance reading the same directory
+        list(
+            fetch_events(
+                client,
+                "2025-03-10T00:00:00Z",
+                "2025-03-11T00:00:00Z",
+                window=timedelta(hours=12),
+                cache=WindowCache(str(tmp_path)),
+            )
+        )
+    assert requests_mock.call_count == 3
+    assert requests_mock.last_request.qs["from"] == ["2025-03-10t12:00:00z"]
+
+
+def test_fetch_usage_reports(requests_mock):
+    requests_mock.get(f"{URL}/usage-report", json={"usage": []})
+    client = Client(key="EXOtest", secret="sdsd")
+    cache = WindowCache()
+    with patch("exoscale.api.windows._now", return_value=NOW):
+        for _ in range(2):
+            reports = fetch_usage_reports(
+                client, ["2025-01", "2025-02", "2025-03"], cache=cache
+            )
+            assert [p for p, _ in reports] == ["2025-01", "2025-02", "2025-03"]
+    # past months are only fetched once
+    assert requests_mock.call_count == 4
+
+    # results are not shared between organizations or zones
+    requests_mock.get(
+        "https://api-de-fra-1.exoscale.com/v2/usage-report",
+        json={"usage": []},
+    )
+    with patch("exoscale.api.windows._now", return_value=NOW):
+        for other in [
+            Client(key="EXOother", secret="sdsd"),
+            Client(key="EXOtest", secret="sdsd", zone="de-fra-1"),
+        ]:
+            list(fetch_usage_reports(other, ["2025-01"], cache=cache))
+    assert requests_mock.call_count == 6
+
+
+def test_fetch_impact_reports(requests_mock):
+    requests_mock.get(
+        f"{URL}/environmental-impact/report",
+        json={"impact": {}, "zones": {}},
+    )
+    client = Client(key="EXOtest", secret="sdsd")
+    reports = list(
+        fetch_impact_reports(
+            client,
+            "2025-01-01T00:00:00Z",
+            "2025-03-01T00:00:00Z",
+            window=timedelta(days=31),
+        )
+    )
+    assert [w for w, _ in reports] == [
+        ("2025-01-01T00:00:00Z", "2025-02-01T00:00:00Z"),
+        ("2025-02-01T00:00:00Z", "2025-03-01T00:00:00Z"),
+    ]